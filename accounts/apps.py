@@ -1,6 +1,14 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_save
 
 
 class AccountsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'accounts'
+
+    def ready(self):
+        from . import checks  # noqa: F401
+        from .authentication import invalidate_user_on_change
+        User = self.get_model('User')
+        post_save.connect(invalidate_user_on_change, sender=User)
+        post_delete.connect(invalidate_user_on_change, sender=User)
@@ -0,0 +1,127 @@
+"""
+JWT authentication without a user query per request.
+
+Access tokens carry the user's role and active flag (see
+serializers.TokenObtainPairSerializer). The user itself is resolved from a
+short-lived cache entry holding its field values, which is invalidated by
+bumping a per-user version whenever the user is saved or deleted.
+
+The bump only reaches processes sharing the cache. ACCOUNTS_USER_CACHE_ALIAS
+should therefore name a shared cache (Redis, Memcached, database) wherever
+several workers serve requests; check --deploy fails otherwise (see
+accounts.checks). Entries in a per-process cache such as LocMemCache are kept
+for ACCOUNTS_USER_LOCAL_CACHE_TIMEOUT seconds at most, which bounds how long
+another worker may keep authenticating a deactivated or demoted user.
+"""
+import uuid
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import router, transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from courier_service_api.metrics import timed
+
+User = get_user_model()
+
+# Everything but the password hash, which is loaded on access if ever needed
+CACHED_FIELDS = [field.attname for field in User._meta.concrete_fields if field.attname != 'password']
+
+
+# Cache backends private to each process
+PROCESS_LOCAL_CACHES = (LocMemCache,)
+
+
+def get_user_cache():
+    return caches[settings.ACCOUNTS_USER_CACHE_ALIAS]
+
+
+def is_process_local(cache):
+    return isinstance(cache, PROCESS_LOCAL_CACHES)
+
+
+def get_entry_timeout(cache):
+    """Seconds a user entry is kept in cache, see the module docstring"""
+    if is_process_local(cache):
+        return min(settings.ACCOUNTS_USER_CACHE_TIMEOUT, settings.ACCOUNTS_USER_LOCAL_CACHE_TIMEOUT)
+    return settings.ACCOUNTS_USER_CACHE_TIMEOUT
+
+
+def _entry_key(user_id):
+    return f'accounts:user:{user_id}'
+
+
+def _version_key(user_id):
+    return f'accounts:user:{user_id}:version'
+
+
+def get_cached_user(user_id):
+    """Return the user with the given id, or None; at most one query on a cache miss"""
+    cache = get_user_cache()
+    entry_key, version_key = _entry_key(user_id), _version_key(user_id)
+    cached = cache.get_many([entry_key, version_key])
+    version, entry = cached.get(version_key), cached.get(entry_key)
+    if version is not None and entry is not None and entry['version'] == version:
+        return User.from_db(router.db_for_read(User), CACHED_FIELDS, entry['values'])
+
+    if version is None:
+        cache.add(version_key, uuid.uuid4().hex, timeout=None)
+        version = cache.get(version_key)
+    user = User.objects.filter(pk=user_id).only(*CACHED_FIELDS).first()
+    if user is not None:
+        cache.set(
+            entry_key,
+            {'version': version, 'values': [getattr(user, field) for field in CACHED_FIELDS]},
+            get_entry_timeout(cache)
+        )
+    return user
+
+
+def invalidate_cached_user(user_id):
+    """Make cached copies of the user stale"""
+    get_user_cache().set(_version_key(user_id), uuid.uuid4().hex, timeout=None)
+
+
+def invalidate_user_on_change(instance, **kwargs):
+    """post_save/post_delete receiver for the user model, see AccountsConfig.ready"""
+    # Once now, so this transaction reads fresh data, and once on commit, so a
+    # concurrent request cannot keep what it cached before the commit
+    user_id = instance.pk
+    invalidate_cached_user(user_id)
+    transaction.on_commit(lambda: invalidate_cached_user(user_id))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication resolving users through the user cache.
+
+    Tokens whose role claim no longer matches the user's role are rejected, so
+    a role change takes effect immediately instead of when the token expires.
+    """
+    def authenticate(self, request):
+        with timed('auth'):
+            return super().authenticate(request)
+
+    def get_user(self, validated_token):
+        if api_settings.CHECK_REVOKE_TOKEN:
+            # Needs the password hash, which is not cached
+            return super().get_user(validated_token)
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        user = get_cached_user(user_id)
+        if user is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        user_role = validated_token.get('user_role')
+        if user_role is not None and user_role != user.user_role:
+            raise AuthenticationFailed(_("User role has changed, please log in again"), code="role_changed")
+        return user
@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+from rest_framework.settings import api_settings
+
+from .authentication import CachedJWTAuthentication, get_user_cache, is_process_local
+
+
+@register(Tags.caches, deploy=True)
+def check_user_cache(app_configs, **kwargs):
+    """
+    CachedJWTAuthentication needs a cache shared by all workers, or a user's
+    deactivation or role change only reaches the worker that saved it
+    """
+    if not any(issubclass(cls, CachedJWTAuthentication) for cls in api_settings.DEFAULT_AUTHENTICATION_CLASSES):
+        return []
+    if not is_process_local(get_user_cache()):
+        return []
+    return [Error(
+        f"ACCOUNTS_USER_CACHE_ALIAS ({settings.ACCOUNTS_USER_CACHE_ALIAS!r}) is a per-process cache.",
+        hint=(
+            "Point it to a cache shared by every worker (Redis, Memcached, database), or "
+            "changes to users reach other workers only after "
+            "ACCOUNTS_USER_LOCAL_CACHE_TIMEOUT seconds."
+        ),
+        obj='accounts.authentication.CachedJWTAuthentication',
+        id='accounts.E001',
+    )]
@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from django.contrib.auth.password_validation import validate_password
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer as BaseTokenObtainPairSerializer
 
 User = get_user_model()
 
@@ -26,4 +27,13 @@ class RegisterSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         validated_data.pop('password2')
         user = User.objects.create_user(**validated_data)
-        return user
\ No newline at end of file
+        return user
+
+class TokenObtainPairSerializer(BaseTokenObtainPairSerializer):
+    """Adds the user's role and active flag to the token claims"""
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        token['user_role'] = user.user_role
+        token['is_active'] = user.is_active
+        return token
@@ -0,0 +1,110 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+from accounts.authentication import get_entry_timeout, get_user_cache
+from accounts.checks import check_user_cache
+
+User = get_user_model()
+
+
+class CachedJWTAuthenticationTests(APITestCase):
+    def setUp(self):
+        get_user_cache().clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email='customer@example.com', password='s3cret-pass', user_role=User.CUSTOMER,
+            first_name='Old'
+        )
+        self.profile_url = reverse('profile')
+
+    def login(self, client=None):
+        response = self.client.post(
+            reverse('token_obtain_pair'),
+            {'email': 'customer@example.com', 'password': 's3cret-pass'},
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        client = client or self.client
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+        return response.data['access']
+
+    def test_token_claims(self):
+        token = AccessToken(self.login())
+
+        self.assertEqual(token['user_role'], User.CUSTOMER)
+        self.assertTrue(token['is_active'])
+
+    def test_cached_user_needs_no_query(self):
+        self.login()
+        self.client.get(self.profile_url)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.profile_url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['email'], 'customer@example.com')
+
+    def test_profile_update_invalidates_cache(self):
+        """The update is visible on the next request and the password is kept"""
+        self.login()
+        self.client.get(self.profile_url)
+
+        response = self.client.patch(self.profile_url, {'first_name': 'New'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertEqual(self.client.get(self.profile_url).data['first_name'], 'New')
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password('s3cret-pass'))
+
+    def test_role_change_rejects_issued_tokens(self):
+        self.login()
+        self.client.get(self.profile_url)
+
+        self.user.user_role = User.COURIER
+        self.user.save()
+        response = self.client.get(self.profile_url)
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(response.data['code'], 'role_changed')
+
+    def test_deactivated_user_is_rejected(self):
+        self.login()
+        self.client.get(self.profile_url)
+
+        self.user.is_active = False
+        self.user.save()
+
+        self.assertEqual(self.client.get(self.profile_url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deleted_user_is_rejected(self):
+        self.login()
+        self.client.get(self.profile_url)
+
+        self.user.delete()
+
+        self.assertEqual(self.client.get(self.profile_url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+SHARED_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'shared': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+}
+
+
+class UserCacheSettingsTests(SimpleTestCase):
+    def test_process_local_entries_are_short_lived(self):
+        self.assertEqual(get_entry_timeout(get_user_cache()), settings.ACCOUNTS_USER_LOCAL_CACHE_TIMEOUT)
+
+    @override_settings(CACHES=SHARED_CACHES, ACCOUNTS_USER_CACHE_ALIAS='shared')
+    def test_shared_cache_entries(self):
+        self.assertEqual(get_entry_timeout(get_user_cache()), settings.ACCOUNTS_USER_CACHE_TIMEOUT)
+
+    def test_deploy_check_needs_a_shared_cache(self):
+        self.assertEqual([error.id for error in check_user_cache(None)], ['accounts.E001'])
+
+        with self.settings(CACHES=SHARED_CACHES, ACCOUNTS_USER_CACHE_ALIAS='shared'):
+            self.assertEqual(check_user_cache(None), [])
@@ -17,7 +17,11 @@ class ProfileView(generics.RetrieveUpdateAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_object(self):
-        return self.request.user
+        # request.user comes from the authentication cache without its
+        # password hash; updates work on a fresh row
+        if self.request.method in permissions.SAFE_METHODS:
+            return self.request.user
+        return User.objects.get(pk=self.request.user.pk)
 
 class UserListView(generics.ListCreateAPIView):
     queryset = User.objects.all()
@@ -0,0 +1,168 @@
+"""
+Per-request performance metrics.
+
+PerformanceMiddleware (see courier_service_api.middleware) keeps a
+RequestTimings for every request in a context variable. Database queries are
+timed by an execute wrapper, and code that wants its own entry times itself
+with timed(phase): authentication ('auth'), serializers ('serialize') and
+the JSON renderer ('render'). Phases overlap with db when they run queries.
+
+The timings of finished requests are added to in-process histograms, labelled
+with the view that served them (e.g. package-track), which MetricsView in
+courier_service_api.views exposes in the Prometheus text format. Each process
+has its own histograms.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+DEFAULT_DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+RESPONSE_SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+_current_timings = ContextVar('request_timings', default=None)
+
+
+class RequestTimings:
+    """Query count and time, and time per phase, of one request"""
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.query_count = 0
+        self.query_seconds = 0.0
+        self.phases = {}
+        self._active = set()
+
+    def record_query(self, execute, sql, params, many, context):
+        """Execute wrapper adding each query to the timings"""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.query_count += 1
+            self.query_seconds += time.perf_counter() - start
+
+
+def start_request():
+    """Begin timing a request in the current context; returns its RequestTimings and a reset token"""
+    timings = RequestTimings()
+    return timings, _current_timings.set(timings)
+
+
+def end_request(token):
+    _current_timings.reset(token)
+
+
+def get_current_timings():
+    return _current_timings.get()
+
+
+@contextmanager
+def timed(phase):
+    """
+    Add the time spent in the block to phase of the current request, if one
+    is being timed. A block nested in another of the same phase, such as a
+    nested serializer, is not counted twice.
+    """
+    timings = _current_timings.get()
+    if timings is None or phase in timings._active:
+        yield
+        return
+    timings._active.add(phase)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.phases[phase] = timings.phases.get(phase, 0.0) + time.perf_counter() - start
+        timings._active.discard(phase)
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label set, in the Prometheus style"""
+    def __init__(self, name, description, buckets, labels=('view', 'method')):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(buckets)
+        self.labels = labels
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels[label] for label in self.labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+    def expose(self):
+        """The histogram in the Prometheus text exposition format"""
+        lines = [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = sorted((key, ([*counts], total, count)) for key, (counts, total, count) in self._series.items())
+        for key, (counts, total, count) in series:
+            labels = ','.join(f'{label}="{escape_label(value)}"' for label, value in zip(self.labels, key))
+            cumulative = 0
+            for bound, bucket_count in zip([*self.buckets, '+Inf'], counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{labels}}} {total:.6f}')
+            lines.append(f'{self.name}_count{{{labels}}} {count}')
+        return '\n'.join(lines)
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Registry:
+    """The histograms every request is added to"""
+    def __init__(self, duration_buckets=DEFAULT_DURATION_BUCKETS):
+        self.request_duration = Histogram(
+            'http_request_duration_seconds', 'Wall time of requests.', duration_buckets
+        )
+        self.db_duration = Histogram(
+            'http_request_db_duration_seconds', 'Time spent in database queries per request.', duration_buckets
+        )
+        self.db_queries = Histogram(
+            'http_request_db_queries', 'Database queries per request.', QUERY_COUNT_BUCKETS
+        )
+        self.serialize_duration = Histogram(
+            'http_request_serialize_duration_seconds', 'Time spent in serializers per request.', duration_buckets
+        )
+        self.response_size = Histogram(
+            'http_response_size_bytes', 'Size of response bodies.', RESPONSE_SIZE_BUCKETS
+        )
+        self.histograms = [
+            self.request_duration, self.db_duration, self.db_queries,
+            self.serialize_duration, self.response_size,
+        ]
+
+    def observe(self, timings, duration, response_size, **labels):
+        self.request_duration.observe(duration, **labels)
+        self.db_duration.observe(timings.query_seconds, **labels)
+        self.db_queries.observe(timings.query_count, **labels)
+        self.serialize_duration.observe(timings.phases.get('serialize', 0.0), **labels)
+        if response_size is not None:
+            self.response_size.observe(response_size, **labels)
+
+    def clear(self):
+        for histogram in self.histograms:
+            histogram.clear()
+
+    def expose(self):
+        return '\n'.join(histogram.expose() for histogram in self.histograms) + '\n'
+
+
+registry = Registry(getattr(settings, 'PERFORMANCE_DURATION_BUCKETS', DEFAULT_DURATION_BUCKETS))
+
@@ -0,0 +1,134 @@
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+from . import metrics
+from .queries import QueryInspector, get_inspector_settings
+
+# Phases sent in the Server-Timing header besides total and db, see metrics.timed
+SERVER_TIMING_PHASES = ('auth', 'serialize', 'render')
+
+
+class QueryWrapperMiddleware:
+    """
+    Base of middleware that wraps the database queries of each request.
+    start() returns the request's state and its execute wrapper, which is
+    installed on every connection for the request; finish() returns the
+    response.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state, wrapper = self.start(request)
+        try:
+            with self.wrap_queries(wrapper):
+                response = self.get_response(request)
+        finally:
+            self.end(state)
+        return self.finish(request, response, state)
+
+    async def __acall__(self, request):
+        state, wrapper = self.start(request)
+        # Queries of sync views and the async ORM alike run on the request's
+        # thread-sensitive thread, so the wrappers go on its connections
+        stack = await sync_to_async(self.wrap_queries, thread_sensitive=True)(wrapper)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close, thread_sensitive=True)()
+            self.end(state)
+        return self.finish(request, response, state)
+
+    def wrap_queries(self, wrapper):
+        """An ExitStack holding wrapper as execute wrapper of every connection"""
+        stack = ExitStack()
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(wrapper))
+        return stack
+
+    def start(self, request):
+        raise NotImplementedError
+
+    def end(self, state):
+        """Called once the response is ready, even if the view raised"""
+
+    def finish(self, request, response, state):
+        return response
+
+
+class PerformanceMiddleware(QueryWrapperMiddleware):
+    """
+    Times every request: wall time, database queries (count and time),
+    serializer, renderer and authentication time, and the size of the
+    response. The timings are sent back in a Server-Timing header (unless
+    PERFORMANCE_SERVER_TIMING is off) and added to the histograms of
+    courier_service_api.metrics.
+
+    Put it first in MIDDLEWARE so the total covers the other middleware.
+    """
+    def start(self, request):
+        timings, token = metrics.start_request()
+        return (timings, token), timings.record_query
+
+    def end(self, state):
+        metrics.end_request(state[1])
+
+    def finish(self, request, response, state):
+        timings = state[0]
+        duration = time.perf_counter() - timings.start
+        size = None if response.streaming else len(response.content)
+        metrics.registry.observe(
+            timings, duration, size, view=self.view_name(request, response), method=request.method
+        )
+        if getattr(settings, 'PERFORMANCE_SERVER_TIMING', True):
+            response['Server-Timing'] = self.server_timing(timings, duration)
+        return response
+
+    def view_name(self, request, response):
+        """basename-action of viewsets (e.g. package-track), else the URL name"""
+        view = (getattr(response, 'renderer_context', None) or {}).get('view')
+        basename, action = getattr(view, 'basename', None), getattr(view, 'action', None)
+        if basename and action:
+            return f'{basename}-{action}'
+        match = request.resolver_match
+        if match is None:
+            return 'unmatched'
+        return match.view_name or match.func.__name__
+
+    def server_timing(self, timings, duration):
+        entries = [
+            f'total;dur={duration * 1000:.2f}',
+            f'db;dur={timings.query_seconds * 1000:.2f};desc="{timings.query_count} queries"',
+        ]
+        entries.extend(
+            f'{phase};dur={timings.phases[phase] * 1000:.2f}'
+            for phase in SERVER_TIMING_PHASES if phase in timings.phases
+        )
+        return ', '.join(entries)
+
+
+class QueryInspectorMiddleware(QueryWrapperMiddleware):
+    """
+    Reports N+1 and slow queries of every request, see
+    courier_service_api.queries. Does nothing unless QUERY_INSPECTOR['ENABLED']
+    is set, which is meant for development, staging and the test suite.
+    """
+    def __call__(self, request):
+        if not get_inspector_settings()['ENABLED']:
+            return self.get_response(request)
+        return super().__call__(request)
+
+    def start(self, request):
+        inspector = QueryInspector(label=f'{request.method} {request.path}')
+        return inspector, inspector
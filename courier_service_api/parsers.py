@@ -0,0 +1,54 @@
+"""
+JSON parsing with orjson when it is installed, see FastJSONRenderer.
+"""
+import codecs
+import io
+import json
+
+from django.conf import settings
+from rest_framework.parsers import JSONParser
+
+from .renderers import FastJSONRenderer, orjson
+
+# orjson reads integers over 64 bits as floats; bodies with a run of digits
+# that long are left to json, which keeps them exact. Mapping every byte to
+# '0' (digit) or ' ' and searching for the run is much faster than a regex.
+DIGITS_TABLE = bytes(ord('0') if chr(byte).isdigit() and byte < 128 else ord(' ') for byte in range(256))
+LONG_NUMBER = b'0' * 19
+
+
+def has_long_number(body):
+    return LONG_NUMBER in body.translate(DIGITS_TABLE)
+
+
+def loads(value):
+    """json.loads of a str, with orjson when it is installed"""
+    if orjson is not None and not has_long_number(value.encode()):
+        try:
+            return orjson.loads(value)
+        except orjson.JSONDecodeError:
+            # orjson is stricter than json (NaN, ...); json decides
+            pass
+    return json.loads(value)
+
+
+class FastJSONParser(JSONParser):
+    """
+    JSONParser decoding UTF-8 bodies with orjson. Bodies orjson rejects are
+    parsed again by JSONParser, which accepts them or reports the error.
+    """
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or codecs.lookup(encoding).name != 'utf-8':
+            return super().parse(stream, media_type, parser_context)
+
+        body = stream.read()
+        if has_long_number(body):
+            return super().parse(io.BytesIO(body), media_type, parser_context)
+        try:
+            return orjson.loads(body)
+        except orjson.JSONDecodeError:
+            return super().parse(io.BytesIO(body), media_type, parser_context)
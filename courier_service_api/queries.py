@@ -0,0 +1,170 @@
+"""
+Query inspection for development, staging and the test suite.
+
+QueryInspectorMiddleware (see courier_service_api.middleware) gives every
+request a QueryInspector when QUERY_INSPECTOR['ENABLED'] is set. It groups
+the request's SQL by fingerprint, the statement with its literals and
+parameter lists normalized, so the same query for different rows counts as
+one. A fingerprint seen N_PLUS_ONE_THRESHOLD times is reported as an N+1
+query with the stack that ran it: the serializer field being rendered, if
+any, and the frames of this project's code. Queries slower than
+SLOW_QUERY_MS are logged too.
+
+With RAISE, an N+1 query raises NPlusOneQueryError where it happens instead
+of being logged; the test runner (courier_service_api.test_runner) turns
+this on so tests fail on new N+1 patterns.
+"""
+import logging
+import re
+import sys
+import time
+import traceback
+from pathlib import Path
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SETTINGS = {
+    'ENABLED': False,
+    'N_PLUS_ONE_THRESHOLD': 5,
+    'SLOW_QUERY_MS': 100,
+    'RAISE': False,
+    # Regular expressions of fingerprints never reported as N+1 queries
+    'IGNORE': [],
+}
+
+PROJECT_ROOT = Path(settings.BASE_DIR).resolve()
+# Frames of the instrumentation itself are left out of reports
+INSTRUMENTATION_FILES = {
+    Path(__file__).resolve().with_name(name) for name in ('queries.py', 'metrics.py', 'middleware.py')
+}
+STACK_LIMIT = 8
+
+# Transaction control statements repeat legitimately and are not inspected
+TRANSACTION_STATEMENT = re.compile(r'^\s*(SAVEPOINT|RELEASE|ROLLBACK|BEGIN|COMMIT)\b', re.IGNORECASE)
+
+FINGERPRINT_PATTERNS = [
+    (re.compile(r"'(?:[^']|'')*'"), '?'),
+    (re.compile(r'(?<![\w"])-?\d+(?:\.\d+)?\b'), '?'),
+    (re.compile(r'%s|%\(\w+\)s'), '?'),
+    # Lists of any length: IN (?, ?, ?) and multi-row VALUES
+    (re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)'), '(...)'),
+    (re.compile(r'\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+'), '(...)'),
+    (re.compile(r'\s+'), ' '),
+]
+
+
+def get_inspector_settings():
+    return {**DEFAULT_SETTINGS, **getattr(settings, 'QUERY_INSPECTOR', {})}
+
+
+def fingerprint(sql):
+    """sql with literals, placeholders and value lists normalized"""
+    for pattern, replacement in FINGERPRINT_PATTERNS:
+        sql = pattern.sub(replacement, sql)
+    return sql.strip()
+
+
+class NPlusOneQueryError(Exception):
+    """A request ran the same query once per row"""
+
+
+class QueryGroup:
+    """The queries of one fingerprint"""
+    __slots__ = ('fingerprint', 'count', 'seconds', 'reported')
+
+    def __init__(self, fingerprint):
+        self.fingerprint = fingerprint
+        self.count = 0
+        self.seconds = 0.0
+        self.reported = False
+
+
+class QueryInspector:
+    """Execute wrapper grouping the queries of one request by fingerprint"""
+    def __init__(self, label='', threshold=None, slow_query_ms=None, raise_errors=None, ignore=None):
+        config = get_inspector_settings()
+        self.label = label
+        self.threshold = config['N_PLUS_ONE_THRESHOLD'] if threshold is None else threshold
+        self.slow_query_ms = config['SLOW_QUERY_MS'] if slow_query_ms is None else slow_query_ms
+        self.raise_errors = config['RAISE'] if raise_errors is None else raise_errors
+        self.ignore = [re.compile(pattern) for pattern in (config['IGNORE'] if ignore is None else ignore)]
+        self.groups = {}
+        self.n_plus_one = []
+        self.slow_queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.record(sql, time.perf_counter() - start, context)
+
+    def record(self, sql, seconds, context):
+        if TRANSACTION_STATEMENT.match(sql):
+            return
+        if self.slow_query_ms is not None and seconds * 1000 > self.slow_query_ms:
+            self.slow_queries.append((sql, seconds))
+            logger.warning(
+                "Slow query (%.1f ms) in %s on %s: %s",
+                seconds * 1000, self.label or 'unknown view', context['connection'].alias, sql
+            )
+
+        key = fingerprint(sql)
+        group = self.groups.get(key)
+        if group is None:
+            group = self.groups[key] = QueryGroup(key)
+        group.count += 1
+        group.seconds += seconds
+        if group.count < self.threshold or group.reported:
+            return
+        group.reported = True
+        if any(pattern.search(key) for pattern in self.ignore):
+            return
+        report = self.describe(group, sys._getframe(1))
+        self.n_plus_one.append(report)
+        if self.raise_errors:
+            raise NPlusOneQueryError(report)
+        logger.warning(report)
+
+    def describe(self, group, frame):
+        """Report of an N+1 query with the serializer field and project code running it"""
+        lines = [f"N+1 query in {self.label or 'unknown view'}: {group.count} x {group.fingerprint}"]
+        field = serializer_field(frame)
+        if field:
+            lines.append(f"  Rendering serializer field {field}")
+        lines.extend(
+            f'  File "{entry.filename}", line {entry.lineno}, in {entry.name}\n    {entry.line}'
+            for entry in project_stack(frame)
+        )
+        return '\n'.join(lines)
+
+
+def serializer_field(frame):
+    """'Serializer.field' of the innermost DRF serializer rendering a field in frame's stack"""
+    while frame is not None:
+        if frame.f_code.co_name == 'to_representation' and 'field' in frame.f_locals:
+            serializer, field = frame.f_locals.get('self'), frame.f_locals['field']
+            if getattr(field, 'field_name', None) and serializer is not None:
+                return f'{type(serializer).__name__}.{field.field_name}'
+        frame = frame.f_back
+    return None
+
+
+def project_stack(frame):
+    """The innermost STACK_LIMIT frames of this project's code, outermost first"""
+    entries = [
+        entry for entry in traceback.extract_stack(frame)
+        if is_project_file(entry.filename)
+    ]
+    return entries[-STACK_LIMIT:]
+
+
+def is_project_file(filename):
+    path = Path(filename)
+    return (
+        path.is_relative_to(PROJECT_ROOT)
+        and path not in INSTRUMENTATION_FILES
+        and not any(part in ('site-packages', 'dist-packages') for part in path.parts)
+    )
@@ -0,0 +1,60 @@
+"""
+JSON rendering with orjson when it is installed.
+
+FastJSONRenderer is a drop-in for DRF's JSONRenderer, see DEFAULT_RENDERER_CLASSES
+in settings.py. Without orjson, or for output orjson cannot produce, it renders
+with JSONRenderer itself.
+"""
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+from .metrics import timed
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+LINE_SEPARATOR, PARAGRAPH_SEPARATOR = '\u2028'.encode(), '\u2029'.encode()
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer encoding with orjson.
+
+    The output is formatted as JSONRenderer's: compact UTF-8, U+2028 and
+    U+2029 escaped, 'Z' for UTC datetimes, and types orjson does not know
+    (Decimal, timedelta, lazy translations, querysets, ...) converted by DRF's
+    JSONEncoder. Indents other than 2 and data orjson rejects, such as
+    integers over 64 bits, are rendered by JSONRenderer.
+
+    It is not byte-for-byte the same for floats: orjson writes some of them
+    differently (1e-6 for 1e-06, 0.00001 for 1e-05, 1e16 for 1e+16), though
+    they parse to the same values, and renders NaN and infinite floats as
+    null where JSONRenderer raises.
+    """
+    default = staticmethod(JSONEncoder().default)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with timed('render'):
+            return self._render(data, accepted_media_type, renderer_context)
+
+    def _render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if indent not in (None, 2):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        option = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        try:
+            ret = orjson.dumps(data, default=self.default, option=option)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Escaped as JSONRenderer does, so the output is valid JavaScript
+        if LINE_SEPARATOR in ret or PARAGRAPH_SEPARATOR in ret:
+            ret = ret.replace(LINE_SEPARATOR, b'\\u2028').replace(PARAGRAPH_SEPARATOR, b'\\u2029')
+        return ret
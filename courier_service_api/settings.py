@@ -37,6 +37,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'courier_service_api.middleware.PerformanceMiddleware',
+    'courier_service_api.middleware.QueryInspectorMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -124,13 +126,117 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'accounts.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    # orjson when installed, DRF's stdlib json otherwise
+    'DEFAULT_RENDERER_CLASSES': (
+        'courier_service_api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'courier_service_api.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
+}
+
+# Keyset pagination for package and status update listings
+PACKAGES_PAGE_SIZE = 50
+PACKAGES_MAX_PAGE_SIZE = 500
+
+# Bulk package creation: rows accepted per request and rows per INSERT
+PACKAGES_BULK_CREATE_MAX_ROWS = 5000
+PACKAGES_BULK_CREATE_BATCH_SIZE = 500
+
+# Rows fetched from the database per round trip by the streaming export
+PACKAGES_EXPORT_CHUNK_SIZE = 2000
+
+# Snapshot cache for the public tracking endpoint. Use
+# 'packages.cache.RedisBackend' with OPTIONS {'url': ...} to share it between processes.
+PACKAGE_TRACKING_CACHE = {
+    'BACKEND': 'packages.cache.LocMemLRUBackend',
+    'TIMEOUT': 60,
+    'OPTIONS': {'max_entries': 10000},
 }
 
+# Full-text package search. None picks SQLite FTS5 or PostgreSQL full-text
+# search from the database vendor; set a dotted path to force a backend.
+PACKAGE_SEARCH_BACKEND = None
+
+# Tracking number sequence values each process reserves per database round trip
+PACKAGE_TRACKING_NUMBER_BLOCK_SIZE = 100
+
+# Database alias the sequence blocks are reserved on. On PostgreSQL or MySQL,
+# point it at a second alias of the default database, e.g.
+#   DATABASES['sequences'] = {**DATABASES['default'], 'TEST': {'MIRROR': 'default'}}
+# so reservations commit on their own instead of holding the sequence row lock
+# until the request transaction commits. None uses the default connection.
+PACKAGE_TRACKING_SEQUENCE_DATABASE = None
+
+# Live tracking stream (served under ASGI): heartbeat interval in seconds,
+# client reconnect delay, events buffered per slow client before its stream
+# is closed, and tracking numbers one stream may follow
+PACKAGE_EVENTS_HEARTBEAT_INTERVAL = 15
+PACKAGE_EVENTS_RETRY_MS = 3000
+PACKAGE_EVENTS_QUEUE_SIZE = 100
+PACKAGE_EVENTS_MAX_TRACKING_NUMBERS = 50
+
+# Automatic courier assignment (packages.assignment): open packages a courier
+# may carry, how many more than the least loaded courier one already working
+# a pickup area may carry and still be preferred for it, and packages per run
+PACKAGE_ASSIGNMENT_CAPACITY = 25
+PACKAGE_ASSIGNMENT_AREA_SLACK = 5
+PACKAGE_ASSIGNMENT_BATCH_SIZE = 1000
+
+# Route planning (packages.routing): the geocoder locating addresses, by
+# default a lookup table of cities (OPTIONS {'table': {address or area:
+# (latitude, longitude)}}), and the default and largest time budget of a plan
+PACKAGE_GEOCODER = {
+    'BACKEND': 'packages.routing.LookupTableGeocoder',
+    'OPTIONS': {},
+}
+PACKAGE_ROUTE_TIME_BUDGET_MS = 200
+PACKAGE_ROUTE_MAX_TIME_BUDGET_MS = 2000
+
+# Per-request performance metrics (courier_service_api.middleware): whether
+# responses carry a Server-Timing header, which shows clients how long the
+# database, serializers and renderer took, and the bounds (seconds) of the
+# duration histograms served at /api/metrics/
+PERFORMANCE_SERVER_TIMING = True
+PERFORMANCE_DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# Query inspector (courier_service_api.queries): report queries one request
+# runs N_PLUS_ONE_THRESHOLD or more times with different parameters (N+1
+# queries) and queries slower than SLOW_QUERY_MS. RAISE turns reports into
+# errors; the test runner enables it with RAISE on.
+QUERY_INSPECTOR = {
+    'ENABLED': DEBUG,
+    'N_PLUS_ONE_THRESHOLD': 5,
+    'SLOW_QUERY_MS': 100,
+    'RAISE': False,
+    'IGNORE': [],
+}
+
+TEST_RUNNER = 'courier_service_api.test_runner.TestRunner'
+
+# Admin dashboard counts (packages.stats): days the delivery stats cover by
+# default and at most
+PACKAGE_STATS_DEFAULT_DAYS = 30
+PACKAGE_STATS_MAX_DAYS = 366
+
+# Delivery-time analytics (packages.analytics): rows read per chunk, and the
+# cache and seconds results of a window of days are kept for
+PACKAGE_ANALYTICS_CHUNK_SIZE = 2000
+PACKAGE_ANALYTICS_CACHE_ALIAS = 'default'
+PACKAGE_ANALYTICS_CACHE_TIMEOUT = 600
+
+# Serve list, retrieve, track and update_status from the async ORM
+# (packages.async_views). Only useful when running under ASGI.
+PACKAGES_ASYNC_VIEWS = False
+
 # JWT Settings
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(hours=1),
@@ -145,7 +251,17 @@ SIMPLE_JWT = {
     'USER_ID_CLAIM': 'user_id',
     'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
     'TOKEN_TYPE_CLAIM': 'token_type',
+    'TOKEN_OBTAIN_SERIALIZER': 'accounts.serializers.TokenObtainPairSerializer',
 }
 
+# Cache used by CachedJWTAuthentication to resolve users without a query, and
+# how long (seconds) an entry is kept. Use a shared cache in production: with a
+# per-process one (the default LocMemCache), entries are kept at most
+# ACCOUNTS_USER_LOCAL_CACHE_TIMEOUT seconds, as other workers never see a user
+# change, and check --deploy fails.
+ACCOUNTS_USER_CACHE_ALIAS = 'default'
+ACCOUNTS_USER_CACHE_TIMEOUT = 300
+ACCOUNTS_USER_LOCAL_CACHE_TIMEOUT = 5
+
 # CORS settings
 CORS_ALLOW_ALL_ORIGINS = True  # Only for development Not Production
\ No newline at end of file
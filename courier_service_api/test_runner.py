@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class TestRunner(DiscoverRunner):
+    """
+    DiscoverRunner that makes the query inspector raise, so a request running
+    an N+1 query fails its test (see courier_service_api.queries)
+    """
+    def __init__(self, query_inspector=True, **kwargs):
+        super().__init__(**kwargs)
+        self.query_inspector = query_inspector
+        self.inspector_settings = None
+
+    @classmethod
+    def add_arguments(cls, parser):
+        super().add_arguments(parser)
+        parser.add_argument(
+            '--no-query-inspector', action='store_false', dest='query_inspector',
+            help="Do not fail tests whose requests run N+1 queries.",
+        )
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        if self.query_inspector:
+            self.inspector_settings = override_settings(
+                QUERY_INSPECTOR={**settings.QUERY_INSPECTOR, 'ENABLED': True, 'RAISE': True}
+            )
+            self.inspector_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        if self.inspector_settings is not None:
+            self.inspector_settings.disable()
+        super().teardown_test_environment(**kwargs)
@@ -1,8 +1,11 @@
 from django.contrib import admin
 from django.urls import path, include
 
+from .views import MetricsView
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/accounts/', include('accounts.urls')),
     path('api/packages/', include('packages.urls')),
+    path('api/metrics/', MetricsView.as_view(), name='metrics'),
 ]
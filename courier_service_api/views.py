@@ -0,0 +1,27 @@
+from rest_framework.renderers import BaseRenderer
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from accounts.permissions import IsAdmin
+from .metrics import registry
+
+
+class PrometheusRenderer(BaseRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, str):
+            return data.encode(self.charset)
+        # Errors such as a failed permission check
+        return '\n'.join(f'# {key}: {value}' for key, value in data.items()).encode(self.charset)
+
+
+class MetricsView(APIView):
+    """Request histograms of this process in the Prometheus text format (admin only)"""
+    permission_classes = [IsAdmin]
+    renderer_classes = [PrometheusRenderer]
+
+    def get(self, request):
+        return Response(registry.expose(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -1,5 +1,8 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.db import transaction
+from .assignment import assign_packages
 from .models import Package, PackageStatusUpdate
+from .stats import STATE_FIELDS, StatsDelta, package_state
 
 @admin.register(Package)
 class PackageAdmin(admin.ModelAdmin):
@@ -7,6 +10,45 @@ class PackageAdmin(admin.ModelAdmin):
     list_filter = ('status', 'is_deleted')
     search_fields = ('tracking_number', 'customer__email', 'courier__email', 'description')
     readonly_fields = ('tracking_number', 'created_at', 'updated_at', 'deleted_at')
+    actions = ['assign_couriers']
+    
+    def save_model(self, request, obj, form, change):
+        """Save the package and adjust the package counts, see packages.stats"""
+        with transaction.atomic():
+            delta = StatsDelta()
+            if change:
+                # obj already holds the edits, so the old state comes from the row
+                delta.add(package_state(Package.objects.only(*STATE_FIELDS).get(pk=obj.pk)), -1)
+            super().save_model(request, obj, form, change)
+            delta.add(package_state(obj))
+            delta.apply()
+    
+    def delete_model(self, request, obj):
+        with transaction.atomic():
+            delta = StatsDelta()
+            delta.add(package_state(obj), -1)
+            super().delete_model(request, obj)
+            delta.apply()
+    
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            delta = StatsDelta()
+            for package in queryset.only(*STATE_FIELDS):
+                delta.add(package_state(package), -1)
+            super().delete_queryset(request, queryset)
+            delta.apply()
+    
+    @admin.action(description="Assign couriers automatically")
+    def assign_couriers(self, request, queryset):
+        """Assign the selected unassigned, pending packages, see packages.assignment"""
+        assignment = assign_packages(queryset, request.user, limit=queryset.count())
+        self.message_user(request, f"Assigned {len(assignment.assigned)} package(s) to couriers.")
+        if assignment.unassigned:
+            self.message_user(
+                request,
+                f"{len(assignment.unassigned)} package(s) were left unassigned: every courier is at capacity.",
+                messages.WARNING
+            )
 
 @admin.register(PackageStatusUpdate)
 class PackageStatusUpdateAdmin(admin.ModelAdmin):
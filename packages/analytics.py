@@ -0,0 +1,250 @@
+"""
+Delivery-time analytics for the admin dashboards.
+
+For the live packages delivered in a window of days, the time each spent
+pending (from creation to its first in_transit update), in transit (from then
+to delivered_at) and in total is summarized as percentiles, overall, per
+courier and per day of delivery.
+
+The window's packages and in_transit updates are read with values_list in
+chunks of PACKAGE_ANALYTICS_CHUNK_SIZE rows into flat columns (stdlib
+arrays), never as model instances. Durations and grouped percentiles are
+then computed over whole columns with NumPy when it is installed, and in
+plain Python otherwise, with the same results. Results are cached per
+(since, until) window for PACKAGE_ANALYTICS_CACHE_TIMEOUT seconds, see
+get_delivery_times().
+"""
+import math
+from array import array
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Package, PackageStatusUpdate
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+User = get_user_model()
+
+PERCENTILES = (50, 90, 95)
+STAGES = ('pending', 'in_transit', 'total')
+# Grouping key of packages delivered without a courier
+NO_COURIER = -1
+
+
+class DeliveryHistory:
+    """Columns of the packages delivered in a window, in primary key order"""
+    def __init__(self):
+        self.ids = array('q')
+        self.couriers = array('q')
+        # Day of delivery as a date ordinal, times as POSIX timestamps
+        self.days = array('q')
+        self.created = array('d')
+        self.delivered = array('d')
+        # Package ids and times of the packages' in_transit updates
+        self.update_packages = array('q')
+        self.update_times = array('d')
+
+    def __len__(self):
+        return len(self.ids)
+
+
+def delivered_packages(since, until):
+    """Live packages delivered from since to until, days of the current time zone"""
+    start = timezone.make_aware(datetime.combine(since, time.min))
+    end = timezone.make_aware(datetime.combine(until + timedelta(days=1), time.min))
+    return Package.objects.filter(
+        is_deleted=False, status='delivered', delivered_at__gte=start, delivered_at__lt=end
+    )
+
+
+def chunks(rows, size):
+    """rows as lists of at most size rows"""
+    rows = iter(rows)
+    while chunk := list(islice(rows, size)):
+        yield chunk
+
+
+def load_history(since, until):
+    """The DeliveryHistory of the window, in two queries"""
+    chunk_size = settings.PACKAGE_ANALYTICS_CHUNK_SIZE
+    packages = delivered_packages(since, until)
+    history = DeliveryHistory()
+
+    rows = packages.order_by('pk').annotate(day=TruncDate('delivered_at')).values_list(
+        'pk', 'courier_id', 'day', 'created_at', 'delivered_at'
+    )
+    for chunk in chunks(rows.iterator(chunk_size=chunk_size), chunk_size):
+        ids, couriers, days, created, delivered = zip(*chunk)
+        history.ids.extend(ids)
+        history.couriers.extend(NO_COURIER if courier is None else courier for courier in couriers)
+        history.days.extend(map(date.toordinal, days))
+        history.created.extend(map(datetime.timestamp, created))
+        history.delivered.extend(map(datetime.timestamp, delivered))
+
+    updates = PackageStatusUpdate.objects.filter(
+        package__in=packages.values('pk'), status='in_transit'
+    ).order_by().values_list('package_id', 'created_at')
+    for chunk in chunks(updates.iterator(chunk_size=chunk_size), chunk_size):
+        update_packages, update_times = zip(*chunk)
+        history.update_packages.extend(update_packages)
+        history.update_times.extend(map(datetime.timestamp, update_times))
+    return history
+
+
+def stage_durations(history):
+    """{stage: seconds per package}, NaN for packages never marked in_transit"""
+    # The updates are read after the packages, so they may include packages
+    # delivered in between, which are left out
+    if np is None:
+        positions = {pk: index for index, pk in enumerate(history.ids)}
+        picked_up = [math.inf] * len(history)
+        for pk, update_time in zip(history.update_packages, history.update_times):
+            index = positions.get(pk)
+            if index is not None:
+                picked_up[index] = min(picked_up[index], update_time)
+        picked_up = [math.nan if value == math.inf else value for value in picked_up]
+        created, delivered = history.created, history.delivered
+        return {
+            'pending': [end - start for start, end in zip(created, picked_up)],
+            'in_transit': [end - start for start, end in zip(picked_up, delivered)],
+            'total': [end - start for start, end in zip(created, delivered)],
+        }
+
+    ids = np.frombuffer(history.ids, dtype=np.int64)
+    created = np.frombuffer(history.created)
+    delivered = np.frombuffer(history.delivered)
+    # First in_transit update of each package: ids are sorted, so each
+    # update's package is found by binary search
+    update_packages = np.frombuffer(history.update_packages, dtype=np.int64)
+    positions = np.searchsorted(ids, update_packages)
+    known = positions < len(ids)
+    known[known] = ids[positions[known]] == update_packages[known]
+    picked_up = np.full(len(ids), np.inf)
+    np.minimum.at(picked_up, positions[known], np.frombuffer(history.update_times)[known])
+    picked_up[np.isinf(picked_up)] = np.nan
+    return {
+        'pending': picked_up - created,
+        'in_transit': delivered - picked_up,
+        'total': delivered - created,
+    }
+
+
+def grouped_percentiles(keys, values):
+    """
+    {key: (count, [value at each of PERCENTILES])} of values grouped by keys,
+    leaving out NaNs. Percentiles are linearly interpolated between the
+    closest ranks, as numpy.percentile does by default.
+    """
+    if np is None:
+        groups = defaultdict(list)
+        for key, value in zip(keys, values):
+            if not math.isnan(value):
+                groups[key].append(value)
+        result = {}
+        for key, group in groups.items():
+            group.sort()
+            result[key] = (len(group), [percentile(group, q) for q in PERCENTILES])
+        return result
+
+    keys, values = np.asarray(keys, dtype=np.int64), np.asarray(values, dtype=np.float64)
+    kept = ~np.isnan(values)
+    keys, values = keys[kept], values[kept]
+    order = np.lexsort((values, keys))
+    keys, values = keys[order], values[order]
+    groups, starts, counts = np.unique(keys, return_index=True, return_counts=True)
+    # One row per group, one column per percentile
+    offsets = (counts[:, None] - 1) * (np.asarray(PERCENTILES) / 100)
+    lower = np.floor(offsets)
+    upper = np.ceil(offsets)
+    low = values[starts[:, None] + lower.astype(np.int64)]
+    high = values[starts[:, None] + upper.astype(np.int64)]
+    results = low + (high - low) * (offsets - lower)
+    return {
+        int(key): (int(count), row.tolist()) for key, count, row in zip(groups, counts, results)
+    }
+
+
+def percentile(ordered, q):
+    """The q-th percentile of the sorted, non-empty list ordered"""
+    offset = (len(ordered) - 1) * (q / 100)
+    lower, upper = math.floor(offset), math.ceil(offset)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (offset - lower)
+
+
+def stage_summary(group):
+    """Count and percentiles in hours of one group of durations"""
+    count, values = group or (0, [None] * len(PERCENTILES))
+    return {
+        'count': count,
+        **{
+            f'p{q}': None if value is None else round(value / 3600, 2)
+            for q, value in zip(PERCENTILES, values)
+        },
+    }
+
+
+def compute_delivery_times(since, until):
+    """Delivery-time percentiles of the window, see the module docstring"""
+    history = load_history(since, until)
+    durations = stage_durations(history)
+    columns = {
+        'overall': [0] * len(history),
+        'courier': history.couriers,
+        'day': history.days,
+    }
+    stats = {
+        (grouping, stage): grouped_percentiles(keys, durations[stage])
+        for grouping, keys in columns.items() for stage in STAGES
+    }
+
+    def rows(grouping):
+        for key in sorted(stats[grouping, 'total']):
+            yield key, {
+                'packages': stats[grouping, 'total'][key][0],
+                **{stage: stage_summary(stats[grouping, stage].get(key)) for stage in STAGES},
+            }
+
+    couriers = [key for key in stats['courier', 'total'] if key != NO_COURIER]
+    emails = dict(User.objects.filter(pk__in=couriers).values_list('pk', 'email'))
+    overall = dict(rows('overall')).get(0) or {
+        'packages': 0, **{stage: stage_summary(None) for stage in STAGES}
+    }
+    return {
+        'since': since,
+        'until': until,
+        'percentiles': list(PERCENTILES),
+        'overall': overall,
+        'by_courier': [
+            {
+                'courier': None if key == NO_COURIER else key,
+                'courier_email': emails.get(key),
+                **row,
+            }
+            for key, row in rows('courier')
+        ],
+        'by_day': [{'day': date.fromordinal(key), **row} for key, row in rows('day')],
+    }
+
+
+def get_delivery_times(since, until, refresh=False):
+    """
+    compute_delivery_times(since, until) from the cache, computed and cached
+    on a miss or with refresh
+    """
+    cache = caches[settings.PACKAGE_ANALYTICS_CACHE_ALIAS]
+    key = f'packages:delivery-times:{since.isoformat()}:{until.isoformat()}'
+    result = None if refresh else cache.get(key)
+    if result is None:
+        result = compute_delivery_times(since, until)
+        cache.set(key, result, settings.PACKAGE_ANALYTICS_CACHE_TIMEOUT)
+    return result
@@ -0,0 +1,162 @@
+"""
+Automatic courier assignment.
+
+assign_packages() hands a batch of unassigned, pending packages to couriers,
+oldest first. A package goes to the least loaded courier (by open, i.e. not
+yet delivered, packages) with capacity left, except that a courier already
+working the package's pickup area is preferred as long as they carry at most
+PACKAGE_ASSIGNMENT_AREA_SLACK packages more than the least loaded courier.
+
+Courier loads and areas are read with one aggregate query and kept in
+min-heaps, so choosing a courier costs O(log couriers) per package. The
+assignments are written with one bulk_update and one bulk_create of status
+update rows, however large the batch.
+"""
+import heapq
+from collections import defaultdict, namedtuple
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from .cache import invalidate_tracking_snapshot
+from .events import publish_status_updates
+from .models import Package, PackageStatusUpdate
+from .stats import STATE_FIELDS, StatsDelta, package_state
+
+Assignment = namedtuple('Assignment', ['assigned', 'unassigned'])
+
+
+def pickup_area(address):
+    """
+    Area key of an address: its last comma-separated part (normally the
+    city), lower-cased and without numbers such as a postal code. Addresses
+    without a comma are keyed by their street, without the house number.
+    """
+    parts = [part for part in address.split(',') if part.strip()]
+    words = parts[-1].lower().split() if parts else []
+    return ' '.join(word for word in words if not any(char.isdigit() for char in word))
+
+
+class CourierPool:
+    """
+    Active couriers with their open loads, in min-heaps of (load, courier id)
+    over all couriers and per pickup area. Heap entries are never updated in
+    place: an assignment pushes new entries, and an entry whose load is no
+    longer the courier's, or is at capacity, is dropped when it reaches the top.
+    """
+    def __init__(self, couriers, loads=None, areas=None, capacity=None, area_slack=None):
+        self.couriers = {courier.pk: courier for courier in couriers}
+        self.capacity = capacity or getattr(settings, 'PACKAGE_ASSIGNMENT_CAPACITY', 25)
+        if area_slack is None:
+            area_slack = getattr(settings, 'PACKAGE_ASSIGNMENT_AREA_SLACK', 5)
+        self.area_slack = area_slack
+        loads, areas = loads or {}, areas or {}
+        self.loads = {courier_id: loads.get(courier_id, 0) for courier_id in self.couriers}
+        self.areas = defaultdict(set, {courier_id: set(areas.get(courier_id, ())) for courier_id in self.couriers})
+
+        self.heap = [(load, courier_id) for courier_id, load in self.loads.items()]
+        heapq.heapify(self.heap)
+        self.area_heaps = defaultdict(list)
+        for courier_id, courier_areas in self.areas.items():
+            for area in courier_areas:
+                self.area_heaps[area].append((self.loads[courier_id], courier_id))
+        for heap in self.area_heaps.values():
+            heapq.heapify(heap)
+
+    @classmethod
+    def from_database(cls, **kwargs):
+        """Active couriers with loads and areas from their open packages"""
+        User = get_user_model()
+        couriers = User.objects.filter(user_role=User.COURIER, is_active=True).only('id', 'email')
+        open_packages = Package.objects.filter(
+            courier__isnull=False, is_deleted=False
+        ).exclude(status='delivered')
+
+        loads, areas = defaultdict(int), defaultdict(set)
+        for row in open_packages.values('courier_id', 'pickup_address').annotate(count=Count('pk')):
+            loads[row['courier_id']] += row['count']
+            areas[row['courier_id']].add(pickup_area(row['pickup_address']))
+        return cls(couriers, loads=loads, areas=areas, **kwargs)
+
+    def _peek(self, heap):
+        while heap:
+            load, courier_id = heap[0]
+            if load == self.loads[courier_id] and load < self.capacity:
+                return heap[0]
+            heapq.heappop(heap)
+        return None
+
+    def choose(self, area):
+        """The courier to give a package picked up in area, or None if all are full"""
+        best = self._peek(self.heap)
+        if best is None:
+            return None
+        local = self._peek(self.area_heaps[area]) if area in self.area_heaps else None
+        if local is not None and local[0] <= best[0] + self.area_slack:
+            best = local
+        return self.couriers[best[1]]
+
+    def add(self, courier, area):
+        """Count a package picked up in area against courier's load"""
+        load = self.loads[courier.pk] = self.loads[courier.pk] + 1
+        self.areas[courier.pk].add(area)
+        heapq.heappush(self.heap, (load, courier.pk))
+        for courier_area in self.areas[courier.pk]:
+            heapq.heappush(self.area_heaps[courier_area], (load, courier.pk))
+
+
+def assign_packages(packages, assigned_by, limit=None, pool=None):
+    """
+    Assign couriers to the unassigned, pending packages of the packages
+    queryset, oldest first and at most limit of them. Returns an Assignment
+    of the packages that got a courier and of those left without one because
+    every courier is at capacity.
+    """
+    limit = limit or getattr(settings, 'PACKAGE_ASSIGNMENT_BATCH_SIZE', 1000)
+    with transaction.atomic():
+        # Concurrent runs skip each other's batches where rows can be locked
+        batch = list(
+            packages.filter(courier__isnull=True, status='pending', is_deleted=False)
+            .select_related(None)
+            .select_for_update(skip_locked=True, of=('self',))
+            .only('id', 'tracking_number', 'pickup_address', *STATE_FIELDS)
+            .order_by('created_at', 'id')[:limit]
+        )
+        if not batch:
+            return Assignment([], [])
+        if pool is None:
+            pool = CourierPool.from_database()
+
+        now = timezone.now()
+        delta = StatsDelta()
+        assigned, unassigned, status_updates = [], [], []
+        for package in batch:
+            area = pickup_area(package.pickup_address)
+            courier = pool.choose(area)
+            if courier is None:
+                unassigned.append(package)
+                continue
+            pool.add(courier, area)
+            before = package_state(package)
+            package.courier = courier
+            delta.change(before, package_state(package))
+            package.updated_at = now
+            assigned.append(package)
+            status_updates.append(PackageStatusUpdate(
+                package=package,
+                status=package.status,
+                notes=f"Package assigned to courier: {courier.email}",
+                updated_by=assigned_by
+            ))
+
+        Package.objects.bulk_update(assigned, ['courier', 'updated_at'])
+        delta.apply()
+        PackageStatusUpdate.objects.bulk_create(status_updates)
+        Package.objects.filter(pk__in=[package.pk for package in assigned]).refresh_status_summary()
+    for package in assigned:
+        invalidate_tracking_snapshot(package.tracking_number)
+    publish_status_updates(status_updates)
+    return Assignment(assigned, unassigned)
@@ -0,0 +1,156 @@
+"""
+Async variants of the busiest PackageViewSet actions, for ASGI deployments.
+
+AsyncPackageViewSet serves list, retrieve, track and update_status as
+coroutines using the async ORM, so a worker keeps handling other requests
+while those wait on the database. Every other action is the synchronous
+PackageViewSet one, run in a worker thread as Django does for sync views
+under ASGI. It is enabled with the PACKAGES_ASYNC_VIEWS setting, see
+packages.urls.
+"""
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.core.exceptions import ValidationError
+from django.http import Http404
+from django.utils.cache import patch_vary_headers
+from django.utils.decorators import classonlymethod
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from .cache import get_tracking_cache
+from .conditional import conditional_response, precondition_failed, set_validators
+from .models import Package
+from .serializers import PackageSerializer
+from .views import PackageViewSet
+
+
+class AsyncAPIViewMixin:
+    """
+    APIView.dispatch as a coroutine. Authentication, permission and throttle
+    checks may query the database and run in a worker thread; handlers that
+    are coroutines are awaited and the others run in a worker thread.
+    """
+    @classonlymethod
+    def as_view(cls, *args, **initkwargs):
+        return markcoroutinefunction(super().as_view(*args, **initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+            if iscoroutinefunction(handler):
+                response = await handler(request, *args, **kwargs)
+            else:
+                response = await sync_to_async(handler)(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+
+class AsyncPackageViewSet(AsyncAPIViewMixin, PackageViewSet):
+    """PackageViewSet with list, retrieve, track and update_status on the async ORM"""
+
+    async def aget_object(self):
+        """get_object using the async ORM"""
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            obj = await queryset.aget(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        except (Package.DoesNotExist, TypeError, ValueError, ValidationError):
+            raise Http404
+        self.check_object_permissions(self.request, obj)
+        return obj
+
+    async def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = await self.paginator.apaginate_queryset(queryset, request, view=self)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(await self._serialize(serializer))
+        serializer = self.get_serializer([package async for package in queryset], many=True)
+        return Response(await self._serialize(serializer))
+
+    async def retrieve(self, request, *args, **kwargs):
+        package = await self.aget_object()
+        validators = self.get_package_validators(package)
+        response = conditional_response(request, *validators)
+        if response is None:
+            response = Response(await self._serialize(self.get_serializer(package)))
+        return set_validators(response, *validators)
+
+    @action(detail=True, methods=['post'])
+    async def update_status(self, request, pk=None):
+        """Update package status and create status update record"""
+        package = await self.aget_object()
+
+        # Courier can only update assigned packages
+        if request.user.is_courier and package.courier_id != request.user.pk:
+            return Response(
+                {"detail": "You can only update status for packages assigned to you."},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        serializer = self.get_serializer(
+            data=request.data,
+            context={'request': request, 'package': package}
+        )
+        serializer.is_valid(raise_exception=True)
+        # The status change, history row and summary are written in one
+        # transaction, which the async ORM cannot open
+        if not await sync_to_async(self.save_if_match)(request, package, serializer):
+            return precondition_failed()
+
+        package = await self._full_packages().aget(pk=package.pk)
+        return set_validators(Response(PackageSerializer(package).data), *self.get_package_validators(package))
+
+    @action(detail=False, methods=['get'])
+    async def track(self, request):
+        """Track a package by tracking number (publicly accessible)"""
+        tracking_number = request.query_params.get('tracking_number', None)
+        if not tracking_number:
+            return Response(
+                {"detail": "Tracking number is required"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        tracking_cache = get_tracking_cache()
+        snapshot, generation = tracking_cache.get(tracking_number)
+        if snapshot is not None and not self._can_view_full_package(request.user, snapshot):
+            return self._public_tracking_response(request, snapshot)
+
+        try:
+            package = await self._full_packages().aget(tracking_number=tracking_number, is_deleted=False)
+        except Package.DoesNotExist:
+            raise Http404
+        if snapshot is None:
+            snapshot = self._build_tracking_snapshot(package)
+            tracking_cache.set(tracking_number, snapshot, generation)
+
+        if not self._can_view_full_package(request.user, snapshot):
+            return self._public_tracking_response(request, snapshot)
+
+        validators = self.get_package_validators(package)
+        response = conditional_response(request, *validators)
+        if response is None:
+            response = Response(PackageSerializer(package).data)
+        patch_vary_headers(response, ['Authorization'])
+        return set_validators(response, *validators)
+
+    async def _serialize(self, serializer):
+        """serializer.data, which reads the status history, in a worker thread"""
+        return await sync_to_async(lambda: serializer.data)()
+
+    def _full_packages(self):
+        """Packages with everything PackageSerializer reads loaded up front"""
+        return PackageSerializer.setup_eager_loading(Package.objects.all())
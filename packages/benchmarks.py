@@ -0,0 +1,262 @@
+"""
+Helpers shared by the benchmark management commands: a throwaway database,
+synthetic data seeding and timing statistics.
+"""
+import random
+import statistics
+import threading
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection, connections
+from django.db.backends.signals import connection_created
+from django.utils import timezone
+
+from .models import Package, PackageStatusUpdate
+from .stats import rebuild_stats
+
+STATUS_FLOW = [choice for choice, _ in Package.STATUS_CHOICES]
+CITIES = ['Dhaka', 'Chittagong', 'Khulna', 'Rajshahi', 'Sylhet', 'Barisal', 'Rangpur', 'Mymensingh']
+
+
+@contextmanager
+def scratch_database(verbosity=0):
+    """
+    Run the block against a freshly migrated test database that is destroyed
+    afterwards, so benchmarks never touch real data
+    """
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=verbosity, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=verbosity)
+
+
+class ConnectionWrappers:
+    """An execute wrapper installed on the connections of several threads"""
+    def __init__(self, wrapper):
+        self.wrapper = wrapper
+        self.wrapped = []
+
+    def install(self, connection, **kwargs):
+        """
+        Install the wrapper on connection, once. It goes first, so context
+        managers popping the wrappers they pushed (connection.execute_wrapper,
+        as in QueryWrapperMiddleware) never pop it instead.
+        """
+        if not any(existing is self.wrapper for existing in connection.execute_wrappers):
+            connection.execute_wrappers.insert(0, self.wrapper)
+            self.wrapped.append(connection)
+
+    def install_current_thread(self):
+        for alias in connections:
+            self.install(connections[alias])
+
+    async def install_worker_thread(self):
+        """
+        Install the wrapper on the connections of the thread running
+        sync_to_async(thread_sensitive=True) code, where the ASGI handler
+        runs views and middleware. Its connections stay open between
+        requests, so connection_created does not reach them.
+        """
+        await sync_to_async(self.install_current_thread, thread_sensitive=True)()
+
+    def remove(self):
+        for connection in self.wrapped:
+            connection.execute_wrappers[:] = [
+                existing for existing in connection.execute_wrappers if existing is not self.wrapper
+            ]
+        self.wrapped.clear()
+
+
+@contextmanager
+def wrapped_connections(wrapper):
+    """
+    Install an execute wrapper on the connections of this thread and on
+    connections opened by any thread inside the block; yields the
+    ConnectionWrappers, see install_worker_thread for ASGI requests
+    """
+    wrappers = ConnectionWrappers(wrapper)
+    connection_created.connect(wrappers.install)
+    wrappers.install_current_thread()
+    try:
+        yield wrappers
+    finally:
+        connection_created.disconnect(wrappers.install)
+        wrappers.remove()
+
+
+@contextmanager
+def simulated_latency(milliseconds):
+    """
+    Add a fixed delay to every query on every connection inside the block to
+    mimic a database reached over the network; yields the ConnectionWrappers,
+    or None without latency
+    """
+    if not milliseconds:
+        yield None
+        return
+    delay = milliseconds / 1000
+
+    def delay_query(execute, sql, params, many, context):
+        time.sleep(delay)
+        return execute(sql, params, many, context)
+
+    with wrapped_connections(delay_query) as wrappers:
+        yield wrappers
+
+
+class QueryCounter:
+    """Number of queries run on any connection while counting"""
+    def __init__(self):
+        self.count = 0
+        self.connections = None
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        with self._lock:
+            self.count += 1
+        return execute(sql, params, many, context)
+
+
+@contextmanager
+def counted_queries():
+    """
+    Count the queries of every connection inside the block; yields a
+    QueryCounter, whose connections are its ConnectionWrappers
+    """
+    counter = QueryCounter()
+    with wrapped_connections(counter) as wrappers:
+        counter.connections = wrappers
+        yield counter
+
+
+def seed_dataset(customers=100, couriers=20, packages=10000, updates_per_package=2,
+                 deleted_ratio=0.05, batch_size=5000, seed=0):
+    """
+    Bulk insert a synthetic dataset and return the ids of the created users
+    and packages. Timestamps are spread over the last year so that
+    orderings and date filters have realistic selectivity.
+    """
+    rng = random.Random(seed)
+    User = get_user_model()
+    password = make_password(None)
+    customer_users = User.objects.bulk_create([
+        User(email=f'bench-customer-{index}@example.com', user_role=User.CUSTOMER, password=password)
+        for index in range(customers)
+    ], batch_size=batch_size)
+    courier_users = User.objects.bulk_create([
+        User(email=f'bench-courier-{index}@example.com', user_role=User.COURIER, password=password,
+             first_name='Courier', last_name=str(index))
+        for index in range(couriers)
+    ], batch_size=batch_size)
+    customer_ids = [user.pk for user in customer_users]
+    courier_ids = [user.pk for user in courier_users]
+
+    now = timezone.now()
+    package_ids = []
+    for start in range(0, packages, batch_size):
+        rows = []
+        for index in range(start, min(start + batch_size, packages)):
+            city = rng.choice(CITIES)
+            rows.append(Package(
+                tracking_number=f'BENCH-{index:010d}',
+                customer_id=rng.choice(customer_ids),
+                courier_id=rng.choice(courier_ids) if rng.random() < 0.8 else None,
+                description=f'Benchmark parcel {index}',
+                weight='1.50',
+                dimensions='20x15x10',
+                pickup_address=f'{rng.randrange(1, 500)} Pickup Road, {city}',
+                delivery_address=f'{rng.randrange(1, 500)} Delivery Avenue, {rng.choice(CITIES)}',
+                status=STATUS_FLOW[min(updates_per_package, len(STATUS_FLOW)) - 1] if updates_per_package else 'pending',
+                is_deleted=rng.random() < deleted_ratio,
+            ))
+        created = Package.objects.bulk_create(rows)
+        # bulk_create applies auto_now_add; spread the timestamps afterwards
+        for package in created:
+            package.created_at = now - timedelta(seconds=rng.randrange(365 * 24 * 3600))
+        Package.objects.bulk_update(created, ['created_at'], batch_size=batch_size)
+        package_ids.extend(package.pk for package in created)
+
+        updates = []
+        for package in created:
+            for step in range(updates_per_package):
+                updates.append(PackageStatusUpdate(
+                    package_id=package.pk,
+                    status=STATUS_FLOW[min(step, len(STATUS_FLOW) - 1)],
+                    notes=f'Step {step}',
+                    updated_by_id=package.courier_id,
+                ))
+        PackageStatusUpdate.objects.bulk_create(updates, batch_size=batch_size)
+        Package.objects.filter(pk__in=[package.pk for package in created]).refresh_status_summary()
+    rebuild_stats()
+
+    return {
+        'customer_ids': customer_ids,
+        'courier_ids': courier_ids,
+        'package_ids': package_ids,
+    }
+
+
+def measure(func, repeat=5, warmup=1):
+    """Call func repeatedly and return the wall times in milliseconds"""
+    for _ in range(warmup):
+        func()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def percentile(values, fraction):
+    """Linear-interpolated percentile of values, fraction in [0, 1]"""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    position = (len(ordered) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def summarize(timings):
+    """Summary statistics of a list of timings in milliseconds"""
+    return {
+        'runs': len(timings),
+        'mean_ms': round(statistics.fmean(timings), 3) if timings else 0.0,
+        'p50_ms': round(percentile(timings, 0.50), 3),
+        'p95_ms': round(percentile(timings, 0.95), 3),
+        'p99_ms': round(percentile(timings, 0.99), 3),
+    }
+
+
+class RequestStats:
+    """Latency, status and query count of the requests sent to one endpoint"""
+    def __init__(self):
+        self.timings = []
+        self.queries = []
+        self.errors = 0
+        self.seconds = 0.0
+
+    def record(self, milliseconds, queries, status_code):
+        self.timings.append(milliseconds)
+        self.queries.append(queries)
+        self.seconds += milliseconds / 1000
+        if status_code >= 400:
+            self.errors += 1
+
+    def summary(self):
+        return {
+            **summarize(self.timings),
+            'requests_per_second': round(len(self.timings) / self.seconds, 1) if self.seconds else 0.0,
+            'errors': self.errors,
+            'queries_per_request': round(statistics.fmean(self.queries), 2) if self.queries else 0.0,
+            'max_queries': max(self.queries, default=0),
+        }
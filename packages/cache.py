@@ -0,0 +1,226 @@
+"""
+Snapshot cache for the public tracking endpoint.
+
+Tracking snapshots are keyed by tracking number and dropped whenever a write
+changes what the track action returns. The storage backend is pluggable via
+the PACKAGE_TRACKING_CACHE setting:
+
+    PACKAGE_TRACKING_CACHE = {
+        'BACKEND': 'packages.cache.LocMemLRUBackend',
+        'TIMEOUT': 60,
+        'OPTIONS': {'max_entries': 10000},
+    }
+
+A request that misses reads the package and fills the cache; if the package
+changes in between, the invalidation can run before the fill and the old
+snapshot would be cached for the whole timeout. Each tracking number has a
+generation counter, bumped on invalidation: a snapshot is stored with the
+generation seen by the lookup that missed, and only served while that is
+still the current generation.
+"""
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from functools import lru_cache, partial
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+DEFAULT_SETTINGS = {
+    'BACKEND': 'packages.cache.LocMemLRUBackend',
+    'TIMEOUT': 60,
+    'OPTIONS': {},
+}
+GENERATION_PREFIX = 'generation:'
+
+
+class LocMemLRUBackend:
+    """
+    Per-process cache that evicts the least recently used entry once
+    max_entries is reached and drops entries older than their timeout
+    """
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            return self._get(key)
+
+    def get_many(self, keys):
+        with self._lock:
+            return [self._get(key) for key in keys]
+
+    def set(self, key, value, timeout):
+        with self._lock:
+            self._set(key, value, timeout)
+
+    def incr(self, key, timeout):
+        with self._lock:
+            value = (self._get(key) or 0) + 1
+            self._set(key, value, timeout)
+            return value
+
+    def _get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def _set(self, key, value, timeout):
+        self._entries[key] = (time.monotonic() + timeout, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class RedisBackend:
+    """
+    Cache shared between processes, stored in Redis as JSON, so reading the
+    cache never runs code from it; datetimes are stored as tagged ISO strings.
+
+    Any client exposing the redis-py get/mget/set(ex=)/incr/expire/delete/
+    scan_iter methods can be passed in; otherwise a redis-py client is
+    created from url.
+    """
+    def __init__(self, client=None, url='redis://localhost:6379/0', key_prefix='packages:tracking:'):
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.key_prefix = key_prefix
+
+    def get(self, key):
+        return self.get_many([key])[0]
+
+    def get_many(self, keys):
+        values = self.client.mget([self.key_prefix + key for key in keys])
+        return [None if value is None else decode(value) for value in values]
+
+    def set(self, key, value, timeout):
+        self.client.set(self.key_prefix + key, encode(value), ex=timeout)
+
+    def incr(self, key, timeout):
+        value = self.client.incr(self.key_prefix + key)
+        self.client.expire(self.key_prefix + key, timeout)
+        return value
+
+    def delete(self, key):
+        self.client.delete(self.key_prefix + key)
+
+    def clear(self):
+        keys = list(self.client.scan_iter(match=self.key_prefix + '*'))
+        if keys:
+            self.client.delete(*keys)
+
+
+DATETIME_TAG = '$datetime'
+
+
+def encode_value(value):
+    if isinstance(value, datetime):
+        return {DATETIME_TAG: value.isoformat()}
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def decode_object(value):
+    if value.keys() == {DATETIME_TAG}:
+        return datetime.fromisoformat(value[DATETIME_TAG])
+    return value
+
+
+def encode(value):
+    """JSON bytes of a cached value; tuples come back as lists"""
+    return json.dumps(value, default=encode_value, separators=(',', ':')).encode()
+
+
+def decode(data):
+    return json.loads(data, object_hook=decode_object)
+
+
+class TrackingCache:
+    """Tracking snapshot cache with hit/miss counters"""
+    def __init__(self, backend, timeout):
+        self.backend = backend
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, tracking_number):
+        """
+        (snapshot, generation): the cached snapshot or None, and the
+        generation to pass to set() when filling the cache after a miss
+        """
+        entry, generation = self.backend.get_many([tracking_number, GENERATION_PREFIX + tracking_number])
+        generation = generation or 0
+        snapshot = entry['snapshot'] if entry and entry['generation'] == generation else None
+        with self._lock:
+            if snapshot is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return snapshot, generation
+
+    def set(self, tracking_number, snapshot, generation):
+        entry = {'generation': generation, 'snapshot': snapshot}
+        self.backend.set(tracking_number, entry, self.timeout)
+
+    def invalidate(self, tracking_number):
+        # The generation outlives the snapshots filled under the previous one
+        self.backend.incr(GENERATION_PREFIX + tracking_number, self.timeout * 2)
+        self.backend.delete(tracking_number)
+
+    def clear(self):
+        self.backend.clear()
+        with self._lock:
+            self.hits = self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        lookups = hits + misses
+        return {
+            'backend': type(self.backend).__name__,
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': hits / lookups if lookups else 0.0,
+        }
+
+
+@lru_cache(maxsize=None)
+def get_tracking_cache():
+    """Return the process-wide tracking cache configured in settings"""
+    config = {**DEFAULT_SETTINGS, **getattr(settings, 'PACKAGE_TRACKING_CACHE', {})}
+    backend = import_string(config['BACKEND'])(**config['OPTIONS'])
+    return TrackingCache(backend, config['TIMEOUT'])
+
+
+@receiver(setting_changed)
+def reset_tracking_cache(setting, **kwargs):
+    if setting == 'PACKAGE_TRACKING_CACHE':
+        get_tracking_cache.cache_clear()
+
+
+def invalidate_tracking_snapshot(tracking_number):
+    """Drop the snapshot for a package once the current transaction commits"""
+    transaction.on_commit(partial(get_tracking_cache().invalidate, tracking_number))
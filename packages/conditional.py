@@ -0,0 +1,108 @@
+"""
+HTTP validators (ETag and Last-Modified) for package resources.
+
+Every write to a package bumps updated_at or adds to its status history
+(status_update_count), so the pair identifies a version of the package.
+Validators are derived from the package row alone and conditional requests
+are answered before anything is serialized. Related rows embedded in a
+representation, such as a user's email, are not part of the version.
+
+ETags have the form "<id>-<updated_at in microseconds>-<history count>", with
+a suffix when the representation differs from the default JSON one (another
+renderer, sparse fieldsets, the public tracking payload, a page of history).
+If-Match on writes compares the version only, so any representation of the
+current version may be used as a precondition.
+"""
+import hashlib
+
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_etags, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+
+def package_version(package):
+    """(id, updated_at, status_update_count) of a Package or a values() row"""
+    if isinstance(package, dict):
+        return package['id'], package['updated_at'], package['status_update_count']
+    return package.pk, package.updated_at, package.status_update_count
+
+
+def get_variant(request, params=(), representation=''):
+    """
+    Name of the representation a request selects: the renderer format, the
+    given query parameters and an optional representation name
+    """
+    parts = [
+        f'{name}={value}'
+        for name in sorted(params)
+        for value in request.query_params.getlist(name)
+    ]
+    if request.accepted_renderer.format != 'json':
+        parts.append(f'format={request.accepted_renderer.format}')
+    if representation:
+        parts.append(representation)
+    if not parts:
+        return ''
+    return hashlib.md5('&'.join(parts).encode(), usedforsecurity=False).hexdigest()[:12]
+
+
+def get_version_tag(version):
+    pk, updated_at, count = version
+    microseconds = int(updated_at.timestamp()) * 1_000_000 + updated_at.microsecond
+    return f'{pk}-{microseconds}-{count}'
+
+
+def get_validators(version, variant=''):
+    """The ETag and Last-Modified timestamp of a representation of version"""
+    tag = get_version_tag(version)
+    etag = quote_etag(f'{tag}-{variant}' if variant else tag)
+    return etag, int(version[1].timestamp())
+
+
+def conditional_response(request, etag, last_modified):
+    """
+    The 304 Not Modified (or 412 Precondition Failed) response answering the
+    request's conditional headers, or None if the request should proceed
+    """
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None and response.status_code == status.HTTP_412_PRECONDITION_FAILED:
+        response = precondition_failed()
+    return response
+
+
+def precondition_failed():
+    return Response(
+        {"detail": "The package has changed since it was fetched."},
+        status=status.HTTP_412_PRECONDITION_FAILED
+    )
+
+
+def set_validators(response, etag, last_modified, private=True):
+    """
+    Add ETag and Last-Modified to a successful or 304 response. Clients may
+    store it but have to revalidate before every use.
+    """
+    if 200 <= response.status_code < 300 or response.status_code == status.HTTP_304_NOT_MODIFIED:
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        patch_cache_control(response, no_cache=True, **({'private': True} if private else {}))
+    return response
+
+
+def if_match_passes(request, version):
+    """
+    Whether an If-Match header, if any, names the current version of a
+    package (in any representation)
+    """
+    header = request.META.get('HTTP_IF_MATCH')
+    if not header:
+        return True
+    etags = parse_etags(header)
+    if etags == ['*']:
+        return True
+    tag = get_version_tag(version)
+    return any(
+        not etag.startswith('W/') and etag.strip('"').split('-')[:3] == tag.split('-')
+        for etag in etags
+    )
@@ -0,0 +1,148 @@
+"""
+Live tracking events.
+
+Status updates are pushed to Server-Sent Events subscribers (see
+views.track_stream) through an in-process broker. Writers publish after their
+transaction commits; publishing is thread-safe, so sync views running in
+worker threads can feed streams served by the ASGI event loop. Each process
+only sees its own writes, so clients that reconnect (possibly to another
+process) resume from the status history using Last-Event-ID.
+
+A subscriber that cannot keep up overflows its bounded queue and has its
+stream closed instead of buffering without limit; the client then
+reconnects and catches up from the history.
+"""
+import asyncio
+import threading
+from collections import defaultdict
+from functools import partial
+
+from django.db import transaction
+
+
+class SubscriptionOverflow(Exception):
+    """The subscriber fell too far behind and missed events"""
+
+
+class Subscription:
+    """Bounded event queue of one stream, bound to the event loop serving it"""
+    def __init__(self, tracking_numbers, maxsize):
+        self.tracking_numbers = frozenset(tracking_numbers)
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize)
+        self.overflowed = False
+
+    def deliver(self, event):
+        """Queue an event; runs on the subscription's event loop"""
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    async def get(self, timeout):
+        """Next event, or None if none arrived within timeout seconds"""
+        if self.overflowed:
+            raise SubscriptionOverflow
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class TrackingEventBroker:
+    """Fans status events out to the subscriptions of their tracking number"""
+    def __init__(self):
+        self._subscriptions = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, tracking_numbers, maxsize=100):
+        """Subscribe the running event loop to events of the tracking numbers"""
+        subscription = Subscription(tracking_numbers, maxsize)
+        with self._lock:
+            for tracking_number in subscription.tracking_numbers:
+                self._subscriptions[tracking_number].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for tracking_number in subscription.tracking_numbers:
+                subscribers = self._subscriptions.get(tracking_number)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscriptions[tracking_number]
+
+    def is_watched(self, tracking_number):
+        with self._lock:
+            return tracking_number in self._subscriptions
+
+    def publish(self, events):
+        """Deliver events to their subscribers; safe to call from any thread"""
+        for event in events:
+            with self._lock:
+                subscribers = list(self._subscriptions.get(event['tracking_number'], ()))
+            for subscription in subscribers:
+                try:
+                    subscription.loop.call_soon_threadsafe(subscription.deliver, event)
+                except RuntimeError:
+                    # The stream's event loop is gone
+                    self.unsubscribe(subscription)
+
+
+tracking_events = TrackingEventBroker()
+
+
+def status_event(status_update_id, tracking_number, status, created_at):
+    return {
+        'id': status_update_id,
+        'tracking_number': tracking_number,
+        'status': status,
+        'created_at': created_at,
+    }
+
+
+def publish_status_updates(status_updates):
+    """
+    Publish newly created PackageStatusUpdate rows (with their package loaded)
+    once the current transaction commits
+    """
+    transaction.on_commit(partial(_publish, list(status_updates)), robust=True)
+
+
+def _publish(status_updates):
+    from .models import PackageStatusUpdate
+
+    watched = [
+        update for update in status_updates
+        if tracking_events.is_watched(update.package.tracking_number)
+    ]
+    if not watched:
+        return
+    tracking_numbers = {update.package_id: update.package.tracking_number for update in watched}
+
+    # bulk_create(ignore_conflicts=True) leaves primary keys unset; look those
+    # rows up by their scan key
+    unsaved = {
+        (update.package_id, update.status, update.scanned_at)
+        for update in watched if update.pk is None
+    }
+    rows = [
+        (update.pk, update.package_id, update.status, update.created_at)
+        for update in watched if update.pk is not None
+    ]
+    if unsaved:
+        rows += [
+            (pk, package_id, status, created_at)
+            for pk, package_id, status, scanned_at, created_at in PackageStatusUpdate.objects.filter(
+                package_id__in={key[0] for key in unsaved},
+                scanned_at__in={key[2] for key in unsaved},
+            ).values_list('pk', 'package_id', 'status', 'scanned_at', 'created_at')
+            if (package_id, status, scanned_at) in unsaved
+        ]
+    rows.sort()
+    tracking_events.publish([
+        status_event(pk, tracking_numbers[package_id], status, created_at)
+        for pk, package_id, status, created_at in rows
+    ])
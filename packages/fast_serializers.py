@@ -0,0 +1,210 @@
+"""
+Read-only serializers building package representations from .values() rows.
+
+Most of the time spent rendering packages goes to DRF's per-field machinery:
+get_attribute and to_representation on every field of every row, and the
+SerializerMethodField calls for customer_email, courier_email and
+updated_by_name. The serializers here are compiled once from the DRF
+serializer they mirror: fields whose database value already is the rendered
+value are copied as is, the others keep the DRF field's to_representation, and
+method fields are read from columns annotated in SQL. The output is identical
+to the DRF serializer's.
+
+Like EagerLoadingMixin, they declare what they read with setup_eager_loading,
+which turns a Package queryset into the rows they expect.
+"""
+from collections import defaultdict
+from functools import cache
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import Case, CharField, F, Value, When, Window
+from django.db.models.functions import Concat, RowNumber
+from django.contrib.auth import get_user_model
+from rest_framework import serializers
+from rest_framework.utils.serializer_helpers import ReturnDict, ReturnList
+
+from courier_service_api.metrics import timed
+
+from .models import Package, PackageStatusUpdate
+from .serializers import PackageSerializer, PackageStatusUpdateSerializer
+
+# Field types whose to_representation returns the database value unchanged;
+# the values() row of a foreign key already holds the primary key
+PASSTHROUGH_FIELDS = (
+    serializers.BooleanField, serializers.CharField, serializers.ChoiceField,
+    serializers.IntegerField, serializers.PrimaryKeyRelatedField,
+)
+
+
+class ValuesSerializer:
+    """
+    Renders values() rows like serializer_class renders model instances.
+
+    annotations maps the method fields of serializer_class to the query
+    expressions computing them; nested_fields are set on the rows by the
+    subclass before rendering. Accepts the fields argument of the sparse
+    fieldsets (see PackageFieldsSerializer).
+    """
+    serializer_class = None
+    annotations = {}
+    nested_fields = ()
+
+    def __init__(self, instance=None, many=False, context=None, fields=None):
+        self.instance = instance
+        self.many = many
+        self.context = context or {}
+        self.fields = fields
+
+    @classmethod
+    @cache
+    def get_compiled_fields(cls):
+        """(name, to_representation or None for values copied as is) per field"""
+        compiled = []
+        for name, field in cls.serializer_class().fields.items():
+            if name in cls.annotations or name in cls.nested_fields or isinstance(field, PASSTHROUGH_FIELDS):
+                compiled.append((name, None))
+            elif isinstance(field, (serializers.DateTimeField, serializers.DecimalField)):
+                compiled.append((name, field.to_representation))
+            else:
+                raise ImproperlyConfigured(
+                    f"{cls.__name__} cannot render {cls.serializer_class.__name__}.{name} "
+                    f"({type(field).__name__}) from a values() row"
+                )
+        return compiled
+
+    @classmethod
+    def get_columns(cls, fields=None):
+        """The values() columns and annotations needed to render fields"""
+        names = [
+            name for name, _ in cls.get_compiled_fields()
+            if (fields is None or name in fields) and name not in cls.nested_fields
+        ]
+        columns = [name for name in names if name not in cls.annotations]
+        annotations = {name: cls.annotations[name] for name in names if name in cls.annotations}
+        return columns, annotations
+
+    def get_fields(self):
+        compiled = self.get_compiled_fields()
+        if self.fields is None:
+            return compiled
+        return [(name, convert) for name, convert in compiled if name in self.fields]
+
+    def to_representation(self, row, fields=None):
+        fields = self.get_fields() if fields is None else fields
+        representation = {}
+        for name, convert in fields:
+            value = row[name]
+            representation[name] = value if convert is None or value is None else convert(value)
+        return representation
+
+    @property
+    def data(self):
+        if not hasattr(self, '_data'):
+            with timed('serialize'):
+                self._data = self.render()
+        return self._data
+
+    def render(self):
+        if self.many:
+            fields = self.get_fields()
+            return ReturnList([self.to_representation(row, fields) for row in self.instance], serializer=self)
+        return ReturnDict(self.to_representation(self.instance), serializer=self)
+
+
+class PackageStatusUpdateValuesSerializer(ValuesSerializer):
+    serializer_class = PackageStatusUpdateSerializer
+    annotations = {
+        'updated_by_name': Case(
+            When(updated_by__isnull=True, then=Value(None)),
+            default=Concat('updated_by__first_name', Value(' '), 'updated_by__last_name'),
+            output_field=CharField()
+        ),
+    }
+
+    @classmethod
+    def get_history(cls, package_ids, history_limit=None):
+        """
+        Rows of the status history of the given packages, newest first and
+        grouped by package id, keeping the latest history_limit per package
+        """
+        history = PackageStatusUpdate.objects.filter(package_id__in=package_ids)
+        if history_limit is not None:
+            history = history.annotate(position=Window(
+                RowNumber(),
+                partition_by=F('package_id'),
+                order_by=[F('created_at').desc(), F('id').desc()]
+            )).filter(position__lte=history_limit)
+        columns, annotations = cls.get_columns()
+        rows = history.order_by('-created_at', '-id').values('package_id', *columns, **annotations)
+
+        grouped = defaultdict(list)
+        for row in rows:
+            grouped[row['package_id']].append(row)
+        return grouped
+
+
+class PackageValuesSerializer(ValuesSerializer):
+    """
+    PackageSerializer for list, retrieve and track. The status history of all
+    rendered packages is read with one query when .data is first accessed.
+    """
+    serializer_class = PackageSerializer
+    history_serializer_class = PackageStatusUpdateValuesSerializer
+    annotations = {
+        'customer_email': F('customer__email'),
+        'courier_email': F('courier__email'),
+    }
+    nested_fields = ('status_updates',)
+    # Columns every sparse fieldset loads: the primary key, relations used by
+    # permission checks, the fields the listing may be ordered by and the
+    # version used for ETags (see packages.conditional)
+    ALWAYS_LOADED_FIELDS = (
+        'id', 'customer', 'courier', 'status', 'created_at', 'updated_at', 'is_deleted',
+        'status_update_count'
+    )
+
+    def __init__(self, *args, history_limit=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.history_limit = history_limit
+
+    @classmethod
+    def setup_eager_loading(cls, queryset, fields=None, history_limit=None):
+        """
+        values() rows with the requested columns, plus the columns the views
+        paginate and check permissions on and any annotations (search_rank)
+        """
+        columns, annotations = cls.get_columns(fields)
+        always_loaded = [name for name in cls.ALWAYS_LOADED_FIELDS if name not in columns]
+        return queryset.values(*always_loaded, *columns, *queryset.query.annotations, **annotations)
+
+    def render(self):
+        rows = self.instance if self.many else [self.instance]
+        fields = self.get_fields()
+        if any(name == 'status_updates' for name, _ in fields):
+            history = self.history_serializer_class.get_history(
+                [row['id'] for row in rows], self.history_limit
+            )
+            history_serializer = self.history_serializer_class()
+            history_fields = history_serializer.get_fields()
+            for row in rows:
+                row['status_updates'] = [
+                    history_serializer.to_representation(update, history_fields)
+                    for update in history.get(row['id'], ())
+                ]
+
+        if self.many:
+            return ReturnList([self.to_representation(row, fields) for row in rows], serializer=self)
+        return ReturnDict(self.to_representation(self.instance, fields), serializer=self)
+
+
+def package_from_row(row):
+    """
+    An unsaved Package with the id, customer and courier of a values() row,
+    for object permission checks that compare them to the request user
+    """
+    User = get_user_model()
+    return Package(
+        id=row['id'],
+        customer=User(pk=row['customer']) if row['customer'] is not None else None,
+        courier=User(pk=row['courier']) if row['courier'] is not None else None,
+    )
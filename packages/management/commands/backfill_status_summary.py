@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max, Min
+
+from packages.models import Package
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the denormalized last_status_at, last_status_note and "
+        "status_update_count fields of every package from its status history"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help="Number of package ids updated per transaction (default: 1000)"
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        if chunk_size < 1:
+            raise CommandError("--chunk-size must be at least 1.")
+        bounds = Package.objects.aggregate(first=Min('pk'), last=Max('pk'))
+        if bounds['first'] is None:
+            self.stdout.write("No packages to backfill.")
+            return
+
+        updated = 0
+        # Walk the primary key range so each chunk is an index range scan and
+        # locks are only held for one chunk at a time.
+        for start in range(bounds['first'], bounds['last'] + 1, chunk_size):
+            with transaction.atomic():
+                updated += Package.objects.filter(
+                    pk__gte=start, pk__lt=start + chunk_size
+                ).refresh_status_summary()
+            if options['verbosity'] > 1:
+                self.stdout.write(f"Backfilled packages up to id {start + chunk_size - 1}")
+
+        self.stdout.write(self.style.SUCCESS(f"Backfilled {updated} packages."))
@@ -0,0 +1,220 @@
+import asyncio
+import json
+import time
+from itertools import cycle
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient, Client, override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from packages.benchmarks import (
+    RequestStats, counted_queries, scratch_database, seed_dataset, simulated_latency
+)
+from packages.models import Package
+
+ENDPOINTS = ['list', 'retrieve', 'track', 'update_status', 'create', 'login']
+HANDLERS = ['wsgi', 'asgi']
+LOGIN_PASSWORD = 'bench-password'
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a throwaway database and send requests to the package and accounts "
+        "endpoints through Django's WSGI and/or ASGI handler in-process, one at a "
+        "time, reporting latency percentiles, requests/sec and queries per request. "
+        "Save the --json output of two commits and pass one as --compare to the other."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--customers', type=int, default=50,
+                            help="Customers to seed (default: 50)")
+        parser.add_argument('--couriers', type=int, default=10,
+                            help="Couriers to seed (default: 10)")
+        parser.add_argument('--packages', type=int, default=5000,
+                            help="Packages to seed (default: 5000)")
+        parser.add_argument('--updates-per-package', type=int, default=2,
+                            help="Status updates per package (default: 2)")
+        parser.add_argument('--requests', type=int, default=200,
+                            help="Timed requests per endpoint and handler (default: 200)")
+        parser.add_argument('--warmup', type=int, default=10,
+                            help="Untimed requests per endpoint and handler first (default: 10)")
+        parser.add_argument('--endpoints', nargs='+', choices=ENDPOINTS, default=ENDPOINTS,
+                            help="Endpoints to benchmark (default: all)")
+        parser.add_argument('--handler', choices=[*HANDLERS, 'both'], default='wsgi',
+                            help="Request handler to go through (default: wsgi)")
+        parser.add_argument('--db-latency-ms', type=float, default=0,
+                            help="Delay added to every query to mimic a networked database (default: 0)")
+        parser.add_argument('--json', action='store_true',
+                            help="Print the results as JSON")
+        parser.add_argument('--compare', metavar='FILE',
+                            help="JSON output of an earlier run to compare the results with")
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['compare']:
+            try:
+                with open(options['compare']) as file:
+                    baseline = json.load(file)
+            except (OSError, ValueError) as error:
+                raise CommandError(f"Cannot read {options['compare']}: {error}")
+
+        handlers = HANDLERS if options['handler'] == 'both' else [options['handler']]
+        # The test clients send requests for the host 'testserver'; the query
+        # inspector is left out of the timings
+        overrides = override_settings(
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+            QUERY_INSPECTOR={**settings.QUERY_INSPECTOR, 'ENABLED': False},
+        )
+        with scratch_database(), overrides:
+            self.stderr.write(f"Seeding {options['packages']} packages...")
+            dataset = seed_dataset(
+                customers=options['customers'], couriers=options['couriers'],
+                packages=options['packages'], updates_per_package=options['updates_per_package'],
+            )
+            scenarios = self.build_scenarios(dataset)
+            results = {}
+            # One counter for the whole run: the ASGI handler's worker thread
+            # opens its connection once and keeps it between runs
+            with simulated_latency(options['db_latency_ms']) as latency, counted_queries() as queries:
+                wrappers = [wrapped for wrapped in (latency, queries.connections) if wrapped]
+                for handler in handlers:
+                    results[handler] = {}
+                    for endpoint in options['endpoints']:
+                        self.stderr.write(f"{handler} {endpoint}...")
+                        requests = scenarios[endpoint]
+                        if handler == 'wsgi':
+                            stats = self.run_wsgi(requests, queries, options['requests'], options['warmup'])
+                        else:
+                            stats = asyncio.run(self.run_asgi(
+                                requests, queries, wrappers, options['requests'], options['warmup']
+                            ))
+                        results[handler][endpoint] = stats.summary()
+
+        output = {
+            'config': {
+                name: options[name]
+                for name in ('customers', 'couriers', 'packages', 'updates_per_package',
+                             'requests', 'db_latency_ms')
+            },
+            'results': results,
+        }
+        if options['json']:
+            self.stdout.write(json.dumps(output, indent=2))
+        else:
+            self.write_report(output, baseline)
+
+    def build_scenarios(self, dataset):
+        """
+        An endless cycle of (method, url, headers, body) per endpoint, spread
+        over the seeded users and packages
+        """
+        User = get_user_model()
+        live = Package.objects.filter(is_deleted=False)
+
+        def bearer(user_id):
+            return {'Authorization': f'Bearer {AccessToken.for_user(User(pk=user_id))}'}
+
+        owned = list(live.values_list('pk', 'customer_id', 'tracking_number')[:500])
+        assigned = list(live.filter(courier__isnull=False).values_list('pk', 'courier_id', 'status')[:500])
+        customers = dataset['customer_ids']
+        login_user = User.objects.create_user(
+            email='bench-login@example.com', password=LOGIN_PASSWORD, user_role=User.CUSTOMER
+        )
+        if not owned or not assigned:
+            raise CommandError("The seeded dataset has no live (or no assigned) packages; seed more packages.")
+
+        return {
+            'list': cycle([
+                ('get', '/api/packages/', bearer(customer_id), None) for customer_id in customers
+            ]),
+            'retrieve': cycle([
+                ('get', f'/api/packages/{pk}/', bearer(customer_id), None) for pk, customer_id, _ in owned
+            ]),
+            'track': cycle([
+                ('get', f'/api/packages/track/?tracking_number={tracking_number}', {}, None)
+                for _, _, tracking_number in owned
+            ]),
+            # Recording the current status again is always a valid transition
+            'update_status': cycle([
+                ('post', f'/api/packages/{pk}/update_status/', bearer(courier_id),
+                 {'status': package_status, 'notes': 'Benchmark scan'})
+                for pk, courier_id, package_status in assigned
+            ]),
+            'create': cycle([
+                ('post', '/api/packages/', bearer(customer_id), {
+                    'description': 'Benchmark parcel',
+                    'weight': '1.50',
+                    'dimensions': '20x15x10',
+                    'pickup_address': '12 Pickup Road, Dhaka',
+                    'delivery_address': '34 Delivery Avenue, Khulna',
+                })
+                for customer_id in customers
+            ]),
+            'login': cycle([
+                ('post', '/api/accounts/login/', {},
+                 {'email': login_user.email, 'password': LOGIN_PASSWORD})
+            ]),
+        }
+
+    def run_wsgi(self, requests, queries, count, warmup):
+        client = Client()
+        stats = RequestStats()
+        for index in range(warmup + count):
+            method, url, headers, body = next(requests)
+            kwargs = {'data': body, 'content_type': 'application/json'} if body is not None else {}
+            before = queries.count
+            start = time.perf_counter()
+            response = getattr(client, method)(url, headers=headers, **kwargs)
+            elapsed = (time.perf_counter() - start) * 1000
+            if index >= warmup:
+                stats.record(elapsed, queries.count - before, response.status_code)
+        return stats
+
+    async def run_asgi(self, requests, queries, wrappers, count, warmup):
+        for wrapped in wrappers:
+            await wrapped.install_worker_thread()
+        client = AsyncClient()
+        stats = RequestStats()
+        for index in range(warmup + count):
+            method, url, headers, body = next(requests)
+            kwargs = {'data': body, 'content_type': 'application/json'} if body is not None else {}
+            before = queries.count
+            start = time.perf_counter()
+            response = await getattr(client, method)(url, headers=headers, **kwargs)
+            elapsed = (time.perf_counter() - start) * 1000
+            if index >= warmup:
+                stats.record(elapsed, queries.count - before, response.status_code)
+        return stats
+
+    def write_report(self, output, baseline=None):
+        config = output['config']
+        self.stdout.write(
+            f"{config['packages']} packages, {config['requests']} requests per endpoint, "
+            f"{config['db_latency_ms']} ms added per query"
+        )
+        for handler, endpoints in output['results'].items():
+            self.stdout.write(f"{handler}:")
+            for endpoint, result in endpoints.items():
+                line = (
+                    f"  {endpoint:<14} p50 {result['p50_ms']:>7.2f} ms, p95 {result['p95_ms']:>7.2f} ms, "
+                    f"p99 {result['p99_ms']:>7.2f} ms, {result['requests_per_second']:>7.1f} req/s, "
+                    f"{result['queries_per_request']:>5.1f} queries, errors {result['errors']}"
+                )
+                previous = (baseline or {}).get('results', {}).get(handler, {}).get(endpoint)
+                if previous:
+                    line += self.format_change(previous, result)
+                self.stdout.write(line)
+
+    def format_change(self, previous, result):
+        def change(name):
+            if not previous[name]:
+                return 'n/a'
+            return f"{(result[name] - previous[name]) / previous[name]:+.0%}"
+
+        return (
+            f" | vs baseline: p50 {change('p50_ms')}, p95 {change('p95_ms')}, "
+            f"req/s {change('requests_per_second')}, "
+            f"queries {result['queries_per_request'] - previous['queries_per_request']:+.1f}"
+        )
@@ -0,0 +1,109 @@
+import json
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from packages.benchmarks import measure, scratch_database, seed_dataset, summarize
+from packages.models import Package, PackageStatusUpdate
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a throwaway database and compare EXPLAIN plans and timings of the "
+        "PackageViewSet listing queries with and without the Meta indexes"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--packages', type=int, default=100000,
+                            help="Number of packages to seed (default: 100000)")
+        parser.add_argument('--updates-per-package', type=int, default=2,
+                            help="Status updates seeded per package (default: 2)")
+        parser.add_argument('--customers', type=int, default=1000)
+        parser.add_argument('--couriers', type=int, default=100)
+        parser.add_argument('--repeat', type=int, default=20,
+                            help="Timed runs per query (default: 20)")
+        parser.add_argument('--json', action='store_true',
+                            help="Print the results as JSON")
+
+    def handle(self, *args, **options):
+        with scratch_database():
+            self.stderr.write(f"Seeding {options['packages']} packages on {connection.vendor}...")
+            dataset = seed_dataset(
+                customers=options['customers'],
+                couriers=options['couriers'],
+                packages=options['packages'],
+                updates_per_package=options['updates_per_package'],
+            )
+            queries = self.get_queries(dataset)
+
+            results = {'vendor': connection.vendor, 'packages': options['packages'], 'queries': {}}
+            with_indexes = self.run_queries(queries, options['repeat'])
+            with self.without_indexes():
+                without_indexes = self.run_queries(queries, options['repeat'])
+            for name in queries:
+                results['queries'][name] = {
+                    'with_indexes': with_indexes[name],
+                    'without_indexes': without_indexes[name],
+                }
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+        else:
+            self.write_report(results)
+
+    def get_queries(self, dataset):
+        """The querysets PackageViewSet and PackageStatusUpdateViewSet run per role"""
+        live = Package.objects.filter(is_deleted=False)
+        ordering = ('-created_at', '-id')
+        customer_id = dataset['customer_ids'][0]
+        courier_id = dataset['courier_ids'][0]
+        package_id = dataset['package_ids'][len(dataset['package_ids']) // 2]
+        return {
+            'customer_list': live.filter(customer_id=customer_id).order_by(*ordering)[:50],
+            'courier_list': live.filter(courier_id=courier_id).order_by(*ordering)[:50],
+            'admin_list': live.order_by(*ordering)[:50],
+            'deleted_list': Package.objects.filter(is_deleted=True).order_by(*ordering)[:50],
+            'status_filter': live.filter(status='pending').order_by(*ordering)[:50],
+            'status_history': PackageStatusUpdate.objects.filter(
+                package_id=package_id
+            ).order_by(*ordering)[:50],
+        }
+
+    def run_queries(self, queries, repeat):
+        results = {}
+        for name, queryset in queries.items():
+            results[name] = {
+                'plan': queryset.explain(),
+                **summarize(measure(lambda: list(queryset.all()), repeat=repeat)),
+            }
+        return results
+
+    def without_indexes(self):
+        return _DroppedIndexes([Package, PackageStatusUpdate])
+
+    def write_report(self, results):
+        self.stdout.write(f"Database: {results['vendor']}, packages: {results['packages']}")
+        for name, result in results['queries'].items():
+            before, after = result['without_indexes'], result['with_indexes']
+            self.stdout.write('')
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            self.stdout.write(f"  without indexes: p50 {before['p50_ms']:.3f} ms, p95 {before['p95_ms']:.3f} ms")
+            self.stdout.write(f"    {before['plan']}".replace('\n', '\n    '))
+            self.stdout.write(f"  with indexes:    p50 {after['p50_ms']:.3f} ms, p95 {after['p95_ms']:.3f} ms")
+            self.stdout.write(f"    {after['plan']}".replace('\n', '\n    '))
+
+
+class _DroppedIndexes:
+    """Temporarily drop the Meta indexes of the given models"""
+    def __init__(self, models):
+        self.indexes = [(model, index) for model in models for index in model._meta.indexes]
+
+    def __enter__(self):
+        with connection.schema_editor() as schema_editor:
+            for model, index in self.indexes:
+                schema_editor.remove_index(model, index)
+
+    def __exit__(self, *exc_info):
+        with connection.schema_editor() as schema_editor:
+            for model, index in self.indexes:
+                schema_editor.add_index(model, index)
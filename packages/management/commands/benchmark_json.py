@@ -0,0 +1,86 @@
+import io
+import json
+
+from django.core.management.base import BaseCommand
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from courier_service_api import renderers
+from courier_service_api.parsers import FastJSONParser
+from courier_service_api.renderers import FastJSONRenderer
+from packages.benchmarks import measure, scratch_database, seed_dataset, summarize
+from packages.models import Package
+from packages.serializers import PackageSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a throwaway database and time rendering and parsing a PackageSerializer "
+        "list payload with DRF's JSONRenderer/JSONParser and FastJSONRenderer/FastJSONParser"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--packages', type=int, default=1000,
+                            help="Packages in the payload (default: 1000)")
+        parser.add_argument('--updates-per-package', type=int, default=3,
+                            help="Status updates per package (default: 3)")
+        parser.add_argument('--repeat', type=int, default=20,
+                            help="Timed runs per implementation (default: 20)")
+        parser.add_argument('--json', action='store_true',
+                            help="Print the results as JSON")
+
+    def handle(self, *args, **options):
+        with scratch_database():
+            self.stderr.write(f"Seeding {options['packages']} packages...")
+            seed_dataset(
+                customers=10, couriers=5, packages=options['packages'],
+                updates_per_package=options['updates_per_package'],
+            )
+            queryset = PackageSerializer.setup_eager_loading(Package.objects.all())
+            data = PackageSerializer(queryset, many=True).data
+
+        body = JSONRenderer().render(data)
+        if FastJSONRenderer().render(data) != body:
+            self.stderr.write(self.style.WARNING("FastJSONRenderer output differs from JSONRenderer's"))
+
+        context = {'encoding': 'utf-8'}
+        implementations = {
+            'render': {
+                'JSONRenderer': lambda: JSONRenderer().render(data),
+                'FastJSONRenderer': lambda: FastJSONRenderer().render(data),
+            },
+            'parse': {
+                'JSONParser': lambda: JSONParser().parse(io.BytesIO(body), parser_context=context),
+                'FastJSONParser': lambda: FastJSONParser().parse(io.BytesIO(body), parser_context=context),
+            },
+        }
+        results = {
+            'packages': options['packages'],
+            'payload_bytes': len(body),
+            'orjson': renderers.orjson is not None,
+        }
+        for operation, functions in implementations.items():
+            results[operation] = {
+                name: summarize(measure(function, repeat=options['repeat']))
+                for name, function in functions.items()
+            }
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+        else:
+            self.write_report(results)
+
+    def write_report(self, results):
+        self.stdout.write(
+            f"{results['packages']} packages, {results['payload_bytes'] / 1024:.0f} KiB payload, "
+            f"orjson {'installed' if results['orjson'] else 'not installed'}"
+        )
+        for operation in ('render', 'parse'):
+            baseline, fast = results[operation].values()
+            for name, result in results[operation].items():
+                self.stdout.write(
+                    f"  {name:<17} mean {result['mean_ms']:>8.2f} ms, "
+                    f"p50 {result['p50_ms']:.2f} ms, p95 {result['p95_ms']:.2f} ms"
+                )
+            if fast['mean_ms']:
+                self.stdout.write(f"  {operation} speedup: {baseline['mean_ms'] / fast['mean_ms']:.1f}x")
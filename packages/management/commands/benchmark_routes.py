@@ -0,0 +1,98 @@
+import json
+import math
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from packages.benchmarks import summarize
+from packages.routing import CITY_COORDINATES, DELIVERY, PICKUP, Stop, plan_route, project
+
+
+class Command(BaseCommand):
+    help = (
+        "Time route planning on random instances around one city and compare the "
+        "planned distance with visiting packages in assignment order"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--stops', type=int, nargs='+', default=[50, 100, 200, 500],
+                            help="Stops per instance, one run per value (default: 50 100 200 500)")
+        parser.add_argument('--instances', type=int, default=5,
+                            help="Random instances per size (default: 5)")
+        parser.add_argument('--radius-km', type=float, default=10.0,
+                            help="Radius around the city centre stops are spread over (default: 10)")
+        parser.add_argument('--time-budget-ms', type=int, default=2000,
+                            help="Time budget of each plan (default: 2000)")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--json', action='store_true',
+                            help="Print the results as JSON")
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        results = []
+        for size in options['stops']:
+            timings, assigned, nearest, planned, complete = [], [], [], [], 0
+            for _ in range(options['instances']):
+                stops = self.random_stops(rng, size, options['radius_km'])
+                start = time.perf_counter()
+                route = plan_route(stops, time_budget_ms=options['time_budget_ms'])
+                timings.append((time.perf_counter() - start) * 1000)
+                assigned.append(self.path_length(stops))
+                nearest.append(route.initial_distance_km)
+                planned.append(route.distance_km)
+                complete += route.complete
+            results.append({
+                'stops': size,
+                'instances': options['instances'],
+                'plan': summarize(timings),
+                'assignment_order_km': round(sum(assigned) / len(assigned), 3),
+                'nearest_neighbour_km': round(sum(nearest) / len(nearest), 3),
+                'two_opt_km': round(sum(planned) / len(planned), 3),
+                'complete': complete,
+            })
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+        else:
+            self.write_report(results)
+
+    def random_stops(self, rng, size, radius_km):
+        """
+        size stops around Dhaka: packages in assignment order, about half of
+        them pending (a pickup and a delivery), the rest only to deliver
+        """
+        latitude, longitude = CITY_COORDINATES['dhaka']
+
+        def point():
+            north, east = (rng.uniform(-radius_km, radius_km) for _ in range(2))
+            return (
+                latitude + math.degrees(north / 6371),
+                longitude + math.degrees(east / 6371 / math.cos(math.radians(latitude))),
+            )
+
+        stops, package = [], 0
+        while len(stops) < size:
+            if size - len(stops) > 1 and rng.random() < 0.5:
+                stops.append(Stop(package, PICKUP, '', point()))
+            stops.append(Stop(package, DELIVERY, '', point()))
+            package += 1
+        return stops
+
+    def path_length(self, stops):
+        coordinates = project([stop.point for stop in stops])
+        return sum(math.dist(a, b) for a, b in zip(coordinates, coordinates[1:]))
+
+    def write_report(self, results):
+        for result in results:
+            plan = result['plan']
+            saving = 1 - result['two_opt_km'] / result['assignment_order_km']
+            self.stdout.write(
+                f"{result['stops']:>4} stops: plan mean {plan['mean_ms']:.1f} ms, p95 {plan['p95_ms']:.1f} ms, "
+                f"{result['complete']}/{result['instances']} converged"
+            )
+            self.stdout.write(
+                f"      assignment order {result['assignment_order_km']:.1f} km, "
+                f"nearest neighbour {result['nearest_neighbour_km']:.1f} km, "
+                f"2-opt {result['two_opt_km']:.1f} km ({saving:.0%} shorter)"
+            )
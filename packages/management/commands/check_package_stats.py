@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from packages.stats import check_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the stored per-courier and per-customer status counts and daily "
+        "delivered counts with counts computed from the packages. Exits with an "
+        "error listing the differences if they do not match; run "
+        "rebuild_package_stats to fix them."
+    )
+
+    def handle(self, *args, **options):
+        differences = check_stats()
+        for table, key, stored, expected in differences:
+            self.stdout.write(
+                f"{table} {', '.join(str(part) for part in key)}: stored {stored}, expected {expected}"
+            )
+        if differences:
+            raise CommandError(f"{len(differences)} package count(s) do not match.")
+        self.stdout.write(self.style.SUCCESS("The package counts match."))
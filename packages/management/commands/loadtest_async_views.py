@@ -0,0 +1,137 @@
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import ThreadSensitiveContext
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient, Client, override_settings
+from django.urls import include, path
+from rest_framework_simplejwt.tokens import AccessToken
+
+from packages.async_views import AsyncPackageViewSet
+from packages.benchmarks import scratch_database, seed_dataset, simulated_latency, summarize
+from packages.models import Package
+from packages.urls import get_urlpatterns
+
+
+class AsyncURLConf:
+    urlpatterns = [
+        path('api/packages/', include(get_urlpatterns(AsyncPackageViewSet))),
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a throwaway database and compare how many concurrent list, retrieve "
+        "and track requests one worker serves with the sync PackageViewSet and with "
+        "AsyncPackageViewSet"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--packages', type=int, default=2000,
+                            help="Number of packages to seed (default: 2000)")
+        parser.add_argument('--requests', type=int, default=300,
+                            help="Requests sent to each implementation (default: 300)")
+        parser.add_argument('--concurrency', type=int, default=50,
+                            help="Requests in flight on the async worker (default: 50)")
+        parser.add_argument('--threads', type=int, default=1,
+                            help="Threads of the sync worker (default: 1, like a gunicorn sync worker)")
+        parser.add_argument('--db-latency-ms', type=float, default=10,
+                            help="Delay added to every query to mimic a networked database (default: 10)")
+        parser.add_argument('--json', action='store_true',
+                            help="Print the results as JSON")
+
+    def handle(self, *args, **options):
+        # The test clients send requests for the host 'testserver'
+        allowed_hosts = override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'])
+        with scratch_database(), allowed_hosts:
+            self.stderr.write(f"Seeding {options['packages']} packages...")
+            dataset = seed_dataset(customers=10, couriers=5, packages=options['packages'])
+            requests = self.build_requests(dataset, options['requests'])
+            with simulated_latency(options['db_latency_ms']):
+                sync = self.run_sync(requests, options['threads'])
+                async_ = asyncio.run(self.run_async(requests, options['concurrency']))
+
+        results = {
+            'requests': len(requests),
+            'db_latency_ms': options['db_latency_ms'],
+            'sync': {'concurrency': options['threads'], **sync},
+            'async': {'concurrency': options['concurrency'], **async_},
+        }
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+        else:
+            self.write_report(results)
+
+    def build_requests(self, dataset, count):
+        """A mix of an authenticated list and retrieve and a public track per customer"""
+        User = get_user_model()
+        templates = []
+        for customer in User.objects.filter(pk__in=dataset['customer_ids']):
+            package = Package.objects.filter(customer=customer, is_deleted=False).first()
+            if package is None:
+                continue
+            headers = {'Authorization': f'Bearer {AccessToken.for_user(customer)}'}
+            templates += [
+                ('/api/packages/', headers),
+                (f'/api/packages/{package.pk}/', headers),
+                (f'/api/packages/track/?tracking_number={package.tracking_number}', {}),
+            ]
+        return [templates[index % len(templates)] for index in range(count)]
+
+    def run_sync(self, requests, threads):
+        def send(request):
+            url, headers = request
+            start = time.perf_counter()
+            response = Client().get(url, headers=headers)
+            return (time.perf_counter() - start) * 1000, response.status_code
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            outcomes = list(executor.map(send, requests))
+        return self.summarize(outcomes, time.perf_counter() - start)
+
+    async def run_async(self, requests, concurrency):
+        client = AsyncClient()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def send(request):
+            url, headers = request
+            async with semaphore:
+                # Like ASGIHandler, give each request its own thread for the
+                # ORM calls it makes, so they do not queue behind each other
+                async with ThreadSensitiveContext():
+                    start = time.perf_counter()
+                    response = await client.get(url, headers=headers)
+                    return (time.perf_counter() - start) * 1000, response.status_code
+
+        with override_settings(ROOT_URLCONF=AsyncURLConf):
+            start = time.perf_counter()
+            outcomes = await asyncio.gather(*(send(request) for request in requests))
+            return self.summarize(outcomes, time.perf_counter() - start)
+
+    def summarize(self, outcomes, elapsed):
+        timings = [timing for timing, _ in outcomes]
+        return {
+            'seconds': round(elapsed, 3),
+            'requests_per_second': round(len(outcomes) / elapsed, 1) if elapsed else 0.0,
+            'errors': sum(1 for _, status_code in outcomes if status_code != 200),
+            **summarize(timings),
+        }
+
+    def write_report(self, results):
+        self.stdout.write(
+            f"{results['requests']} requests per implementation, "
+            f"{results['db_latency_ms']} ms added per query"
+        )
+        for name in ('sync', 'async'):
+            result = results[name]
+            self.stdout.write(
+                f"  {name:<5} concurrency {result['concurrency']:>4}: "
+                f"{result['requests_per_second']:>8.1f} req/s, "
+                f"p50 {result['p50_ms']:.1f} ms, p95 {result['p95_ms']:.1f} ms, "
+                f"p99 {result['p99_ms']:.1f} ms, errors {result['errors']}"
+            )
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from packages.stats import rebuild_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the per-courier and per-customer status counts and the daily "
+        "delivered counts from the packages, replacing the stored counts"
+    )
+
+    def handle(self, *args, **options):
+        rebuild_stats()
+        self.stdout.write(self.style.SUCCESS("Rebuilt the package counts."))
@@ -0,0 +1,55 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.utils.encoders import JSONEncoder
+
+from packages.analytics import PERCENTILES, STAGES, get_delivery_times
+from packages.serializers import PackageDeliveryStatsSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Print percentiles of the time packages delivered in a window of days spent "
+        "pending, in transit and in total, overall, per courier and per day. The "
+        "results are recomputed and stored in the cache the delivery_times endpoint "
+        "reads, so this also warms it."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help="First day, YYYY-MM-DD (default: PACKAGE_STATS_DEFAULT_DAYS ago)")
+        parser.add_argument('--until', help="Last day, YYYY-MM-DD (default: today)")
+        parser.add_argument('--json', action='store_true',
+                            help="Print the results as JSON")
+
+    def handle(self, *args, **options):
+        serializer = PackageDeliveryStatsSerializer(data={
+            key: options[key] for key in ('since', 'until') if options[key]
+        })
+        if not serializer.is_valid():
+            raise CommandError(json.dumps(serializer.errors))
+        results = get_delivery_times(**serializer.validated_data, refresh=True)
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, cls=JSONEncoder, indent=2))
+        else:
+            self.write_report(results)
+
+    def write_report(self, results):
+        self.stdout.write(
+            f"Packages delivered {results['since']} to {results['until']}: "
+            f"{results['overall']['packages']} (hours per stage)"
+        )
+        columns = [f'{stage} p{q}' for stage in STAGES for q in PERCENTILES]
+        header = f"{'':<28} {'packages':>8} " + ' '.join(f'{column:>15}' for column in columns)
+        for title, label, rows in [
+            ('Overall', lambda row: 'all', [results['overall']]),
+            ('By courier', lambda row: row['courier_email'] or 'unassigned', results['by_courier']),
+            ('By day', lambda row: str(row['day']), results['by_day']),
+        ]:
+            self.stdout.write(f"\n{title}\n{header}")
+            for row in rows:
+                values = [row[stage][f'p{q}'] for stage in STAGES for q in PERCENTILES]
+                self.stdout.write(
+                    f"{label(row):<28} {row['packages']:>8} "
+                    + ' '.join(f"{'-' if value is None else value:>15}" for value in values)
+                )
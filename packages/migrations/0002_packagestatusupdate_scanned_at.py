@@ -0,0 +1,24 @@
+# Generated by Django 5.1.7 on 2026-10-17 01:04
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('packages', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='packagestatusupdate',
+            name='scanned_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='packagestatusupdate',
+            constraint=models.UniqueConstraint(condition=models.Q(('scanned_at__isnull', False)), fields=('package', 'status', 'scanned_at'), name='unique_package_scan'),
+        ),
+    ]
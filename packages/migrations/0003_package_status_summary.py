@@ -0,0 +1,28 @@
+# Generated by Django 5.1.7 on 2026-10-17 01:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('packages', '0002_packagestatusupdate_scanned_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='package',
+            name='last_status_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='package',
+            name='last_status_note',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='package',
+            name='status_update_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
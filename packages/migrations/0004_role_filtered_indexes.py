@@ -0,0 +1,45 @@
+# Generated by Django 5.1.7 on 2026-10-17 01:07
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('packages', '0003_package_status_summary'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='packagestatusupdate',
+            name='package',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='status_updates', to='packages.package'),
+        ),
+        migrations.AddIndex(
+            model_name='package',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['customer', '-created_at', '-id'], name='pkg_customer_live_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='package',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['courier', '-created_at', '-id'], name='pkg_courier_live_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='package',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['status', '-created_at', '-id'], name='pkg_status_live_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='package',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['-created_at', '-id'], name='pkg_live_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='package',
+            index=models.Index(condition=models.Q(('is_deleted', True)), fields=['-created_at', '-id'], name='pkg_deleted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='packagestatusupdate',
+            index=models.Index(fields=['package', '-created_at', '-id'], name='pkg_update_created_idx'),
+        ),
+    ]
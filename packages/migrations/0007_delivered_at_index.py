@@ -0,0 +1,19 @@
+# Generated by Django 5.1.7 on 2026-10-17 01:58
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('packages', '0006_package_stats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='package',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['delivered_at'], name='pkg_delivered_live_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.1.7 on 2026-10-17 02:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('packages', '0007_delivered_at_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PackageSearchEntry',
+            fields=[
+                ('package', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_entry', serialize=False, to='packages.package')),
+                ('description', models.TextField()),
+                ('pickup_address', models.TextField()),
+                ('delivery_address', models.TextField()),
+            ],
+            options={
+                'db_table': 'packages_package_fts',
+                'managed': False,
+            },
+        ),
+    ]
@@ -1,6 +1,54 @@
-import uuid
-from django.db import models
+from collections import defaultdict
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, models, transaction
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
 from django.conf import settings
+from django.utils import timezone
+
+from .tracking import tracking_numbers
+
+
+class PackageQuerySet(models.QuerySet):
+    def refresh_status_summary(self):
+        """
+        Recompute the denormalized latest-status fields of the selected packages
+        from their status history in a single UPDATE
+        """
+        history = PackageStatusUpdate.objects.filter(package=OuterRef('pk')).order_by()
+        latest = history.order_by('-created_at', '-id')
+        count = history.values('package').annotate(count=Count('pk')).values('count')
+        return self.update(
+            last_status_at=Subquery(latest.values('created_at')[:1]),
+            last_status_note=Coalesce(Subquery(latest.values('notes')[:1]), Value('')),
+            status_update_count=Coalesce(Subquery(count), Value(0)),
+        )
+    
+    def transition(self, status):
+        """
+        Move the selected packages that may reach status (see
+        Package.STATUS_TRANSITIONS) to it. The rows are locked and read, so
+        the status each package leaves is known (for packages.stats), then
+        moved with a single conditional UPDATE. Returns {previous status:
+        [ids of the packages moved from it]}.
+        """
+        sources = Package.statuses_leading_to(status)
+        moved = defaultdict(list)
+        rows = self.filter(status__in=sources).select_for_update().order_by().values_list('pk', 'status')
+        for pk, previous in rows:
+            moved[previous].append(pk)
+        if not moved:
+            return {}
+        now = timezone.now()
+        changes = {'status': status, 'updated_at': now}
+        if status == 'delivered':
+            changes['delivered_at'] = Coalesce('delivered_at', Value(now))
+        Package.objects.filter(
+            pk__in=[pk for ids in moved.values() for pk in ids], status__in=sources
+        ).update(**changes)
+        return dict(moved)
+
 
 class Package(models.Model):
     """
@@ -12,6 +60,15 @@ class Package(models.Model):
         ('delivered', 'Delivered'),
     )
     
+    # Statuses a package may move to from each status. A package never moves
+    # backwards; recording its current status again is allowed so that a scan
+    # can add a note.
+    STATUS_TRANSITIONS = {
+        'pending': ('pending', 'in_transit', 'delivered'),
+        'in_transit': ('in_transit', 'delivered'),
+        'delivered': ('delivered',),
+    }
+    
     tracking_number = models.CharField(max_length=50, unique=True, editable=False)
     customer = models.ForeignKey(
         settings.AUTH_USER_MODEL, 
@@ -42,17 +99,129 @@ class Package(models.Model):
     is_deleted = models.BooleanField(default=False)
     deleted_at = models.DateTimeField(null=True, blank=True)
     
+    # Set when the package is first marked delivered, see PackageQuerySet.transition
+    delivered_at = models.DateTimeField(null=True, blank=True)
+    
+    # Denormalized from the status history, see PackageQuerySet.refresh_status_summary
+    last_status_at = models.DateTimeField(null=True, blank=True)
+    last_status_note = models.TextField(blank=True, default='')
+    status_update_count = models.PositiveIntegerField(default=0)
+    
+    objects = PackageQuerySet.as_manager()
+    
+    STATUS_SUMMARY_FIELDS = ['last_status_at', 'last_status_note', 'status_update_count']
+    
+    class Meta:
+        # Match the role-filtered listings in PackageViewSet.get_queryset and
+        # the (-created_at, -id) key used by cursor pagination. The indexes are
+        # partial on is_deleted because boolean filters compile to
+        # "NOT is_deleted" / "is_deleted", which databases cannot use as an
+        # index equality on a leading column.
+        indexes = [
+            models.Index(
+                fields=['customer', '-created_at', '-id'],
+                condition=models.Q(is_deleted=False),
+                name='pkg_customer_live_idx'
+            ),
+            models.Index(
+                fields=['courier', '-created_at', '-id'],
+                condition=models.Q(is_deleted=False),
+                name='pkg_courier_live_idx'
+            ),
+            models.Index(
+                fields=['status', '-created_at', '-id'],
+                condition=models.Q(is_deleted=False),
+                name='pkg_status_live_idx'
+            ),
+            models.Index(
+                fields=['-created_at', '-id'],
+                condition=models.Q(is_deleted=False),
+                name='pkg_live_idx'
+            ),
+            models.Index(
+                fields=['-created_at', '-id'],
+                condition=models.Q(is_deleted=True),
+                name='pkg_deleted_idx'
+            ),
+            # Delivery-time analytics (packages.analytics) select by day of delivery
+            models.Index(
+                fields=['delivered_at'],
+                condition=models.Q(is_deleted=False),
+                name='pkg_delivered_live_idx'
+            ),
+        ]
+    
     def __str__(self):
         return f"Package {self.tracking_number} - {self.status}"
     
+    TRACKING_NUMBER_ATTEMPTS = 3
+    
     def save(self, *args, **kwargs):
-        if not self.tracking_number:
+        if self.tracking_number:
+            return super().save(*args, **kwargs)
+        for attempt in range(1, self.TRACKING_NUMBER_ATTEMPTS + 1):
             self.tracking_number = self.generate_tracking_number()
-        super().save(*args, **kwargs)
+            try:
+                with transaction.atomic():
+                    return super().save(*args, **kwargs)
+            except IntegrityError:
+                # Only a taken tracking number is worth retrying; it means the
+                # process's sequence block was reserved in a rolled back
+                # transaction, so start a fresh block
+                taken = Package.objects.filter(tracking_number=self.tracking_number).exists()
+                self.tracking_number = ''
+                if not taken or attempt == self.TRACKING_NUMBER_ATTEMPTS:
+                    raise
+                tracking_numbers.discard_block()
     
     def generate_tracking_number(self):
-        """Generate a unique tracking number for the package"""
-        return f"PKG-{uuid.uuid4().hex[:8].upper()}"
+        """Allocate a new tracking number for the package"""
+        return self.generate_tracking_numbers(1)[0]
+    
+    @classmethod
+    def generate_tracking_numbers(cls, count):
+        """Allocate count distinct, increasing tracking numbers, see packages.tracking"""
+        return tracking_numbers.allocate(count)
+    
+    @classmethod
+    def statuses_leading_to(cls, status):
+        """The statuses from which a package may move to status"""
+        return [source for source, targets in cls.STATUS_TRANSITIONS.items() if status in targets]
+    
+    def check_transition(self, status):
+        """Raise ValidationError if the package cannot move to status"""
+        if status not in self.STATUS_TRANSITIONS[self.status]:
+            raise ValidationError(
+                f"A {self.get_status_display().lower()} package cannot be marked {status}.",
+                code='invalid_transition'
+            )
+    
+    def transition_to(self, status):
+        """
+        Move the package to status with a conditional UPDATE of status,
+        updated_at and delivered_at only, so a concurrent writer's change is
+        neither overwritten nor undone. Returns the status the package moved
+        from. Raises ValidationError if the package, as currently stored,
+        cannot move to status.
+        """
+        moved = Package.objects.filter(pk=self.pk).transition(status)
+        self.refresh_from_db(fields=['status', 'updated_at', 'delivered_at'])
+        if not moved:
+            self.check_transition(status)
+        return next(iter(moved), self.status)
+    
+    def lock_for_update(self):
+        """
+        Lock the package's row until the end of the transaction and reload it,
+        so fields another writer changed since the package was read (a scan
+        moving its status, say) are neither reported stale nor written back
+        """
+        self.refresh_from_db(from_queryset=Package.objects.select_for_update())
+    
+    def refresh_status_summary(self):
+        """Update the denormalized status fields in the database and on this instance"""
+        Package.objects.filter(pk=self.pk).refresh_status_summary()
+        self.refresh_from_db(fields=self.STATUS_SUMMARY_FIELDS)
 
 
 class PackageStatusUpdate(models.Model):
@@ -62,7 +231,8 @@ class PackageStatusUpdate(models.Model):
     package = models.ForeignKey(
         Package, 
         on_delete=models.CASCADE, 
-        related_name='status_updates'
+        related_name='status_updates',
+        db_index=False
     )
     status = models.CharField(max_length=20, choices=Package.STATUS_CHOICES)
     notes = models.TextField(blank=True, null=True)
@@ -71,10 +241,97 @@ class PackageStatusUpdate(models.Model):
         on_delete=models.SET_NULL, 
         null=True
     )
+    # Time the scan happened on the courier's device, for offline batch syncs
+    scanned_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Also serves as the package foreign key index
+            models.Index(fields=['package', '-created_at', '-id'], name='pkg_update_created_idx'),
+        ]
+        constraints = [
+            # Replaying a scanner batch must not record the same scan twice
+            models.UniqueConstraint(
+                fields=['package', 'status', 'scanned_at'],
+                condition=models.Q(scanned_at__isnull=False),
+                name='unique_package_scan'
+            ),
+        ]
     
     def __str__(self):
-        return f"{self.package.tracking_number} - {self.status} - {self.created_at}"
\ No newline at end of file
+        return f"{self.package.tracking_number} - {self.status} - {self.created_at}"
+
+
+class TrackingSequence(models.Model):
+    """
+    Per-day counter from which processes reserve blocks of tracking number
+    sequence values, see packages.tracking
+    """
+    day = models.DateField(unique=True)
+    last_value = models.PositiveBigIntegerField(default=0)
+    
+    def __str__(self):
+        return f"{self.day} - {self.last_value}"
+
+class CourierStatusCount(models.Model):
+    """Live packages assigned to a courier per status, see packages.stats"""
+    courier = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    status = models.CharField(max_length=20, choices=Package.STATUS_CHOICES)
+    count = models.IntegerField(default=0)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['courier', 'status'], name='unique_courier_status_count'),
+        ]
+    
+    def __str__(self):
+        return f"{self.courier_id} - {self.status} - {self.count}"
+
+
+class CustomerStatusCount(models.Model):
+    """Live packages of a customer per status, see packages.stats"""
+    customer = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    status = models.CharField(max_length=20, choices=Package.STATUS_CHOICES)
+    count = models.IntegerField(default=0)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['customer', 'status'], name='unique_customer_status_count'),
+        ]
+    
+    def __str__(self):
+        return f"{self.customer_id} - {self.status} - {self.count}"
+
+
+class DailyDeliveredCount(models.Model):
+    """Live delivered packages per day of delivery, see packages.stats"""
+    day = models.DateField(unique=True)
+    count = models.IntegerField(default=0)
+    
+    def __str__(self):
+        return f"{self.day} - {self.count}"
+
+
+class PackageSearchEntry(models.Model):
+    """
+    Row of the SQLite FTS5 index over package text (see packages.search),
+    whose table the search backend creates itself. Declared so searches can
+    join the index once instead of looking up every package's rank.
+    """
+    package = models.OneToOneField(
+        Package,
+        on_delete=models.DO_NOTHING,
+        primary_key=True,
+        db_column='rowid',
+        db_constraint=False,
+        related_name='search_entry'
+    )
+    description = models.TextField()
+    pickup_address = models.TextField()
+    delivery_address = models.TextField()
+    
+    class Meta:
+        managed = False
+        db_table = 'packages_package_fts'
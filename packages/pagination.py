@@ -0,0 +1,165 @@
+import datetime
+import decimal
+import json
+import uuid
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, Cursor
+
+
+def _encode_value(value):
+    """JSON encoder hook keeping full precision of keyset values"""
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, (decimal.Decimal, uuid.UUID)):
+        return str(value)
+    raise TypeError(f"Cannot encode {type(value).__name__} in a cursor")
+
+
+def _invert(ordering):
+    return ordering[1:] if ordering.startswith('-') else f'-{ordering}'
+
+
+class KeysetCursorPagination(CursorPagination):
+    """
+    Cursor pagination over a composite key.
+
+    DRF's CursorPagination only compares the first ordering field and uses an
+    offset to step over ties. Here the cursor stores the value of every ordering
+    field, with the primary key appended as a tie-breaker, and a page is
+    selected with a lexicographic WHERE clause on that key. Page N therefore
+    costs the same as page 1, and rows inserted while a client is paging never
+    shift the pages it has not read yet.
+
+    Ordering fields must be non-nullable, as with DRF's CursorPagination.
+    """
+    ordering = ('-created_at',)
+    page_size = getattr(settings, 'PACKAGES_PAGE_SIZE', 50)
+    page_size_query_param = 'page_size'
+    max_page_size = getattr(settings, 'PACKAGES_MAX_PAGE_SIZE', 500)
+
+    def get_ordering(self, request, queryset, view):
+        """Return the requested ordering with the primary key as tie-breaker"""
+        ordering = super().get_ordering(request, queryset, view)
+        if not any(field.lstrip('-') in ('pk', 'id') for field in ordering):
+            ordering += ('-id' if ordering[0].startswith('-') else 'id',)
+        return ordering
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self.get_page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+        return self.set_page(list(queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """paginate_queryset fetching the page with the async ORM"""
+        queryset = self.get_page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+        return self.set_page([item async for item in queryset])
+
+    def get_page_queryset(self, queryset, request, view=None):
+        """The queryset of the requested page plus one row to detect more data"""
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+
+        ordering = [_invert(field) for field in self.ordering] if self._reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if self.cursor:
+            values = self._decode_position(self.cursor.position, queryset.model)
+            queryset = queryset.filter(self._keyset_filter(ordering, values))
+        return queryset[:self.page_size + 1]
+
+    def set_page(self, results):
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        if self._reverse:
+            self.page.reverse()
+
+        # A cursor in one direction means there is data in the other; the far
+        # side is only known from the extra row fetched above.
+        if self._reverse:
+            self.has_next, self.has_previous = self.cursor is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.cursor is not None
+        return self.page
+
+    @property
+    def _reverse(self):
+        return self.cursor.reverse if self.cursor else False
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        position = self._encode_position(self.page[-1])
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=position))
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        position = self._encode_position(self.page[0])
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=position))
+
+    def get_html_context(self):
+        return {
+            'previous_url': self.get_previous_link(),
+            'next_url': self.get_next_link(),
+        }
+
+    def _get_value(self, item, field_name):
+        if field_name == 'pk':
+            field_name = 'id'
+        if isinstance(item, dict):
+            return item[field_name]
+        return getattr(item, field_name)
+
+    def _encode_position(self, item):
+        values = [self._get_value(item, field.lstrip('-')) for field in self.ordering]
+        return json.dumps(values, default=_encode_value, separators=(',', ':'))
+
+    def _decode_position(self, position, model):
+        """Turn the cursor position back into typed values for the key fields"""
+        try:
+            values = json.loads(position)
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        decoded = []
+        for field_name, value in zip(self.ordering, values):
+            field_name = field_name.lstrip('-')
+            try:
+                field = model._meta.pk if field_name == 'pk' else model._meta.get_field(field_name)
+            except FieldDoesNotExist:
+                # Annotations are stored as plain JSON values
+                decoded.append(value)
+                continue
+            try:
+                decoded.append(field.to_python(value))
+            except ValidationError:
+                raise NotFound(self.invalid_cursor_message)
+        return decoded
+
+    def _keyset_filter(self, ordering, values):
+        """
+        Build the lexicographic "row comes after the cursor" condition, e.g. for
+        (-created_at, -id): created_at < c OR (created_at = c AND id < i)
+        """
+        condition = Q()
+        equal = {}
+        for field, value in zip(ordering, values):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= Q(**equal, **{f'{name}__{lookup}': value})
+            equal[name] = value
+        return condition
@@ -0,0 +1,242 @@
+"""
+Route planning for a courier's open packages.
+
+Every open package gives a delivery stop, and a pending package also a
+pickup stop that has to come before it. Addresses are located by the
+geocoder configured in PACKAGE_GEOCODER, by default a local lookup table.
+
+plan_route() builds a stop order with the nearest neighbour heuristic and
+then improves it with 2-opt until no move shortens the route or the time
+budget runs out. Routes are open paths (the courier does not return) that
+start at an optional starting point. Distances are straight lines on an
+equirectangular projection, which is accurate to well under 1% over the
+extent of a city or region.
+"""
+import hashlib
+import math
+import time
+from collections import namedtuple
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from .assignment import pickup_area
+
+PICKUP = 'pickup'
+DELIVERY = 'delivery'
+
+EARTH_RADIUS_KM = 6371.0088
+
+# Fallback coordinates of the cities used by the benchmark dataset
+CITY_COORDINATES = {
+    'dhaka': (23.8103, 90.4125),
+    'chittagong': (22.3569, 91.7832),
+    'khulna': (22.8456, 89.5403),
+    'rajshahi': (24.3745, 88.6042),
+    'sylhet': (24.8949, 91.8687),
+    'barisal': (22.7010, 90.3535),
+    'rangpur': (25.7439, 89.2752),
+    'mymensingh': (24.7471, 90.4203),
+}
+
+DEFAULT_SETTINGS = {
+    'BACKEND': 'packages.routing.LookupTableGeocoder',
+    'OPTIONS': {},
+}
+
+# A stop of a route. package is the Package (or any hashable key) the stop
+# belongs to, kind PICKUP or DELIVERY and point (latitude, longitude).
+Stop = namedtuple('Stop', ['package', 'kind', 'address', 'point'])
+Route = namedtuple('Route', ['stops', 'distance_km', 'initial_distance_km', 'complete'])
+
+
+def normalize_address(address):
+    return ' '.join(address.lower().split())
+
+
+class LookupTableGeocoder:
+    """
+    Locates addresses from a table of {address or area: (latitude, longitude)}.
+    An address matches its own entry or, failing that, the entry of its area
+    (see packages.assignment.pickup_area), in which case it is placed within
+    jitter_km of the area's point at an offset derived from the address, so
+    distinct addresses in one city get distinct, stable points.
+    """
+    def __init__(self, table=None, jitter_km=2.0):
+        table = CITY_COORDINATES if table is None else table
+        self.table = {normalize_address(key): tuple(point) for key, point in table.items()}
+        self.jitter_km = jitter_km
+
+    def geocode(self, address):
+        """(latitude, longitude) of address, or None if it cannot be located"""
+        key = normalize_address(address)
+        if key in self.table:
+            return self.table[key]
+        point = self.table.get(pickup_area(address))
+        if point is None or not self.jitter_km:
+            return point
+        digest = hashlib.md5(key.encode(), usedforsecurity=False).digest()
+        east, north = (int.from_bytes(digest[offset:offset + 4], 'big') / 0xFFFFFFFF * 2 - 1 for offset in (0, 4))
+        latitude, longitude = point
+        return (
+            latitude + math.degrees(north * self.jitter_km / EARTH_RADIUS_KM),
+            longitude + math.degrees(east * self.jitter_km / EARTH_RADIUS_KM / math.cos(math.radians(latitude))),
+        )
+
+
+@lru_cache(maxsize=None)
+def get_geocoder():
+    """Return the geocoder configured in settings"""
+    config = {**DEFAULT_SETTINGS, **getattr(settings, 'PACKAGE_GEOCODER', {})}
+    return import_string(config['BACKEND'])(**config['OPTIONS'])
+
+
+@receiver(setting_changed)
+def reset_geocoder(setting, **kwargs):
+    if setting == 'PACKAGE_GEOCODER':
+        get_geocoder.cache_clear()
+
+
+def build_stops(packages, geocoder=None):
+    """
+    The stops of packages: a pickup for pending packages and a delivery for
+    all of them. Returns (stops, unlocated) where unlocated lists the
+    packages with an address the geocoder cannot locate.
+    """
+    geocoder = geocoder or get_geocoder()
+    stops, unlocated = [], []
+    for package in packages:
+        package_stops = [(DELIVERY, package.delivery_address)]
+        if package.status == 'pending':
+            package_stops.insert(0, (PICKUP, package.pickup_address))
+        points = [geocoder.geocode(address) for _, address in package_stops]
+        if None in points:
+            unlocated.append(package)
+            continue
+        stops.extend(
+            Stop(package, kind, address, point)
+            for (kind, address), point in zip(package_stops, points)
+        )
+    return stops, unlocated
+
+
+def project(points):
+    """Points as (x, y) in km on an equirectangular projection around their mean latitude"""
+    if not points:
+        return []
+    scale = math.cos(math.radians(sum(latitude for latitude, _ in points) / len(points)))
+    return [
+        (math.radians(longitude) * scale * EARTH_RADIUS_KM, math.radians(latitude) * EARTH_RADIUS_KM)
+        for latitude, longitude in points
+    ]
+
+
+def route_length(order, distances):
+    return sum(distances[a][b] for a, b in zip(order, order[1:]))
+
+
+def plan_route(stops, start=None, time_budget_ms=None):
+    """
+    Order stops so that every pickup comes before the delivery of its package
+    and the path, from start ((latitude, longitude), if given) through all
+    stops, is short. Returns a Route whose complete is False if 2-opt was cut
+    short by time_budget_ms.
+    """
+    if time_budget_ms is None:
+        time_budget_ms = getattr(settings, 'PACKAGE_ROUTE_TIME_BUDGET_MS', 200)
+    deadline = time.perf_counter() + time_budget_ms / 1000
+    if not stops:
+        return Route([], 0.0, 0.0, True)
+
+    # Node 0 is the starting point when there is one; it never moves
+    points = [stop.point for stop in stops]
+    offset = 0 if start is None else 1
+    if start is not None:
+        points.insert(0, start)
+    coordinates = project(points)
+    distances = [[math.dist(a, b) for b in coordinates] for a in coordinates]
+
+    # pickup[node] is the pickup node a delivery node has to follow
+    pickups = {stop.package: node for node, stop in enumerate(stops, offset) if stop.kind == PICKUP}
+    pickup = [None] * len(points)
+    for node, stop in enumerate(stops, offset):
+        if stop.kind == DELIVERY:
+            pickup[node] = pickups.get(stop.package)
+
+    order = nearest_neighbour(distances, pickup, offset)
+    initial = route_length(order, distances)
+    complete = two_opt(order, distances, pickup, offset, deadline)
+    return Route(
+        [stops[node - offset] for node in order[offset:]],
+        route_length(order, distances),
+        initial,
+        complete,
+    )
+
+
+def nearest_neighbour(distances, pickup, offset):
+    """
+    Path that always moves to the closest stop it may visit next, from the
+    starting point or, without one, from the first stop that may come first
+    """
+    nodes = range(offset, len(distances))
+    available = {node for node in nodes if pickup[node] is None}
+    waiting = {pickup[node]: node for node in nodes if pickup[node] is not None}
+    if offset:
+        order = [0]
+    else:
+        first = min(available)
+        order = [first]
+        available.remove(first)
+        if first in waiting:
+            available.add(waiting.pop(first))
+    while available:
+        row = distances[order[-1]]
+        node = min(available, key=row.__getitem__)
+        available.remove(node)
+        order.append(node)
+        if node in waiting:
+            available.add(waiting.pop(node))
+    return order
+
+
+def two_opt(order, distances, pickup, offset, deadline):
+    """
+    Improve order in place by reversing segments while that shortens it.
+    Reversing a segment that holds both stops of a package would put the
+    delivery first, so such segments are skipped. Returns whether it stopped
+    because no reversal helps (rather than at the deadline).
+    """
+    count = len(order)
+    position = [0] * count
+    for index, node in enumerate(order):
+        position[node] = index
+    improved = True
+    while improved:
+        improved = False
+        for i in range(offset, count - 1):
+            if time.perf_counter() > deadline:
+                return False
+            before = order[i - 1] if i else None
+            for j in range(i + 1, count):
+                first, last = order[i], order[j]
+                # Segment i..j now holds this delivery's pickup, and so will
+                # every longer segment
+                if pickup[last] is not None and position[pickup[last]] >= i:
+                    break
+                after = order[j + 1] if j + 1 < count else None
+                removed = (distances[before][first] if before is not None else 0) + (
+                    distances[last][after] if after is not None else 0
+                )
+                added = (distances[before][last] if before is not None else 0) + (
+                    distances[first][after] if after is not None else 0
+                )
+                if added < removed - 1e-9:
+                    order[i:j + 1] = order[j:i - 1 if i else None:-1]
+                    for index in range(i, j + 1):
+                        position[order[index]] = index
+                    improved = True
+    return True
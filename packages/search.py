@@ -0,0 +1,276 @@
+"""
+Full-text search for packages.
+
+PackageSearchFilter replaces DRF's SearchFilter on PackageViewSet. Search
+terms are handed to a backend chosen by the PACKAGE_SEARCH_BACKEND setting
+(a dotted path) or, when unset, by database vendor:
+
+- SQLite: an FTS5 index over description and addresses kept in sync by triggers
+- PostgreSQL: to_tsvector matching backed by a GIN expression index
+- anything else: icontains over the view's search_fields
+
+Every backend annotates a ``search_rank`` (higher is better) which is the
+default ordering of search results. A search for a tracking number or for a
+status value skips full-text matching entirely. Words naming a status
+("transit", "deliv") also match packages in that status.
+"""
+import re
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import BooleanField, Expression, F, FloatField, Q, Value
+from django.utils.module_loading import import_string
+from rest_framework import filters
+
+from .models import Package
+
+SEARCHABLE_FIELDS = ('description', 'pickup_address', 'delivery_address')
+TRACKING_NUMBER_PATTERN = re.compile(r'^PKG-[A-Z0-9-]*$', re.IGNORECASE)
+RANK_ANNOTATION = 'search_rank'
+# Shortest word matched against the start of status names
+MIN_STATUS_PREFIX = 3
+
+
+class SimpleSearchBackend:
+    """Case-insensitive substring matching, used when no full-text index exists"""
+    vendor = None
+
+    def install(self, connection):
+        pass
+
+    def search(self, queryset, terms, search_fields):
+        conditions = [
+            reduce(or_, (Q(**{f'{field}__icontains': term}) for field in search_fields))
+            for term in terms
+        ]
+        return queryset.filter(*conditions).annotate(
+            **{RANK_ANNOTATION: Value(0.0, output_field=FloatField())}
+        )
+
+
+class SearchEntryExpression(Expression):
+    """
+    SQL taking the FTS table joined through Package.search_entry as argument,
+    as MATCH and bm25() do. The table is passed as its hidden column of the
+    same name, which unlike the bare table name can be qualified with the
+    alias the table has in subqueries.
+    """
+    template = None
+
+    def __init__(self, *params, output_field):
+        super().__init__(output_field=output_field)
+        self.params = params
+        self.entry = F('search_entry__description')
+
+    def get_source_expressions(self):
+        return [self.entry]
+
+    def set_source_expressions(self, exprs):
+        self.entry, = exprs
+
+    def as_sql(self, compiler, connection):
+        column = '%s.%s' % (
+            compiler.quote_name_unless_alias(self.entry.alias),
+            connection.ops.quote_name(self.entry.target.model._meta.db_table)
+        )
+        return self.template % {'table': column}, list(self.params)
+
+
+class FTSMatch(SearchEntryExpression):
+    template = '%(table)s MATCH %%s'
+    conditional = True
+
+    def __init__(self, match):
+        super().__init__(match, output_field=BooleanField())
+
+
+class BM25Rank(SearchEntryExpression):
+    # bm25() is lower for better matches; negate it so higher ranks first
+    template = '-bm25(%(table)s)'
+
+    def __init__(self):
+        super().__init__(output_field=FloatField())
+
+
+class SQLiteFTS5Backend:
+    """
+    Search through an external-content FTS5 table. Triggers keep it in sync
+    with every write to packages_package, including bulk_create and update().
+    """
+    vendor = 'sqlite'
+    table = 'packages_package_fts'
+
+    def install(self, connection):
+        """
+        Create the FTS table and triggers if they are missing. Migrations that
+        rebuild packages_package on SQLite drop its triggers, so this runs after
+        every migrate and re-indexes whenever a trigger had to be recreated.
+        """
+        source = Package._meta.db_table
+        columns = ', '.join(SEARCHABLE_FIELDS)
+        new_values = ', '.join(f'new.{field}' for field in SEARCHABLE_FIELDS)
+        old_values = ', '.join(f'old.{field}' for field in SEARCHABLE_FIELDS)
+        insert_new = f"INSERT INTO {self.table}(rowid, {columns}) VALUES (new.id, {new_values});"
+        delete_old = (
+            f"INSERT INTO {self.table}({self.table}, rowid, {columns}) "
+            f"VALUES ('delete', old.id, {old_values});"
+        )
+        triggers = {
+            f'{self.table}_insert': f"AFTER INSERT ON {source} BEGIN {insert_new} END",
+            f'{self.table}_delete': f"AFTER DELETE ON {source} BEGIN {delete_old} END",
+            f'{self.table}_update': (
+                f"AFTER UPDATE OF {columns} ON {source} BEGIN {delete_old} {insert_new} END"
+            ),
+        }
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.table} USING fts5("
+                f"{columns}, content='{source}', content_rowid='id')"
+            )
+            cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")
+            existing = {row[0] for row in cursor.fetchall()}
+            missing = [name for name in triggers if name not in existing]
+            for name in missing:
+                cursor.execute(f"CREATE TRIGGER {name} {triggers[name]}")
+            if missing:
+                cursor.execute(f"INSERT INTO {self.table}({self.table}) VALUES ('rebuild')")
+
+    def search(self, queryset, terms, search_fields):
+        match = self.build_match_expression(terms)
+        if match is None:
+            return queryset.annotate(**{RANK_ANNOTATION: Value(0.0, output_field=FloatField())}).none()
+        # The index is joined once (Package.search_entry), so the rank comes
+        # with the match; isnull makes it an inner join, as MATCH cannot apply
+        # to the nullable side of an outer join
+        return queryset.filter(FTSMatch(match), search_entry__isnull=False).annotate(
+            **{RANK_ANNOTATION: BM25Rank()}
+        )
+
+    def build_match_expression(self, terms):
+        """All words must match, each as a prefix; FTS5 syntax in input is neutralized"""
+        words = [word for term in terms for word in re.findall(r'\w+', term)]
+        if not words:
+            return None
+        return ' '.join(f'"{word}"*' for word in words)
+
+
+class PostgresSearchBackend:
+    """Search with to_tsvector/websearch_to_tsquery, ranked with ts_rank"""
+    vendor = 'postgresql'
+    index_name = 'pkg_fulltext_gin_idx'
+    config = 'english'
+
+    def get_vector(self):
+        from django.contrib.postgres.search import SearchVector
+        return SearchVector(*SEARCHABLE_FIELDS, config=self.config)
+
+    def install(self, connection):
+        """Create the GIN index over the same expression the search uses"""
+        from django.contrib.postgres.indexes import GinIndex
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, Package._meta.db_table)
+        if self.index_name in constraints:
+            return
+        with connection.schema_editor() as schema_editor:
+            schema_editor.add_index(Package, GinIndex(self.get_vector(), name=self.index_name))
+
+    def search(self, queryset, terms, search_fields):
+        from django.contrib.postgres.search import SearchQuery, SearchRank
+        query = SearchQuery(' '.join(terms), config=self.config, search_type='websearch')
+        vector = self.get_vector()
+        return queryset.annotate(search_vector=vector).filter(search_vector=query).annotate(
+            **{RANK_ANNOTATION: SearchRank(vector, query)}
+        )
+
+
+BACKENDS_BY_VENDOR = {
+    'sqlite': SQLiteFTS5Backend,
+    'postgresql': PostgresSearchBackend,
+}
+
+
+def get_search_backend(using='default'):
+    """Return the configured backend, or the best one for the database vendor"""
+    backend_path = getattr(settings, 'PACKAGE_SEARCH_BACKEND', None)
+    if backend_path:
+        return import_string(backend_path)()
+    vendor = connections[using].vendor
+    return BACKENDS_BY_VENDOR.get(vendor, SimpleSearchBackend)()
+
+
+def install_search_backend(using='default', **kwargs):
+    """post_migrate receiver creating the full-text index structures"""
+    connection = connections[using]
+    backend = get_search_backend(using)
+    if backend.vendor in (None, connection.vendor):
+        backend.install(connection)
+
+
+class PackageSearchFilter(filters.SearchFilter):
+    """
+    SearchFilter backed by the full-text search backend, with exact fast paths
+    for tracking numbers and status values
+    """
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+
+        query = ' '.join(terms)
+        rank = {RANK_ANNOTATION: Value(1.0, output_field=FloatField())}
+        if len(terms) == 1 and TRACKING_NUMBER_PATTERN.match(query):
+            # Tracking numbers are stored upper case; a range over the unique
+            # index serves both exact and prefix lookups
+            prefix = query.upper()
+            return queryset.filter(
+                tracking_number__gte=prefix, tracking_number__lt=prefix + '\uffff'
+            ).annotate(**rank)
+        if query in dict(Package.STATUS_CHOICES):
+            return queryset.filter(status=query).annotate(**rank)
+
+        search_fields = self.get_search_fields(view, request) or SEARCHABLE_FIELDS
+        backend = get_search_backend(queryset.db)
+        text_terms = []
+        for term in terms:
+            statuses = matching_statuses(term)
+            if not statuses:
+                text_terms.append(term)
+                continue
+            # As with the icontains search this replaced, a word matches the
+            # status as well as the text
+            mentions = backend.search(Package.objects.all(), [term], search_fields).values('pk')
+            queryset = queryset.filter(Q(status__in=statuses) | Q(pk__in=mentions))
+        if not text_terms:
+            return queryset.annotate(**rank)
+        return backend.search(queryset, text_terms, search_fields)
+
+
+def matching_statuses(term):
+    """Statuses whose value, or a word of whose label, starts with term"""
+    term = term.lower()
+    if len(term) < MIN_STATUS_PREFIX:
+        return []
+    return [
+        value for value, label in Package.STATUS_CHOICES
+        if value.startswith(term) or any(word.startswith(term) for word in label.lower().split())
+    ]
+
+
+class PackageOrderingFilter(filters.OrderingFilter):
+    """
+    Order search results by relevance unless an ordering is requested.
+    search_rank only exists on searches, so it is ignored without one.
+    """
+    def get_default_ordering(self, view):
+        request = getattr(view, 'request', None)
+        if request is not None and PackageSearchFilter().get_search_terms(request):
+            return [f'-{RANK_ANNOTATION}']
+        return super().get_default_ordering(view)
+
+    def remove_invalid_fields(self, queryset, fields, view, request):
+        valid = super().remove_invalid_fields(queryset, fields, view, request)
+        if PackageSearchFilter().get_search_terms(request):
+            return valid
+        return [term for term in valid if term.lstrip('-') != RANK_ANNOTATION]
@@ -1,24 +1,67 @@
+from datetime import timedelta
+
 from rest_framework import serializers
+from .cache import invalidate_tracking_snapshot
+from .events import publish_status_updates
 from .models import Package, PackageStatusUpdate
+from .stats import StatsDelta, count_transitions, package_state
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+from django.db.models import Prefetch
 from django.utils import timezone
+from courier_service_api.metrics import timed
+
+class EagerLoadingMixin:
+    """
+    Let a serializer declare the relations it reads so that views can load
+    them up front instead of issuing one query per row.
+
+    - select_related_fields: forward relations joined into the main query
+    - prefetch_related_fields: (lookup, serializer class) pairs; the nested
+      serializer's own relation needs are applied to the prefetch queryset
+    """
+    select_related_fields = ()
+    prefetch_related_fields = ()
+
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        """Return the queryset with every relation this serializer reads"""
+        if cls.select_related_fields:
+            queryset = queryset.select_related(*cls.select_related_fields)
+        for lookup, serializer_class in cls.prefetch_related_fields:
+            related_queryset = serializer_class.Meta.model.objects.all()
+            queryset = queryset.prefetch_related(Prefetch(
+                lookup,
+                queryset=serializer_class.setup_eager_loading(related_queryset)
+            ))
+        return queryset
 
-class PackageStatusUpdateSerializer(serializers.ModelSerializer):
+    def to_representation(self, instance):
+        with timed('serialize'):
+            return super().to_representation(instance)
+
+class PackageStatusUpdateSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     updated_by_name = serializers.SerializerMethodField()
+    select_related_fields = ('updated_by',)
     
     class Meta:
         model = PackageStatusUpdate
-        fields = ['id', 'status', 'notes', 'updated_by', 'updated_by_name', 'created_at']
-        read_only_fields = ['id', 'updated_by', 'updated_by_name', 'created_at']
+        fields = ['id', 'status', 'notes', 'updated_by', 'updated_by_name', 'scanned_at', 'created_at']
+        read_only_fields = ['id', 'updated_by', 'updated_by_name', 'scanned_at', 'created_at']
     
     def get_updated_by_name(self, obj):
         if obj.updated_by:
             return f"{obj.updated_by.first_name} {obj.updated_by.last_name}"
         return None
 
-class PackageSerializer(serializers.ModelSerializer):
+class PackageSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     status_updates = PackageStatusUpdateSerializer(many=True, read_only=True)
     customer_email = serializers.SerializerMethodField()
     courier_email = serializers.SerializerMethodField()
+    select_related_fields = ('customer', 'courier')
+    prefetch_related_fields = (('status_updates', PackageStatusUpdateSerializer),)
     
     class Meta:
         model = Package
@@ -26,15 +69,55 @@ class PackageSerializer(serializers.ModelSerializer):
             'id', 'tracking_number', 'customer', 'customer_email', 'courier', 
             'courier_email', 'description', 'weight', 'dimensions', 
             'pickup_address', 'delivery_address', 'status', 
-            'created_at', 'updated_at', 'is_deleted', 'status_updates'
+            'created_at', 'updated_at', 'is_deleted', 'last_status_at', 'last_status_note',
+            'status_update_count', 'status_updates'
+        ]
+        # status only changes through update_status and bulk_update_status,
+        # which enforce Package.STATUS_TRANSITIONS, and courier through
+        # assign_courier and auto_assign
+        read_only_fields = [
+            'id', 'tracking_number', 'courier', 'status', 'created_at', 'updated_at', 'is_deleted',
+            'deleted_at', 'last_status_at', 'last_status_note', 'status_update_count'
         ]
-        read_only_fields = ['id', 'tracking_number', 'created_at', 'updated_at', 'is_deleted', 'deleted_at']
     
     def get_customer_email(self, obj):
         return obj.customer.email if obj.customer else None
     
     def get_courier_email(self, obj):
         return obj.courier.email if obj.courier else None
+    
+    def update(self, instance, validated_data):
+        """Write only the fields sent, leaving concurrent changes to the others alone"""
+        for name, value in validated_data.items():
+            setattr(instance, name, value)
+        instance.save(update_fields=[*validated_data, 'updated_at'])
+        return instance
+
+class PackageFieldsSerializer(serializers.Serializer):
+    """
+    Sparse fieldset query parameters of the package list and detail:
+    fields=a,b,c, expand=status_updates and history_limit=N
+    """
+    fields = serializers.CharField(required=False)
+    expand = serializers.ChoiceField(choices=['status_updates'], required=False)
+    history_limit = serializers.IntegerField(min_value=0, required=False)
+    
+    def validate_fields(self, value):
+        names = [name.strip() for name in value.split(',') if name.strip()]
+        unknown = sorted(set(names) - set(PackageSerializer.Meta.fields))
+        if unknown:
+            raise serializers.ValidationError(f"Unknown field(s): {', '.join(unknown)}")
+        return names
+    
+    def validate(self, attrs):
+        """Resolve the parameters to the fields to render and the history limit"""
+        fields = attrs.get('fields')
+        if fields is not None and attrs.get('expand'):
+            fields.append(attrs['expand'])
+        history_limit = attrs.get('history_limit')
+        if history_limit == 0:
+            fields = [name for name in fields or PackageSerializer.Meta.fields if name != 'status_updates']
+        return {'fields': fields, 'history_limit': history_limit}
 
 class PackageCreateSerializer(serializers.ModelSerializer):
     class Meta:
@@ -47,35 +130,123 @@ class PackageCreateSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         # Set the customer as the current user
         validated_data['customer'] = self.context['request'].user
-        return super().create(validated_data)
+        with transaction.atomic():
+            package = super().create(validated_data)
+            delta = StatsDelta()
+            delta.add(package_state(package))
+            delta.apply()
+        return package
 
 class PackageStatusUpdateCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = PackageStatusUpdate
         fields = ['status', 'notes']
     
+    def validate_status(self, value):
+        try:
+            self.context['package'].check_transition(value)
+        except DjangoValidationError as error:
+            raise serializers.ValidationError(error.messages)
+        return value
+    
     def create(self, validated_data):
         package = self.context['package']
         user = self.context['request'].user
         
-        # Update the package status
-        package.status = validated_data['status']
-        package.save()
-        
-        # Create the status update record
-        status_update = PackageStatusUpdate.objects.create(
-            package=package,
-            status=validated_data['status'],
-            notes=validated_data.get('notes', ''),
-            updated_by=user
-        )
+        with transaction.atomic():
+            # Update the package status. The check in validate_status may be
+            # stale by now; the conditional UPDATE is what enforces it.
+            try:
+                previous = package.transition_to(validated_data['status'])
+            except DjangoValidationError as error:
+                raise serializers.ValidationError({"status": error.messages})
+            if previous != package.status:
+                count_transitions({previous: [package.pk]}).apply()
+            
+            # Create the status update record
+            status_update = PackageStatusUpdate.objects.create(
+                package=package,
+                status=validated_data['status'],
+                notes=validated_data.get('notes', ''),
+                updated_by=user
+            )
+            package.refresh_status_summary()
+        invalidate_tracking_snapshot(package.tracking_number)
+        publish_status_updates([status_update])
         
         return status_update
 
+class PackageScanSerializer(serializers.Serializer):
+    """One scan recorded offline by a courier's handheld scanner"""
+    tracking_number = serializers.CharField(max_length=50)
+    status = serializers.ChoiceField(choices=Package.STATUS_CHOICES)
+    notes = serializers.CharField(required=False, allow_blank=True, default='')
+    scanned_at = serializers.DateTimeField()
+
+class PackageExportSerializer(serializers.Serializer):
+    """Query parameters of the export action"""
+    export_format = serializers.ChoiceField(choices=['csv', 'ndjson'], default='csv')
+    status = serializers.MultipleChoiceField(choices=Package.STATUS_CHOICES, required=False)
+    created_after = serializers.DateTimeField(required=False)
+    created_before = serializers.DateTimeField(required=False)
+    include_history = serializers.BooleanField(default=False)
+    
+    def validate(self, attrs):
+        if attrs.get('created_after') and attrs.get('created_before') and (
+            attrs['created_after'] > attrs['created_before']
+        ):
+            raise serializers.ValidationError({"created_before": "Must not be before created_after."})
+        return attrs
+
 class PackageAssignSerializer(serializers.ModelSerializer):
     class Meta:
         model = Package
         fields = ['courier']
+    
+    def update(self, instance, validated_data):
+        instance.courier = validated_data['courier']
+        instance.save(update_fields=['courier', 'updated_at'])
+        return instance
+
+class PackageAutoAssignSerializer(serializers.Serializer):
+    """Body of the auto_assign action"""
+    limit = serializers.IntegerField(min_value=1, required=False)
+    
+    def validate_limit(self, value):
+        return min(value, getattr(settings, 'PACKAGE_ASSIGNMENT_BATCH_SIZE', 1000))
+
+class PackageRouteSerializer(serializers.Serializer):
+    """Query parameters of the route action"""
+    courier = serializers.PrimaryKeyRelatedField(
+        queryset=get_user_model().objects.filter(user_role='courier'), required=False
+    )
+    start_latitude = serializers.FloatField(min_value=-90, max_value=90, required=False)
+    start_longitude = serializers.FloatField(min_value=-180, max_value=180, required=False)
+    time_budget_ms = serializers.IntegerField(min_value=1, required=False)
+    
+    def validate_time_budget_ms(self, value):
+        return min(value, getattr(settings, 'PACKAGE_ROUTE_MAX_TIME_BUDGET_MS', 2000))
+    
+    def validate(self, attrs):
+        if ('start_latitude' in attrs) != ('start_longitude' in attrs):
+            raise serializers.ValidationError("start_latitude and start_longitude must be given together.")
+        return attrs
+
+class PackageDeliveryStatsSerializer(serializers.Serializer):
+    """Query parameters of the delivery_stats and delivery_times actions"""
+    since = serializers.DateField(required=False)
+    until = serializers.DateField(required=False)
+    
+    def validate(self, attrs):
+        until = attrs.get('until') or timezone.localdate()
+        since = attrs.get('since') or until - timedelta(days=settings.PACKAGE_STATS_DEFAULT_DAYS - 1)
+        if since > until:
+            raise serializers.ValidationError({"until": "Must not be before since."})
+        if (until - since).days >= settings.PACKAGE_STATS_MAX_DAYS:
+            raise serializers.ValidationError(
+                f"At most {settings.PACKAGE_STATS_MAX_DAYS} days can be requested."
+            )
+        return {'since': since, 'until': until}
 
 class PackageSoftDeleteSerializer(serializers.ModelSerializer):
     class Meta:
@@ -90,5 +261,5 @@ class PackageSoftDeleteSerializer(serializers.ModelSerializer):
             instance.is_deleted = False
             instance.deleted_at = None
         
-        instance.save()
+        instance.save(update_fields=['is_deleted', 'deleted_at', 'updated_at'])
         return instance
\ No newline at end of file
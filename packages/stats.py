@@ -0,0 +1,180 @@
+"""
+Materialized package counts for the admin dashboards.
+
+CourierStatusCount and CustomerStatusCount hold the live (not soft-deleted)
+packages per (courier, status) and (customer, status), and
+DailyDeliveredCount the live delivered packages per day of delivery. Writers
+that change the status, courier, customer or deleted flag of packages record
+the packages' states before and after in a StatsDelta and apply it in the
+same transaction: every count touched is adjusted in place, so a change costs
+a few queries however many packages it moves.
+
+Writes that bypass the writers (the shell, raw SQL, deleting a user and with
+it their packages) make the counts drift; check_stats() reports the
+difference and rebuild_stats() recomputes them from the packages, see the
+check_package_stats and rebuild_package_stats commands.
+"""
+from collections import Counter, namedtuple
+from functools import reduce
+from operator import or_
+
+from django.db import transaction
+from django.db.models import Case, Count, F, Min, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from .models import CourierStatusCount, CustomerStatusCount, DailyDeliveredCount, Package, PackageStatusUpdate
+
+# What the counts depend on of one package
+PackageState = namedtuple('PackageState', ['customer_id', 'courier_id', 'status', 'is_deleted', 'delivered_on'])
+
+STATE_FIELDS = ['customer', 'courier', 'status', 'is_deleted', 'delivered_at']
+
+# Keys adjusted per UPDATE; every key adds a term to its WHERE and CASE
+DELTA_BATCH_SIZE = 200
+
+# (model, key fields) of each count table, in StatsDelta's counter order
+TABLES = [
+    (CourierStatusCount, ('courier_id', 'status')),
+    (CustomerStatusCount, ('customer_id', 'status')),
+    (DailyDeliveredCount, ('day',)),
+]
+
+
+def package_state(package):
+    """The PackageState of a Package instance"""
+    delivered_at = package.delivered_at
+    return PackageState(
+        package.customer_id,
+        package.courier_id,
+        package.status,
+        package.is_deleted,
+        timezone.localdate(delivered_at) if delivered_at else None,
+    )
+
+
+class StatsDelta:
+    """Changes to the package counts, applied with apply()"""
+    def __init__(self):
+        self.couriers = Counter()
+        self.customers = Counter()
+        self.days = Counter()
+
+    def add(self, state, sign=1):
+        """Count (sign=1) or uncount (sign=-1) a package in state"""
+        if state.is_deleted:
+            return
+        self.customers[state.customer_id, state.status] += sign
+        if state.courier_id is not None:
+            self.couriers[state.courier_id, state.status] += sign
+        if state.status == 'delivered' and state.delivered_on is not None:
+            self.days[(state.delivered_on,)] += sign
+
+    def change(self, before, after):
+        if before != after:
+            self.add(before, -1)
+            self.add(after)
+
+    def apply(self):
+        """
+        Adjust the stored counts: missing rows are inserted at 0, then each
+        batch of rows gets count = count + its delta in one UPDATE, which is
+        safe against concurrent writers without locking
+        """
+        for (model, fields), counter in zip(TABLES, (self.couriers, self.customers, self.days)):
+            changes = [(key, delta) for key, delta in counter.items() if delta]
+            for start in range(0, len(changes), DELTA_BATCH_SIZE):
+                batch = changes[start:start + DELTA_BATCH_SIZE]
+                lookups = [Q(**dict(zip(fields, key))) for key, _ in batch]
+                model.objects.bulk_create(
+                    [model(**dict(zip(fields, key))) for key, _ in batch], ignore_conflicts=True
+                )
+                model.objects.filter(reduce(or_, lookups)).update(count=F('count') + Case(
+                    *[When(lookup, then=Value(delta)) for lookup, (_, delta) in zip(lookups, batch)],
+                    default=Value(0),
+                ))
+        self.couriers.clear()
+        self.customers.clear()
+        self.days.clear()
+
+
+def count_transitions(moved, delta=None):
+    """
+    Record the packages moved by PackageQuerySet.transition ({previous
+    status: ids}) in delta, or in a new StatsDelta that is returned
+    """
+    delta = StatsDelta() if delta is None else delta
+    previous = {pk: status for status, ids in moved.items() for pk in ids}
+    if previous:
+        for package in Package.objects.filter(pk__in=previous).only(*STATE_FIELDS):
+            after = package_state(package)
+            delta.change(after._replace(status=previous[package.pk]), after)
+    return delta
+
+
+def compute_stats():
+    """The counts as they should be, computed from the packages"""
+    live = Package.objects.filter(is_deleted=False).order_by()
+    couriers = Counter({
+        (row['courier'], row['status']): row['count']
+        for row in live.filter(courier__isnull=False).values('courier', 'status').annotate(count=Count('pk'))
+    })
+    customers = Counter({
+        (row['customer'], row['status']): row['count']
+        for row in live.values('customer', 'status').annotate(count=Count('pk'))
+    })
+    days = Counter({
+        (row['day'],): row['count']
+        for row in live.filter(status='delivered', delivered_at__isnull=False)
+        .annotate(day=TruncDate('delivered_at')).values('day').annotate(count=Count('pk'))
+    })
+    return couriers, customers, days
+
+
+def stored_stats():
+    """The stored counts, leaving out rows at 0"""
+    return tuple(
+        Counter({
+            tuple(row[:-1]): row[-1]
+            for row in model.objects.exclude(count=0).values_list(*fields, 'count')
+        })
+        for model, fields in TABLES
+    )
+
+
+def check_stats():
+    """
+    Differences between the stored and computed counts, as (table name, key,
+    stored, expected) tuples
+    """
+    differences = []
+    for (model, _), stored, expected in zip(TABLES, stored_stats(), compute_stats()):
+        for key in sorted(set(stored) | set(expected), key=str):
+            if stored[key] != expected[key]:
+                differences.append((model._meta.db_table, key, stored[key], expected[key]))
+    return differences
+
+
+def backfill_delivered_at():
+    """
+    Set delivered_at of delivered packages without one to the time of their
+    first delivered status update, or their last update if there is none
+    """
+    first_delivered = PackageStatusUpdate.objects.filter(
+        package=OuterRef('pk'), status='delivered'
+    ).order_by().values('package').annotate(first=Min('created_at')).values('first')
+    return Package.objects.filter(status='delivered', delivered_at__isnull=True).update(
+        delivered_at=Coalesce(Subquery(first_delivered), F('updated_at'))
+    )
+
+
+def rebuild_stats():
+    """Replace the stored counts by counts computed from the packages"""
+    with transaction.atomic():
+        backfill_delivered_at()
+        for (model, fields), counter in zip(TABLES, compute_stats()):
+            model.objects.all().delete()
+            model.objects.bulk_create(
+                [model(**dict(zip(fields, key)), count=count) for key, count in counter.items()],
+                batch_size=1000
+            )
@@ -0,0 +1,219 @@
+import datetime
+import json
+import unittest
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+from packages import analytics
+from packages.analytics import (
+    DeliveryHistory, compute_delivery_times, get_delivery_times, grouped_percentiles, stage_durations,
+)
+from packages.models import Package, PackageStatusUpdate
+
+User = get_user_model()
+
+
+class GroupedPercentilesTestCase(SimpleTestCase):
+    keys = [1, 2, 1, 1, 2, 1, 3]
+    values = [4.0, 10.0, 2.0, 3.0, float('nan'), 1.0, 7.0]
+    expected = {1: (4, [2.5, 3.7, 3.85]), 2: (1, [10.0] * 3), 3: (1, [7.0] * 3)}
+
+    def test_python(self):
+        with patch.object(analytics, 'np', None):
+            result = grouped_percentiles(self.keys, self.values)
+
+        self.assertEqual(result.keys(), self.expected.keys())
+        for key, (count, values) in self.expected.items():
+            self.assertEqual(result[key][0], count)
+            for value, expected in zip(result[key][1], values):
+                self.assertAlmostEqual(value, expected)
+
+    @unittest.skipIf(analytics.np is None, "NumPy is not installed")
+    def test_numpy_matches_python(self):
+        with patch.object(analytics, 'np', None):
+            expected = grouped_percentiles(self.keys, self.values)
+
+        self.assertEqual(grouped_percentiles(self.keys, self.values), expected)
+
+
+class StageDurationsTestCase(SimpleTestCase):
+    def setUp(self):
+        self.history = DeliveryHistory()
+        self.history.ids.extend([2, 4])
+        self.history.created.extend([0.0, 0.0])
+        self.history.delivered.extend([10.0, 10.0])
+        # Updates of packages delivered after the packages were read, with
+        # ids before, between and after the loaded ones
+        self.history.update_packages.extend([1, 2, 3, 4, 5])
+        self.history.update_times.extend([1.0, 2.0, 3.0, 4.0, 5.0])
+
+    def test_python_skips_unknown_packages(self):
+        with patch.object(analytics, 'np', None):
+            durations = stage_durations(self.history)
+
+        self.assertEqual(list(durations['pending']), [2.0, 4.0])
+        self.assertEqual(list(durations['in_transit']), [8.0, 6.0])
+
+    @unittest.skipIf(analytics.np is None, "NumPy is not installed")
+    def test_numpy_skips_unknown_packages(self):
+        durations = stage_durations(self.history)
+
+        self.assertEqual(durations['pending'].tolist(), [2.0, 4.0])
+        self.assertEqual(durations['in_transit'].tolist(), [8.0, 6.0])
+
+
+class DeliveryTimesTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.customer = User.objects.create_user(email='customer@example.com', user_role=User.CUSTOMER)
+        self.courier = User.objects.create_user(email='courier@example.com', user_role=User.COURIER)
+        self.other_courier = User.objects.create_user(email='other@example.com', user_role=User.COURIER)
+        self.today = timezone.localdate()
+        self.now = timezone.now()
+        # (courier, hours pending, hours in transit or None if never in_transit)
+        for courier, pending, in_transit in [
+            (self.courier, 1, 2),
+            (self.courier, 3, 4),
+            (self.courier, 5, None),
+            (self.other_courier, 2, 10),
+        ]:
+            self.create_package(courier, pending, in_transit)
+        # Neither delivered in the window nor live
+        self.create_package(self.courier, 1, 1, delivered_days_ago=60)
+        deleted = self.create_package(self.courier, 1, 1)
+        Package.objects.filter(pk=deleted.pk).update(is_deleted=True)
+
+    def create_package(self, courier, pending, in_transit, delivered_days_ago=0):
+        delivered_at = self.now - datetime.timedelta(days=delivered_days_ago)
+        created_at = delivered_at - datetime.timedelta(hours=pending + (in_transit or 0))
+        package = Package.objects.create(
+            customer=self.customer,
+            courier=courier,
+            description='Test package',
+            weight='2.50',
+            dimensions='20x15x10',
+            pickup_address='123 Pickup St',
+            delivery_address='456 Delivery Ave',
+            status='delivered',
+            delivered_at=delivered_at,
+        )
+        Package.objects.filter(pk=package.pk).update(created_at=created_at)
+        if in_transit is not None:
+            picked_up = created_at + datetime.timedelta(hours=pending)
+            for offset in [0, 1]:
+                # Only the first in_transit update counts
+                update = PackageStatusUpdate.objects.create(package=package, status='in_transit')
+                PackageStatusUpdate.objects.filter(pk=update.pk).update(
+                    created_at=picked_up + datetime.timedelta(minutes=30 * offset)
+                )
+        return package
+
+    def window(self):
+        return self.today - datetime.timedelta(days=29), self.today
+
+    def assertResults(self, results):
+        self.assertEqual(results['overall']['packages'], 4)
+        self.assertEqual(results['overall']['total'], {'count': 4, 'p50': 6.0, 'p90': 10.5, 'p95': 11.25})
+        self.assertEqual(results['overall']['pending'], {'count': 3, 'p50': 2.0, 'p90': 2.8, 'p95': 2.9})
+
+        by_courier = {row['courier_email']: row for row in results['by_courier']}
+        self.assertEqual(by_courier['courier@example.com']['packages'], 3)
+        self.assertEqual(
+            by_courier['courier@example.com']['in_transit'], {'count': 2, 'p50': 3.0, 'p90': 3.8, 'p95': 3.9}
+        )
+        self.assertEqual(by_courier['other@example.com']['total']['p50'], 12.0)
+
+        self.assertEqual([row['day'] for row in results['by_day']], [self.today])
+        self.assertEqual(results['by_day'][0]['packages'], 4)
+
+    def test_without_numpy(self):
+        with patch.object(analytics, 'np', None):
+            self.assertResults(compute_delivery_times(*self.window()))
+
+    @unittest.skipIf(analytics.np is None, "NumPy is not installed")
+    def test_with_numpy(self):
+        self.assertResults(compute_delivery_times(*self.window()))
+
+    def test_empty_window(self):
+        since = self.today - datetime.timedelta(days=10)
+        results = compute_delivery_times(since, since)
+
+        self.assertEqual(results['overall']['packages'], 0)
+        self.assertIsNone(results['overall']['total']['p50'])
+        self.assertEqual(results['by_courier'], [])
+
+    def test_chunked_reads(self):
+        with self.settings(PACKAGE_ANALYTICS_CHUNK_SIZE=1):
+            self.assertResults(compute_delivery_times(*self.window()))
+
+    def test_cached_per_window(self):
+        since, until = self.window()
+        get_delivery_times(since, until)
+
+        with self.assertNumQueries(0):
+            get_delivery_times(since, until)
+        with self.assertNumQueries(3):
+            get_delivery_times(since, until, refresh=True)
+        with self.assertNumQueries(3):
+            get_delivery_times(since + datetime.timedelta(days=1), until)
+
+
+class DeliveryTimesEndpointTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.admin = User.objects.create_user(email='admin@example.com', user_role=User.ADMIN)
+        self.courier = User.objects.create_user(email='courier@example.com', user_role=User.COURIER)
+        customer = User.objects.create_user(email='customer@example.com', user_role=User.CUSTOMER)
+        Package.objects.create(
+            customer=customer,
+            courier=self.courier,
+            description='Test package',
+            weight='2.50',
+            dimensions='20x15x10',
+            pickup_address='123 Pickup St',
+            delivery_address='456 Delivery Ave',
+            status='delivered',
+            delivered_at=timezone.now(),
+        )
+
+    def test_delivery_times(self):
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.get(reverse('package-delivery-times'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['until'], timezone.localdate())
+        self.assertEqual(response.data['overall']['packages'], 1)
+        self.assertEqual(response.data['by_courier'][0]['courier'], self.courier.pk)
+        self.assertEqual(response.data['percentiles'], [50, 90, 95])
+
+    def test_range_is_validated(self):
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.get(reverse('package-delivery-times'), {'since': '2026-02-01', 'until': '2026-01-01'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_admin_only(self):
+        self.client.force_authenticate(user=self.courier)
+
+        self.assertEqual(self.client.get(reverse('package-delivery-times')).status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_command(self):
+        out = StringIO()
+        call_command('report_delivery_times', stdout=out)
+        self.assertIn('courier@example.com', out.getvalue())
+
+        out = StringIO()
+        call_command('report_delivery_times', '--json', stdout=out)
+        self.assertEqual(json.loads(out.getvalue())['overall']['packages'], 1)
+
+        with self.assertRaises(CommandError):
+            call_command('report_delivery_times', '--since', '2026-02-01', '--until', '2026-01-01')
@@ -0,0 +1,197 @@
+from django.contrib.admin.sites import AdminSite
+from django.contrib.auth import get_user_model
+from django.contrib.messages.storage.fallback import FallbackStorage
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient, APIRequestFactory
+from packages.admin import PackageAdmin
+from packages.assignment import CourierPool, assign_packages, pickup_area
+from packages.models import Package, PackageStatusUpdate
+
+User = get_user_model()
+
+
+class PickupAreaTestCase(SimpleTestCase):
+    def test_city_without_postal_code(self):
+        self.assertEqual(pickup_area('12 Pickup Road, Dhaka 1205'), 'dhaka')
+        self.assertEqual(pickup_area('12 Pickup Road,  Dhaka '), 'dhaka')
+
+    def test_street_without_house_number(self):
+        self.assertEqual(pickup_area('123 Pickup St'), 'pickup st')
+        self.assertEqual(pickup_area(''), '')
+
+
+class CourierPoolTestCase(SimpleTestCase):
+    def couriers(self, count):
+        return [User(pk=pk, email=f'courier{pk}@example.com') for pk in range(1, count + 1)]
+
+    def test_least_loaded_courier(self):
+        pool = CourierPool(self.couriers(3), loads={1: 4, 2: 1, 3: 2}, capacity=10, area_slack=0)
+
+        for _ in range(4):
+            pool.add(pool.choose('dhaka'), 'dhaka')
+
+        self.assertEqual(pool.loads, {1: 4, 2: 4, 3: 3})
+
+    def test_area_courier_within_slack(self):
+        pool = CourierPool(
+            self.couriers(2), loads={1: 3, 2: 0}, areas={1: {'sylhet'}}, capacity=10, area_slack=3
+        )
+
+        self.assertEqual(pool.choose('sylhet').pk, 1)
+        self.assertEqual(pool.choose('khulna').pk, 2)
+        pool.add(pool.couriers[1], 'sylhet')
+        # 4 open packages against none is over the slack
+        self.assertEqual(pool.choose('sylhet').pk, 2)
+
+    def test_capacity(self):
+        pool = CourierPool(self.couriers(2), loads={1: 1, 2: 2}, capacity=2)
+
+        pool.add(pool.choose('dhaka'), 'dhaka')
+
+        self.assertIsNone(pool.choose('dhaka'))
+
+
+class AssignPackagesTestCase(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(email='admin@example.com', user_role=User.ADMIN)
+        self.customer = User.objects.create_user(email='customer@example.com', user_role=User.CUSTOMER)
+        self.couriers = [
+            User.objects.create_user(email=f'courier{index}@example.com', user_role=User.COURIER)
+            for index in range(3)
+        ]
+
+    def create_package(self, city='Dhaka', **fields):
+        return Package.objects.create(
+            customer=self.customer,
+            description='Test package',
+            weight='2.50',
+            dimensions='20x15x10',
+            pickup_address=f'123 Pickup Road, {city}',
+            delivery_address='456 Delivery Ave',
+            **fields
+        )
+
+    def test_packages_are_spread_by_load(self):
+        # courier0 already carries two open packages, delivered ones do not count
+        self.create_package(courier=self.couriers[0])
+        self.create_package(courier=self.couriers[0], status='in_transit')
+        self.create_package(courier=self.couriers[1], status='delivered')
+        packages = [self.create_package(city=city) for city in ['Khulna', 'Rangpur', 'Barisal', 'Sylhet']]
+
+        with override_settings(PACKAGE_ASSIGNMENT_AREA_SLACK=0):
+            assignment = assign_packages(Package.objects.all(), self.admin)
+
+        self.assertEqual(len(assignment.assigned), 4)
+        loads = {
+            courier.email: courier.assigned_packages.exclude(status='delivered').count()
+            for courier in self.couriers
+        }
+        self.assertEqual(loads, {
+            'courier0@example.com': 2, 'courier1@example.com': 2, 'courier2@example.com': 2
+        })
+        update = PackageStatusUpdate.objects.get(package=packages[0])
+        self.assertEqual(update.updated_by, self.admin)
+        self.assertEqual(update.status, 'pending')
+        packages[0].refresh_from_db()
+        self.assertEqual(packages[0].status_update_count, 1)
+
+    def test_couriers_keep_their_area(self):
+        self.create_package(city='Sylhet', courier=self.couriers[2])
+        packages = [self.create_package(city='Sylhet') for _ in range(3)]
+
+        assign_packages(Package.objects.all(), self.admin)
+
+        couriers = set(Package.objects.filter(pk__in=[p.pk for p in packages]).values_list('courier', flat=True))
+        self.assertEqual(couriers, {self.couriers[2].pk})
+
+    @override_settings(PACKAGE_ASSIGNMENT_CAPACITY=1)
+    def test_packages_over_capacity_stay_unassigned(self):
+        packages = [self.create_package() for _ in range(4)]
+
+        assignment = assign_packages(Package.objects.all(), self.admin)
+
+        self.assertEqual(assignment.unassigned, packages[3:])
+        self.assertIsNone(Package.objects.get(pk=packages[3].pk).courier)
+
+    def test_only_unassigned_pending_packages(self):
+        assigned = self.create_package(courier=self.couriers[0])
+        in_transit = self.create_package(status='in_transit')
+        deleted = self.create_package(is_deleted=True)
+
+        assignment = assign_packages(Package.objects.all(), self.admin)
+
+        self.assertEqual(assignment, ([], []))
+        self.assertEqual(Package.objects.get(pk=assigned.pk).courier, self.couriers[0])
+        self.assertFalse(PackageStatusUpdate.objects.filter(package__in=[in_transit, deleted]).exists())
+
+    def test_query_count_does_not_depend_on_batch_size(self):
+        def run(count):
+            for _ in range(count):
+                self.create_package()
+            with CaptureQueriesContext(connection) as context:
+                assign_packages(Package.objects.all(), self.admin)
+            return len(context.captured_queries)
+
+        self.assertEqual(run(1), run(20))
+
+
+class AutoAssignViewTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = User.objects.create_user(email='admin@example.com', user_role=User.ADMIN)
+        self.courier = User.objects.create_user(email='courier@example.com', user_role=User.COURIER)
+        self.customer = User.objects.create_user(email='customer@example.com', user_role=User.CUSTOMER)
+        self.packages = [
+            Package.objects.create(
+                customer=self.customer,
+                description='Test package',
+                weight='2.50',
+                dimensions='20x15x10',
+                pickup_address='123 Pickup St',
+                delivery_address='456 Delivery Ave'
+            )
+            for _ in range(3)
+        ]
+        self.url = reverse('package-auto-assign')
+
+    def test_admin_assigns_oldest_packages(self):
+        self.client.force_authenticate(user=self.admin)
+
+        response = self.client.post(self.url, {'limit': 2}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [item['tracking_number'] for item in response.data['assigned']],
+            [package.tracking_number for package in self.packages[:2]]
+        )
+        self.assertEqual(response.data['assigned'][0]['courier_email'], 'courier@example.com')
+        self.assertEqual(response.data['unassigned'], [])
+
+    def test_invalid_limit(self):
+        self.client.force_authenticate(user=self.admin)
+
+        response = self.client.post(self.url, {'limit': 0}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_only_admins(self):
+        for user in (self.courier, self.customer):
+            self.client.force_authenticate(user=user)
+            self.assertEqual(self.client.post(self.url).status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_admin_action(self):
+        request = APIRequestFactory().post('/')
+        request.user = self.admin
+        request.session = {}
+        request._messages = FallbackStorage(request)
+        model_admin = PackageAdmin(Package, AdminSite())
+
+        model_admin.assign_couriers(request, Package.objects.filter(pk=self.packages[1].pk))
+
+        couriers = dict(Package.objects.values_list('pk', 'courier'))
+        self.assertEqual(couriers[self.packages[1].pk], self.courier.pk)
+        self.assertIsNone(couriers[self.packages[0].pk])
@@ -0,0 +1,137 @@
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import include, path
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from accounts.authentication import get_user_cache
+from packages.async_views import AsyncPackageViewSet
+from packages.cache import get_tracking_cache
+from packages.models import Package, PackageStatusUpdate
+from packages.urls import get_urlpatterns
+
+User = get_user_model()
+
+urlpatterns = [
+    path('api/packages/', include(get_urlpatterns(AsyncPackageViewSet))),
+]
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class AsyncPackageViewSetTestCase(TestCase):
+    def setUp(self):
+        get_tracking_cache().clear()
+        get_user_cache().clear()
+        self.customer = User.objects.create_user(email='customer@example.com', user_role=User.CUSTOMER)
+        self.other_customer = User.objects.create_user(email='other@example.com', user_role=User.CUSTOMER)
+        self.courier = User.objects.create_user(email='courier@example.com', user_role=User.COURIER)
+        self.admin = User.objects.create_user(email='admin@example.com', user_role=User.ADMIN)
+        self.packages = [
+            Package.objects.create(
+                customer=self.customer,
+                courier=self.courier,
+                description=f'Parcel {index}',
+                weight='1.00',
+                dimensions='10x10x10',
+                pickup_address='123 Pickup St',
+                delivery_address='456 Delivery Ave'
+            )
+            for index in range(3)
+        ]
+        PackageStatusUpdate.objects.create(
+            package=self.packages[0], status='pending', notes='Created', updated_by=self.customer
+        )
+        self.packages[0].refresh_status_summary()
+
+    def auth(self, user):
+        return {'Authorization': f'Bearer {AccessToken.for_user(user)}'}
+
+    async def test_list_matches_sync_view(self):
+        response = await self.async_client.get('/api/packages/', headers=self.auth(self.customer))
+
+        self.assertEqual(response.status_code, 200)
+
+        @sync_to_async
+        def sync_list():
+            client = APIClient()
+            client.force_authenticate(self.customer)
+            return client.get('/api/packages/').json()
+
+        self.assertEqual(response.json(), await sync_list())
+        self.assertEqual(len(response.json()['results']), 3)
+
+    async def test_list_is_role_filtered(self):
+        response = await self.async_client.get('/api/packages/', headers=self.auth(self.other_customer))
+
+        self.assertEqual(response.json()['results'], [])
+
+    async def test_retrieve(self):
+        package = self.packages[0]
+        response = await self.async_client.get(f'/api/packages/{package.pk}/', headers=self.auth(self.customer))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['tracking_number'], package.tracking_number)
+        self.assertEqual(len(response.json()['status_updates']), 1)
+
+    async def test_retrieve_of_other_customers_package(self):
+        response = await self.async_client.get(
+            f'/api/packages/{self.packages[0].pk}/', headers=self.auth(self.other_customer)
+        )
+
+        self.assertEqual(response.status_code, 404)
+
+    async def test_invalid_token(self):
+        response = await self.async_client.get('/api/packages/', headers={'Authorization': 'Bearer invalid'})
+
+        self.assertEqual(response.status_code, 401)
+
+    async def test_update_status(self):
+        package = self.packages[1]
+        response = await self.async_client.post(
+            f'/api/packages/{package.pk}/update_status/',
+            {'status': 'in_transit', 'notes': 'Picked up'},
+            content_type='application/json',
+            headers=self.auth(self.courier)
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], 'in_transit')
+        self.assertEqual(response.json()['status_update_count'], 1)
+        self.assertEqual(response.json()['status_updates'][0]['notes'], 'Picked up')
+        self.assertTrue(await PackageStatusUpdate.objects.filter(package=package, status='in_transit').aexists())
+
+    async def test_update_status_forbidden_for_customer(self):
+        response = await self.async_client.post(
+            f'/api/packages/{self.packages[1].pk}/update_status/',
+            {'status': 'in_transit'},
+            content_type='application/json',
+            headers=self.auth(self.customer)
+        )
+
+        self.assertEqual(response.status_code, 403)
+
+    async def test_track_public_and_owner(self):
+        package = self.packages[0]
+        url = f'/api/packages/track/?tracking_number={package.tracking_number}'
+
+        public = await self.async_client.get(url)
+        owner = await self.async_client.get(url, headers=self.auth(self.customer))
+        missing = await self.async_client.get('/api/packages/track/?tracking_number=PKG-MISSING')
+
+        self.assertEqual(public.status_code, 200)
+        self.assertNotIn('customer_email', public.json())
+        self.assertEqual(public.json()['status_updates'][0]['status'], 'pending')
+        self.assertEqual(owner.json()['customer_email'], 'customer@example.com')
+        self.assertEqual(missing.status_code, 404)
+
+    async def test_sync_actions_still_work(self):
+        """Actions without an async variant run in a worker thread"""
+        package = self.packages[2]
+        response = await self.async_client.patch(
+            f'/api/packages/{package.pk}/soft_delete/',
+            content_type='application/json',
+            headers=self.auth(self.admin)
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue((await Package.objects.aget(pk=package.pk)).is_deleted)
@@ -0,0 +1,85 @@
+import asyncio
+import time
+from django.db import connection
+from django.test import AsyncClient, SimpleTestCase, TestCase, TransactionTestCase
+from packages.benchmarks import (
+    RequestStats, counted_queries, percentile, seed_dataset, simulated_latency, summarize
+)
+from packages.models import Package, PackageStatusUpdate
+
+
+class SeedDatasetTestCase(TestCase):
+    def test_seed_dataset(self):
+        """Seeded packages have consistent history and denormalized fields"""
+        dataset = seed_dataset(customers=3, couriers=2, packages=7, updates_per_package=2, batch_size=3)
+
+        self.assertEqual(len(dataset['package_ids']), 7)
+        self.assertEqual(Package.objects.count(), 7)
+        self.assertEqual(PackageStatusUpdate.objects.count(), 14)
+        self.assertFalse(Package.objects.exclude(status_update_count=2).exists())
+        self.assertFalse(Package.objects.exclude(status='in_transit').exists())
+
+
+class SimulatedLatencyTestCase(TestCase):
+    def test_delays_queries_inside_the_block_only(self):
+        with simulated_latency(20):
+            start = time.perf_counter()
+            Package.objects.exists()
+            delayed = time.perf_counter() - start
+
+        self.assertGreaterEqual(delayed, 0.02)
+        self.assertEqual(connection.execute_wrappers, [])
+
+
+class CountedQueriesTestCase(TestCase):
+    def test_counts_queries_inside_the_block_only(self):
+        with counted_queries() as queries:
+            Package.objects.exists()
+            Package.objects.count()
+        Package.objects.exists()
+
+        self.assertEqual(queries.count, 2)
+        self.assertEqual(connection.execute_wrappers, [])
+
+
+class CountedQueriesAsgiTestCase(TransactionTestCase):
+    """Queries of ASGI requests run in a worker thread whose connection outlives each block"""
+    async def track(self, queries):
+        await queries.connections.install_worker_thread()
+        response = await AsyncClient().get('/api/packages/track/?tracking_number=PKG-MISSING')
+        self.assertEqual(response.status_code, 404)
+
+    def test_counts_asgi_requests(self):
+        for _ in range(2):
+            with counted_queries() as queries:
+                asyncio.run(self.track(queries))
+
+            self.assertGreater(queries.count, 0)
+            self.assertEqual(queries.connections.wrapped, [])
+
+
+class TimingStatisticsTestCase(SimpleTestCase):
+    def test_percentile_interpolates(self):
+        self.assertEqual(percentile([1, 2, 3, 4], 0.5), 2.5)
+        self.assertEqual(percentile([5], 0.99), 5)
+        self.assertEqual(percentile([], 0.5), 0.0)
+
+    def test_summarize(self):
+        summary = summarize([1.0, 2.0, 3.0])
+
+        self.assertEqual(summary['runs'], 3)
+        self.assertEqual(summary['p50_ms'], 2.0)
+        self.assertEqual(summary['mean_ms'], 2.0)
+
+    def test_request_stats(self):
+        stats = RequestStats()
+        stats.record(10.0, 3, 200)
+        stats.record(30.0, 5, 400)
+
+        summary = stats.summary()
+
+        self.assertEqual(summary['p50_ms'], 20.0)
+        self.assertEqual(summary['requests_per_second'], 50.0)
+        self.assertEqual(summary['errors'], 1)
+        self.assertEqual(summary['queries_per_request'], 4.0)
+        self.assertEqual(summary['max_queries'], 5)
@@ -0,0 +1,109 @@
+import json
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase, APIClient
+from packages.models import Package
+
+User = get_user_model()
+
+
+class PackageBulkCreateTestCase(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.customer = User.objects.create_user(email='merchant@example.com', user_role=User.CUSTOMER)
+        self.client.force_authenticate(user=self.customer)
+        self.url = reverse('package-bulk-create')
+
+    def package_row(self, index=0, **overrides):
+        row = {
+            'description': f'Parcel {index}',
+            'weight': '1.25',
+            'dimensions': '10x10x10',
+            'pickup_address': '123 Pickup St',
+            'delivery_address': '456 Delivery Ave'
+        }
+        row.update(overrides)
+        return row
+
+    def test_bulk_create_from_json_array(self):
+        """All valid rows are created for the current customer"""
+        rows = [self.package_row(index) for index in range(3)]
+
+        response = self.client.post(self.url, rows, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([item['index'] for item in response.data['created']], [0, 1, 2])
+        self.assertEqual(response.data['errors'], [])
+        packages = Package.objects.filter(customer=self.customer)
+        self.assertEqual(packages.count(), 3)
+        self.assertEqual(
+            {item['tracking_number'] for item in response.data['created']},
+            set(packages.values_list('tracking_number', flat=True))
+        )
+
+    def test_bulk_create_from_ndjson(self):
+        """Newline-delimited JSON bodies are accepted"""
+        body = '\n'.join(json.dumps(self.package_row(index)) for index in range(2)) + '\n\n'
+
+        response = self.client.post(self.url, body, content_type='application/x-ndjson')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Package.objects.count(), 2)
+
+    def test_invalid_ndjson_line(self):
+        response = self.client.post(self.url, '{"description": ', content_type='application/x-ndjson')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('line 1', response.data['detail'])
+
+    def test_invalid_rows_are_reported_without_aborting_batch(self):
+        """Row errors are returned by index while valid rows are still created"""
+        rows = [self.package_row(0), self.package_row(1, weight='heavy'), 'not a row', self.package_row(3)]
+
+        response = self.client.post(self.url, rows, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual([item['index'] for item in response.data['created']], [0, 3])
+        self.assertEqual([item['index'] for item in response.data['errors']], [1, 2])
+        self.assertIn('weight', response.data['errors'][0]['errors'])
+        self.assertEqual(Package.objects.count(), 2)
+
+    def test_all_rows_invalid(self):
+        response = self.client.post(self.url, [self.package_row(weight='x')], format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Package.objects.count(), 0)
+
+    def test_body_must_be_a_list(self):
+        response = self.client.post(self.url, self.package_row(), format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(PACKAGES_BULK_CREATE_MAX_ROWS=2)
+    def test_row_limit(self):
+        response = self.client.post(self.url, [self.package_row(i) for i in range(3)], format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(PACKAGES_BULK_CREATE_BATCH_SIZE=2)
+    def test_rows_are_inserted_in_chunks(self):
+        """Packages are written with one INSERT per chunk"""
+        rows = [self.package_row(index) for index in range(5)]
+
+        with CaptureQueriesContext(connection) as context:
+            self.client.post(self.url, rows, format='json')
+
+        inserts = [q for q in context.captured_queries if q['sql'].startswith('INSERT INTO "packages_package"')]
+        self.assertEqual(len(inserts), 3)
+
+    def test_only_customers_can_bulk_create(self):
+        courier = User.objects.create_user(email='courier@example.com', user_role=User.COURIER)
+        self.client.force_authenticate(user=courier)
+
+        response = self.client.post(self.url, [self.package_row()], format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
@@ -0,0 +1,151 @@
+from datetime import timedelta
+from unittest.mock import patch
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase, APIClient
+from packages.models import Package, PackageStatusUpdate
+
+User = get_user_model()
+
+
+class PackageBulkStatusUpdateTestCase(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.courier = User.objects.create_user(email='courier@example.com', user_role=User.COURIER)
+        self.other_courier = User.objects.create_user(email='other@example.com', user_role=User.COURIER)
+        self.customer = User.objects.create_user(email='customer@example.com', user_role=User.CUSTOMER)
+        self.packages = [self.create_package(self.courier) for _ in range(3)]
+        self.client.force_authenticate(user=self.courier)
+        self.url = reverse('package-bulk-update-status')
+        self.scanned_at = timezone.now() - timedelta(hours=2)
+
+    def create_package(self, courier):
+        return Package.objects.create(
+            customer=self.customer,
+            courier=courier,
+            description='Test package',
+            weight='2.50',
+            dimensions='20x15x10',
+            pickup_address='123 Pickup St',
+            delivery_address='456 Delivery Ave'
+        )
+
+    def scan(self, package, package_status='in_transit', minutes=0, **extra):
+        return {
+            'tracking_number': package.tracking_number,
+            'status': package_status,
+            'scanned_at': (self.scanned_at + timedelta(minutes=minutes)).isoformat(),
+            **extra
+        }
+
+    def test_batch_is_applied(self):
+        """Every scan is recorded and packages take their latest status"""
+        scans = [
+            self.scan(self.packages[0], 'in_transit', minutes=0, notes='Picked up'),
+            self.scan(self.packages[0], 'delivered', minutes=30),
+            self.scan(self.packages[1], 'in_transit', minutes=5),
+        ]
+
+        response = self.client.post(self.url, scans, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['index'] for item in response.data['applied']], [0, 1, 2])
+        statuses = dict(Package.objects.values_list('pk', 'status'))
+        self.assertEqual(statuses[self.packages[0].pk], 'delivered')
+        self.assertEqual(statuses[self.packages[1].pk], 'in_transit')
+        self.assertEqual(statuses[self.packages[2].pk], 'pending')
+        self.assertEqual(PackageStatusUpdate.objects.filter(updated_by=self.courier).count(), 3)
+        self.assertTrue(PackageStatusUpdate.objects.filter(notes='Picked up').exists())
+
+    def test_out_of_order_scans_use_latest_scan_time(self):
+        scans = [
+            self.scan(self.packages[0], 'delivered', minutes=30),
+            self.scan(self.packages[0], 'in_transit', minutes=0),
+        ]
+
+        self.client.post(self.url, scans, format='json')
+
+        self.packages[0].refresh_from_db()
+        self.assertEqual(self.packages[0].status, 'delivered')
+
+    def test_replayed_batch_is_idempotent(self):
+        """Sending the same batch twice records each scan once"""
+        scans = [self.scan(package, minutes=index) for index, package in enumerate(self.packages)]
+        self.client.post(self.url, scans, format='json')
+
+        response = self.client.post(self.url, scans + scans, format='json')
+
+        self.assertEqual(response.data['applied'], [])
+        self.assertEqual(response.data['duplicates'], list(range(6)))
+        self.assertEqual(PackageStatusUpdate.objects.count(), 3)
+
+    def test_scans_recorded_by_a_concurrent_replay_are_duplicates(self):
+        """Rows skipped by the insert because another request just recorded them are not applied"""
+        scans = [self.scan(package, minutes=index) for index, package in enumerate(self.packages[:2])]
+        bulk_create = PackageStatusUpdate.objects.bulk_create
+
+        def replay_first(updates, **kwargs):
+            PackageStatusUpdate.objects.create(
+                package=self.packages[0], status='in_transit', scanned_at=self.scanned_at
+            )
+            return bulk_create(updates, **kwargs)
+
+        with patch.object(PackageStatusUpdate.objects, 'bulk_create', side_effect=replay_first):
+            response = self.client.post(self.url, scans, format='json')
+
+        self.assertEqual([item['index'] for item in response.data['applied']], [1])
+        self.assertEqual(response.data['duplicates'], [0])
+        self.assertEqual(PackageStatusUpdate.objects.count(), 2)
+
+    def test_query_count_does_not_depend_on_batch_size(self):
+        """Authorization, deduplication and writes are done in bulk"""
+        extra = [self.create_package(self.courier) for _ in range(5)]
+
+        def run(packages, minutes):
+            scans = [self.scan(package, minutes=minutes) for package in packages]
+            with CaptureQueriesContext(connection) as context:
+                self.client.post(self.url, scans, format='json')
+            return len(context.captured_queries)
+
+        self.assertEqual(run(self.packages[:1], 0), run(self.packages + extra, 10))
+
+    def test_unassigned_packages_are_rejected(self):
+        """Couriers cannot scan packages assigned to someone else"""
+        foreign = self.create_package(self.other_courier)
+        scans = [self.scan(self.packages[0]), self.scan(foreign)]
+
+        response = self.client.post(self.url, scans, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(response.data['errors'][0]['index'], 1)
+        foreign.refresh_from_db()
+        self.assertEqual(foreign.status, 'pending')
+
+    def test_invalid_scans_are_reported(self):
+        scans = [{'tracking_number': self.packages[0].tracking_number, 'status': 'lost'}]
+
+        response = self.client.post(self.url, scans, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('status', response.data['errors'][0]['errors'])
+        self.assertIn('scanned_at', response.data['errors'][0]['errors'])
+
+    def test_admin_can_scan_any_package(self):
+        admin = User.objects.create_user(email='admin@example.com', user_role=User.ADMIN)
+        self.client.force_authenticate(user=admin)
+        foreign = self.create_package(self.other_courier)
+
+        response = self.client.post(self.url, [self.scan(foreign)], format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_customers_cannot_scan(self):
+        self.client.force_authenticate(user=self.customer)
+
+        response = self.client.post(self.url, [self.scan(self.packages[0])], format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
@@ -0,0 +1,167 @@
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.test import APITestCase, APIClient
+from packages.cache import get_tracking_cache
+from packages.models import Package, PackageStatusUpdate
+
+User = get_user_model()
+
+
+class ConditionalRequestTestCase(APITestCase):
+    def setUp(self):
+        get_tracking_cache().clear()
+        self.client = APIClient()
+        self.customer = User.objects.create_user(email='customer@example.com', user_role=User.CUSTOMER)
+        self.courier = User.objects.create_user(email='courier@example.com', user_role=User.COURIER)
+        self.package = Package.objects.create(
+            customer=self.customer,
+            courier=self.courier,
+            description='Test package',
+            weight='2.50',
+            dimensions='20x15x10',
+            pickup_address='123 Pickup St',
+            delivery_address='456 Delivery Ave'
+        )
+        PackageStatusUpdate.objects.create(package=self.package, status='pending', updated_by=self.customer)
+        self.package.refresh_status_summary()
+        self.detail_url = reverse('package-detail', args=[self.package.pk])
+        self.track_url = f"{reverse('package-track')}?tracking_number={self.package.tracking_number}"
+
+    def update_status(self, **headers):
+        self.client.force_authenticate(user=self.courier)
+        return self.client.post(
+            reverse('package-update-status', args=[self.package.pk]),
+            {'status': 'in_transit', 'notes': 'Picked up'},
+            format='json',
+            headers=headers
+        )
+
+    def test_retrieve_validators(self):
+        self.client.force_authenticate(user=self.customer)
+
+        response = self.client.get(self.detail_url)
+
+        self.package.refresh_from_db()
+        updated_at = self.package.updated_at
+        microseconds = int(updated_at.timestamp()) * 1_000_000 + updated_at.microsecond
+        self.assertEqual(response['ETag'], f'"{self.package.pk}-{microseconds}-1"')
+        self.assertEqual(response['Last-Modified'], http_date(int(self.package.updated_at.timestamp())))
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assertIn('private', response['Cache-Control'])
+
+    def test_retrieve_not_modified_without_serializing(self):
+        self.client.force_authenticate(user=self.customer)
+        etag = self.client.get(self.detail_url)['ETag']
+
+        # Only the package row is read; the status history is not
+        with self.assertNumQueries(1):
+            response = self.client.get(self.detail_url, headers={'If-None-Match': etag})
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response.content, b'')
+
+    def test_retrieve_if_modified_since(self):
+        self.client.force_authenticate(user=self.customer)
+        last_modified = self.client.get(self.detail_url)['Last-Modified']
+
+        response = self.client.get(self.detail_url, headers={'If-Modified-Since': last_modified})
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_etag_changes_with_the_package(self):
+        self.client.force_authenticate(user=self.customer)
+        etag = self.client.get(self.detail_url)['ETag']
+
+        self.update_status()
+        self.client.force_authenticate(user=self.customer)
+        response = self.client.get(self.detail_url, headers={'If-None-Match': etag})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.data['status'], 'in_transit')
+
+    def test_representations_have_distinct_etags(self):
+        self.client.force_authenticate(user=self.customer)
+        full = self.client.get(self.detail_url)['ETag']
+        sparse = self.client.get(self.detail_url, {'fields': 'id,status'})['ETag']
+        browsable = self.client.get(self.detail_url, headers={'Accept': 'text/html'})['ETag']
+
+        self.assertEqual(len({full, sparse, browsable}), 3)
+        self.assertTrue(sparse.startswith(full[:-1] + '-'))
+
+        response = self.client.get(self.detail_url, {'fields': 'id,status'}, headers={'If-None-Match': full})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_public_track_not_modified_from_cache(self):
+        etag = self.client.get(self.track_url)['ETag']
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.track_url, headers={'If-None-Match': etag})
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertIn('Authorization', response['Vary'])
+
+    def test_owner_track_has_its_own_etag(self):
+        public = self.client.get(self.track_url)['ETag']
+        self.client.force_authenticate(user=self.customer)
+
+        response = self.client.get(self.track_url, headers={'If-None-Match': public})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['customer_email'], 'customer@example.com')
+        self.assertEqual(
+            self.client.get(self.track_url, headers={'If-None-Match': response['ETag']}).status_code,
+            status.HTTP_304_NOT_MODIFIED
+        )
+
+    def test_status_history_not_modified(self):
+        self.client.force_authenticate(user=self.customer)
+        url = reverse('package-status-list', args=[self.package.pk])
+        response = self.client.get(url)
+
+        # The package and, for the permission check, its customer; no history
+        with self.assertNumQueries(2):
+            not_modified = self.client.get(url, headers={'If-None-Match': response['ETag']})
+
+        self.assertEqual(not_modified.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertNotEqual(self.client.get(url, {'page_size': 1})['ETag'], response['ETag'])
+
+    def test_status_history_of_hidden_package_has_no_etag(self):
+        other = User.objects.create_user(email='other@example.com', user_role=User.CUSTOMER)
+        self.client.force_authenticate(user=other)
+
+        response = self.client.get(reverse('package-status-list', args=[self.package.pk]))
+
+        self.assertEqual(response.data['results'], [])
+        self.assertFalse(response.has_header('ETag'))
+
+    def test_update_status_if_match(self):
+        self.client.force_authenticate(user=self.customer)
+        sparse_etag = self.client.get(self.detail_url, {'fields': 'status'})['ETag']
+
+        response = self.update_status(**{'If-Match': sparse_etag})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['status'], 'in_transit')
+        self.client.force_authenticate(user=self.customer)
+        self.assertEqual(self.client.get(self.detail_url)['ETag'], response['ETag'])
+
+    def test_update_status_with_stale_etag(self):
+        self.client.force_authenticate(user=self.customer)
+        etag = self.client.get(self.detail_url)['ETag']
+        self.update_status()
+
+        response = self.update_status(**{'If-Match': etag})
+
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.assertEqual(self.package.status_updates.count(), 2)
+
+    def test_update_status_if_match_any_and_weak(self):
+        self.client.force_authenticate(user=self.customer)
+        etag = self.client.get(self.detail_url)['ETag']
+
+        self.assertEqual(self.update_status(**{'If-Match': f'W/{etag}'}).status_code, 412)
+        self.assertEqual(self.update_status(**{'If-Match': '*'}).status_code, 200)
@@ -0,0 +1,183 @@
+import asyncio
+import threading
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from packages.events import (
+    SubscriptionOverflow, TrackingEventBroker, publish_status_updates, status_event, tracking_events
+)
+from packages.models import Package, PackageStatusUpdate
+from packages.serializers import PackageStatusUpdateCreateSerializer
+
+User = get_user_model()
+
+
+class TrackingEventBrokerTestCase(TestCase):
+    def test_publish_from_another_thread(self):
+        """Events published by a worker thread reach the subscriber's loop"""
+        broker = TrackingEventBroker()
+
+        async def receive():
+            subscription = broker.subscribe(['PKG-1'])
+            event = status_event(1, 'PKG-1', 'in_transit', None)
+            thread = threading.Thread(target=broker.publish, args=([event],))
+            thread.start()
+            thread.join()
+            return await subscription.get(timeout=1)
+
+        self.assertEqual(asyncio.run(receive())['status'], 'in_transit')
+
+    def test_only_subscribed_tracking_numbers_are_delivered(self):
+        broker = TrackingEventBroker()
+
+        async def receive():
+            subscription = broker.subscribe(['PKG-1'])
+            broker.publish([status_event(1, 'PKG-2', 'pending', None)])
+            return await subscription.get(timeout=0.01)
+
+        self.assertIsNone(asyncio.run(receive()))
+
+    def test_slow_subscriber_overflows(self):
+        """A full queue marks the subscription overflowed instead of growing"""
+        broker = TrackingEventBroker()
+
+        async def receive():
+            subscription = broker.subscribe(['PKG-1'], maxsize=2)
+            broker.publish([status_event(pk, 'PKG-1', 'pending', None) for pk in range(3)])
+            await asyncio.sleep(0)
+            await subscription.get(timeout=1)
+
+        with self.assertRaises(SubscriptionOverflow):
+            asyncio.run(receive())
+
+    def test_unsubscribe(self):
+        broker = TrackingEventBroker()
+
+        async def subscribe():
+            broker.unsubscribe(broker.subscribe(['PKG-1', 'PKG-2']))
+
+        asyncio.run(subscribe())
+
+        self.assertFalse(broker.is_watched('PKG-1'))
+        self.assertFalse(broker.is_watched('PKG-2'))
+
+
+@override_settings(PACKAGE_EVENTS_HEARTBEAT_INTERVAL=0.05)
+class TrackStreamTestCase(TestCase):
+    def setUp(self):
+        self.customer = User.objects.create_user(email='customer@example.com', user_role=User.CUSTOMER)
+        self.courier = User.objects.create_user(email='courier@example.com', user_role=User.COURIER)
+        self.package = Package.objects.create(
+            customer=self.customer,
+            courier=self.courier,
+            description='Parcel',
+            weight='1.00',
+            dimensions='10x10x10',
+            pickup_address='123 Pickup St',
+            delivery_address='456 Delivery Ave'
+        )
+        self.first_update = PackageStatusUpdate.objects.create(
+            package=self.package, status='pending', notes='Created', updated_by=self.customer
+        )
+        self.second_update = PackageStatusUpdate.objects.create(
+            package=self.package, status='in_transit', notes='Picked up', updated_by=self.courier
+        )
+        self.url = reverse('package-track-stream')
+
+    async def read_events(self, response, count):
+        chunks = []
+        iterator = aiter(response.streaming_content)
+        while len(chunks) < count:
+            chunks.append((await anext(iterator)).decode())
+        await iterator.aclose()
+        return chunks
+
+    async def test_requires_tracking_number(self):
+        response = await self.async_client.get(self.url)
+
+        self.assertEqual(response.status_code, 400)
+
+    async def test_unknown_tracking_number(self):
+        response = await self.async_client.get(self.url, {'tracking_number': 'PKG-MISSING'})
+
+        self.assertEqual(response.status_code, 404)
+
+    async def test_replays_history_after_last_event_id(self):
+        response = await self.async_client.get(
+            self.url, {'tracking_number': self.package.tracking_number},
+            headers={'Last-Event-ID': str(self.first_update.pk)}
+        )
+
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        retry, event, heartbeat = await self.read_events(response, 3)
+        self.assertTrue(retry.startswith('retry:'))
+        self.assertIn(f'id: {self.second_update.pk}\n', event)
+        self.assertIn('"status": "in_transit"', event)
+        self.assertNotIn('Picked up', event)
+        self.assertEqual(heartbeat, ': heartbeat\n\n')
+
+    async def test_streams_committed_status_updates(self):
+        """A status update written by a sync view is pushed after commit"""
+        response = await self.async_client.get(
+            self.url, {'tracking_number': f'{self.package.tracking_number},PKG-OTHER'}
+        )
+        iterator = aiter(response.streaming_content)
+        await anext(iterator)
+        self.assertTrue(tracking_events.is_watched(self.package.tracking_number))
+
+        @sync_to_async
+        def deliver():
+            request = type('Request', (), {'user': self.courier})()
+            serializer = PackageStatusUpdateCreateSerializer(
+                data={'status': 'delivered', 'notes': 'Left at door'},
+                context={'package': self.package, 'request': request}
+            )
+            serializer.is_valid(raise_exception=True)
+            with self.captureOnCommitCallbacks(execute=True):
+                return serializer.save()
+
+        status_update = await deliver()
+        event = (await anext(iterator)).decode()
+        await iterator.aclose()
+
+        self.assertIn(f'id: {status_update.pk}\n', event)
+        self.assertIn('"status": "delivered"', event)
+
+    async def test_publishes_bulk_created_scans(self):
+        """Rows inserted with ignore_conflicts have no pk; they are looked up by scan key"""
+        subscription = tracking_events.subscribe([self.package.tracking_number])
+
+        @sync_to_async
+        def scan():
+            scanned = PackageStatusUpdate(
+                package=self.package, status='delivered', updated_by=self.courier,
+                scanned_at=self.second_update.created_at
+            )
+            with self.captureOnCommitCallbacks(execute=True):
+                PackageStatusUpdate.objects.bulk_create([scanned], ignore_conflicts=True)
+                publish_status_updates([scanned])
+            return PackageStatusUpdate.objects.get(scanned_at__isnull=False)
+
+        try:
+            status_update = await scan()
+            event = await subscription.get(timeout=1)
+        finally:
+            tracking_events.unsubscribe(subscription)
+
+        self.assertEqual(event['id'], status_update.pk)
+        self.assertEqual(event['status'], 'delivered')
+
+    async def test_disconnect_unsubscribes(self):
+        """Cancelling the stream (client disconnect under ASGI) drops the subscription"""
+        response = await self.async_client.get(self.url, {'tracking_number': self.package.tracking_number})
+        iterator = aiter(response.streaming_content)
+        await anext(iterator)
+
+        pending = asyncio.ensure_future(anext(iterator))
+        await asyncio.sleep(0)
+        pending.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await pending
+
+        self.assertFalse(tracking_events.is_watched(self.package.tracking_number))
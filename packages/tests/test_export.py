@@ -0,0 +1,130 @@
+import csv
+import io
+import json
+from datetime import timedelta
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase, APIClient
+from packages.models import Package, PackageStatusUpdate
+
+User = get_user_model()
+
+
+class PackageExportTestCase(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.customer = User.objects.create_user(email='customer@example.com', user_role=User.CUSTOMER)
+        self.other_customer = User.objects.create_user(email='other@example.com', user_role=User.CUSTOMER)
+        self.courier = User.objects.create_user(email='courier@example.com', user_role=User.COURIER)
+        self.admin = User.objects.create_user(email='admin@example.com', user_role=User.ADMIN)
+        self.delivered = self.create_package(self.customer, 'delivered', description='Books, "rare"')
+        self.pending = self.create_package(self.customer, 'pending')
+        self.other = self.create_package(self.other_customer, 'pending', courier=None)
+        for status_value in ('pending', 'in_transit', 'delivered'):
+            PackageStatusUpdate.objects.create(
+                package=self.delivered, status=status_value, notes=f'{status_value} scan', updated_by=self.courier
+            )
+        self.url = reverse('package-export')
+
+    def create_package(self, customer, status_value, courier='default', **kwargs):
+        return Package.objects.create(
+            customer=customer,
+            courier=self.courier if courier == 'default' else courier,
+            description=kwargs.pop('description', 'Parcel'),
+            weight='1.50',
+            dimensions='10x10x10',
+            pickup_address='123 Pickup St',
+            delivery_address='456 Delivery Ave',
+            status=status_value,
+        )
+
+    def read_csv(self, response):
+        content = b''.join(response.streaming_content).decode()
+        return list(csv.DictReader(io.StringIO(content)))
+
+    def test_csv_export_is_streamed_and_role_filtered(self):
+        self.client.force_authenticate(user=self.customer)
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertIn('attachment; filename="packages-', response['Content-Disposition'])
+        rows = self.read_csv(response)
+        self.assertEqual([row['tracking_number'] for row in rows],
+                         [self.delivered.tracking_number, self.pending.tracking_number])
+        self.assertEqual(rows[0]['description'], 'Books, "rare"')
+        self.assertEqual(rows[0]['customer_email'], 'customer@example.com')
+        self.assertEqual(rows[0]['weight'], '1.50')
+        self.assertNotIn('history_status', rows[0])
+
+    def test_csv_cells_are_not_formulas(self):
+        """Text starting with a formula character is exported as text"""
+        self.client.force_authenticate(user=self.customer)
+        for description in ['=HYPERLINK("http://example.com")', '+1', '-1', '@SUM(A1)']:
+            self.create_package(self.customer, 'pending', description=description)
+
+        rows = self.read_csv(self.client.get(self.url))
+
+        self.assertEqual(
+            [row['description'] for row in rows[2:]],
+            ['\'=HYPERLINK("http://example.com")', "'+1", "'-1", "'@SUM(A1)"]
+        )
+        self.assertEqual(rows[0]['weight'], '1.50')
+
+    def test_status_and_date_filters(self):
+        self.client.force_authenticate(user=self.admin)
+        Package.objects.filter(pk=self.pending.pk).update(created_at=timezone.now() - timedelta(days=10))
+
+        response = self.client.get(self.url, {
+            'status': 'pending',
+            'created_after': (timezone.now() - timedelta(days=1)).isoformat(),
+        })
+
+        self.assertEqual([row['id'] for row in self.read_csv(response)], [str(self.other.pk)])
+
+    def test_ndjson_export_with_history(self):
+        """One flattened row per status update; packages without history keep one row"""
+        self.client.force_authenticate(user=self.courier)
+
+        response = self.client.get(self.url, {'export_format': 'ndjson', 'include_history': 'true'})
+
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson; charset=utf-8')
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(
+            [(row['tracking_number'], row['history_status']) for row in rows],
+            [
+                (self.delivered.tracking_number, 'pending'),
+                (self.delivered.tracking_number, 'in_transit'),
+                (self.delivered.tracking_number, 'delivered'),
+                (self.pending.tracking_number, None),
+            ]
+        )
+        self.assertEqual(rows[0]['history_updated_by'], 'courier@example.com')
+        self.assertEqual(rows[0]['weight'], '1.50')
+
+    def test_export_runs_one_query(self):
+        self.client.force_authenticate(user=self.admin)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, {'include_history': 'true'})
+            rows = self.read_csv(response)
+
+        self.assertEqual(len(rows), 5)
+
+    def test_invalid_parameters(self):
+        self.client.force_authenticate(user=self.admin)
+
+        response = self.client.get(self.url, {'export_format': 'xml', 'status': 'lost'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('export_format', response.data)
+        self.assertIn('status', response.data)
+
+    def test_requires_authentication(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
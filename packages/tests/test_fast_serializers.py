@@ -0,0 +1,129 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase, APIClient
+from packages.fast_serializers import PackageValuesSerializer, package_from_row
+from packages.models import Package, PackageStatusUpdate
+from packages.serializers import PackageSerializer
+
+User = get_user_model()
+
+
+class PackageValuesSerializerTestCase(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.customer = User.objects.create_user(email='customer@example.com', user_role=User.CUSTOMER)
+        self.courier = User.objects.create_user(
+            email='courier@example.com', user_role=User.COURIER, first_name='Cora', last_name='Courier'
+        )
+        self.admin = User.objects.create_user(email='admin@example.com', user_role=User.ADMIN)
+        self.assigned = Package.objects.create(
+            customer=self.customer,
+            courier=self.courier,
+            description='Fragile ☃ glass',
+            weight='12.50',
+            dimensions='10x10x10',
+            pickup_address='123 Pickup St',
+            delivery_address='456 Delivery Ave'
+        )
+        self.unassigned = Package.objects.create(
+            customer=self.customer,
+            description='Books',
+            weight='3.00',
+            dimensions='20x15x10',
+            pickup_address='1 Library Rd',
+            delivery_address='2 Reader Ln'
+        )
+        PackageStatusUpdate.objects.create(
+            package=self.assigned, status='pending', notes=None, updated_by=self.customer
+        )
+        PackageStatusUpdate.objects.create(
+            package=self.assigned, status='in_transit', notes='Picked up', updated_by=self.courier,
+            scanned_at=timezone.now() - timedelta(minutes=5)
+        )
+        PackageStatusUpdate.objects.create(
+            package=self.assigned, status='in_transit', notes='Hub', updated_by=None
+        )
+        for package in (self.assigned, self.unassigned):
+            package.refresh_status_summary()
+
+    def render(self, data):
+        return JSONRenderer().render(data)
+
+    def expected(self, *packages, fields=None, history_limit=None):
+        """PackageSerializer's output, cut down to the fields and history asked for"""
+        queryset = PackageSerializer.setup_eager_loading(
+            Package.objects.filter(pk__in=[package.pk for package in packages]).order_by('-created_at', '-id')
+        )
+        data = PackageSerializer(queryset, many=True).data
+        for row in data:
+            if fields is not None:
+                for name in set(row) - set(fields):
+                    del row[name]
+            if history_limit is not None:
+                row['status_updates'] = row['status_updates'][:history_limit]
+        return self.render(data)
+
+    def actual(self, *packages, **kwargs):
+        rows = PackageValuesSerializer.setup_eager_loading(
+            Package.objects.filter(pk__in=[package.pk for package in packages]).order_by('-created_at', '-id'),
+            **kwargs
+        )
+        return self.render(PackageValuesSerializer(list(rows), many=True, **kwargs).data)
+
+    def test_output_is_byte_identical(self):
+        self.assertEqual(self.actual(self.assigned, self.unassigned), self.expected(self.assigned, self.unassigned))
+
+    def test_sparse_output_is_byte_identical(self):
+        for options in (
+            {'fields': ['id', 'courier_email', 'weight', 'status_updates']},
+            {'fields': ['tracking_number', 'created_at']},
+            {'history_limit': 2},
+        ):
+            with self.subTest(**options):
+                self.assertEqual(
+                    self.actual(self.assigned, self.unassigned, **options),
+                    self.expected(self.assigned, self.unassigned, **options)
+                )
+
+    def test_single_row(self):
+        row = PackageValuesSerializer.setup_eager_loading(Package.objects.filter(pk=self.assigned.pk)).get()
+        expected = PackageSerializer(PackageSerializer.setup_eager_loading(Package.objects.all()).get(pk=self.assigned.pk))
+
+        self.assertEqual(self.render(PackageValuesSerializer(row).data), self.render(expected.data))
+
+    def test_history_is_one_query(self):
+        rows = list(PackageValuesSerializer.setup_eager_loading(Package.objects.all()))
+
+        with self.assertNumQueries(1):
+            PackageValuesSerializer(rows, many=True).data
+
+    def test_endpoints_match_package_serializer(self):
+        self.client.force_authenticate(user=self.customer)
+        detail = self.client.get(reverse('package-detail', args=[self.assigned.pk]))
+        listing = self.client.get(reverse('package-list'))
+        track = self.client.get(reverse('package-track'), {'tracking_number': self.assigned.tracking_number})
+
+        expected = self.expected(self.assigned)
+        self.assertEqual(self.render([detail.data]), expected)
+        self.assertEqual(self.render([track.data]), expected)
+        self.assertEqual(self.render(listing.data['results']), self.expected(self.assigned, self.unassigned))
+
+    def test_retrieve_by_unassigned_courier(self):
+        other = User.objects.create_user(email='other@example.com', user_role=User.COURIER)
+        self.client.force_authenticate(user=other)
+
+        response = self.client.get(reverse('package-detail', args=[self.assigned.pk]))
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_package_from_row(self):
+        row = PackageValuesSerializer.setup_eager_loading(Package.objects.filter(pk=self.unassigned.pk)).get()
+
+        package = package_from_row(row)
+
+        self.assertEqual(package.customer, self.customer)
+        self.assertIsNone(package.courier)
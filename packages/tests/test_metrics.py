@@ -0,0 +1,167 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from accounts.authentication import get_user_cache
+from courier_service_api import metrics
+from courier_service_api.metrics import Histogram, timed
+from packages.cache import get_tracking_cache
+from packages.models import Package
+
+User = get_user_model()
+
+
+class HistogramTestCase(SimpleTestCase):
+    def test_cumulative_buckets(self):
+        histogram = Histogram('latency_seconds', 'Latency.', (0.1, 1))
+        for value in (0.05, 0.1, 0.5, 3):
+            histogram.observe(value, view='package-track', method='GET')
+
+        lines = histogram.expose().splitlines()
+
+        self.assertEqual(lines[:2], ['# HELP latency_seconds Latency.', '# TYPE latency_seconds histogram'])
+        self.assertEqual(lines[2:], [
+            'latency_seconds_bucket{view="package-track",method="GET",le="0.1"} 2',
+            'latency_seconds_bucket{view="package-track",method="GET",le="1"} 3',
+            'latency_seconds_bucket{view="package-track",method="GET",le="+Inf"} 4',
+            'latency_seconds_sum{view="package-track",method="GET"} 3.650000',
+            'latency_seconds_count{view="package-track",method="GET"} 4',
+        ])
+
+    def test_label_values_are_escaped(self):
+        histogram = Histogram('latency_seconds', 'Latency.', (1,))
+        histogram.observe(0, view='a"b\\c', method='GET')
+
+        self.assertIn('view="a\\"b\\\\c"', histogram.expose())
+
+    def test_nested_phase_counted_once(self):
+        timings, token = metrics.start_request()
+        try:
+            with timed('serialize'):
+                with timed('serialize'):
+                    pass
+                self.assertEqual(timings.phases, {})
+            self.assertEqual(list(timings.phases), ['serialize'])
+        finally:
+            metrics.end_request(token)
+
+    def test_timed_outside_requests(self):
+        with timed('serialize'):
+            pass
+
+        self.assertIsNone(metrics.get_current_timings())
+
+
+class PerformanceMiddlewareTestCase(TestCase):
+    def setUp(self):
+        metrics.registry.clear()
+        get_tracking_cache().clear()
+        get_user_cache().clear()
+        self.client = APIClient()
+        self.customer = User.objects.create_user(email='customer@example.com', user_role=User.CUSTOMER)
+        self.admin = User.objects.create_user(email='admin@example.com', user_role=User.ADMIN)
+        self.package = Package.objects.create(
+            customer=self.customer,
+            description='Test package',
+            weight='2.50',
+            dimensions='20x15x10',
+            pickup_address='123 Pickup St',
+            delivery_address='456 Delivery Ave'
+        )
+
+    def server_timing(self, response):
+        """{name: (duration ms, description)} from the Server-Timing header"""
+        entries = {}
+        for entry in response['Server-Timing'].split(', '):
+            name, *params = entry.split(';')
+            params = dict(param.split('=', 1) for param in params)
+            entries[name] = (float(params['dur']), params.get('desc', '').strip('"'))
+        return entries
+
+    def test_server_timing_header(self):
+        self.client.force_authenticate(user=self.customer)
+
+        response = self.client.get(reverse('package-detail', args=[self.package.pk]))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        timing = self.server_timing(response)
+        self.assertGreaterEqual(timing['total'][0], timing['db'][0])
+        query_count = int(timing['db'][1].split()[0])
+        self.assertGreater(query_count, 0)
+        self.assertIn('serialize', timing)
+        self.assertIn('render', timing)
+        # The wrappers are removed again
+        self.assertEqual(connection.execute_wrappers, [])
+
+    def test_authenticated_request_times_auth(self):
+        response = self.client.get(
+            reverse('package-list'), headers={'Authorization': f'Bearer {AccessToken.for_user(self.customer)}'}
+        )
+
+        self.assertIn('auth', self.server_timing(response))
+
+    @override_settings(PERFORMANCE_SERVER_TIMING=False)
+    def test_server_timing_can_be_turned_off(self):
+        response = self.client.get(reverse('package-track'), {'tracking_number': self.package.tracking_number})
+
+        self.assertNotIn('Server-Timing', response)
+
+    def test_histograms_labelled_by_view(self):
+        url = reverse('package-track')
+        for _ in range(2):
+            self.client.get(url, {'tracking_number': self.package.tracking_number})
+        self.client.get('/api/nowhere/')
+
+        series = metrics.registry.db_queries._series
+        counts, _, count = series['package-track', 'GET']
+        self.assertEqual(count, 2)
+        # The second request is served from the snapshot cache without queries
+        self.assertEqual(counts[0], 1)
+        self.assertIn(('unmatched', 'GET'), series)
+        self.assertEqual(metrics.registry.response_size._series['package-track', 'GET'][2], 2)
+
+    def test_metrics_endpoint(self):
+        self.client.force_authenticate(user=self.admin)
+        self.client.get(reverse('package-list'))
+
+        response = self.client.get(reverse('metrics'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        text = response.content.decode()
+        self.assertIn('# TYPE http_request_duration_seconds histogram', text)
+        self.assertRegex(
+            text, re.escape('http_request_db_queries_count{view="package-list",method="GET"} ') + r'1\n'
+        )
+
+    def test_metrics_endpoint_is_admin_only(self):
+        self.client.force_authenticate(user=self.customer)
+
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, status.HTTP_403_FORBIDDEN)
+
+
+class AsyncPerformanceMiddlewareTestCase(TestCase):
+    def setUp(self):
+        get_tracking_cache().clear()
+        customer = User.objects.create_user(email='customer@example.com', user_role=User.CUSTOMER)
+        self.package = Package.objects.create(
+            customer=customer,
+            description='Test package',
+            weight='2.50',
+            dimensions='20x15x10',
+            pickup_address='123 Pickup St',
+            delivery_address='456 Delivery Ave'
+        )
+
+    async def test_queries_counted_under_asgi(self):
+        response = await self.async_client.get(
+            reverse('package-track'), {'tracking_number': self.package.tracking_number}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertRegex(response['Server-Timing'], r'db;dur=[\d.]+;desc="[1-9]\d* queries"')
@@ -0,0 +1,136 @@
+from datetime import timedelta
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase, APIClient
+from unittest.mock import patch
+from packages.models import Package, PackageStatusUpdate
+from packages.pagination import KeysetCursorPagination
+
+User = get_user_model()
+
+
+class KeysetCursorPaginationTestCase(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = User.objects.create_user(email='admin@example.com', user_role=User.ADMIN)
+        self.customer = User.objects.create_user(email='customer@example.com', user_role=User.CUSTOMER)
+        self.client.force_authenticate(user=self.admin)
+        self.url = reverse('package-list')
+
+    def create_packages(self, count, created_at=None, **extra):
+        packages = [
+            Package.objects.create(
+                customer=self.customer,
+                description=f'Package {index}',
+                weight='1.00',
+                dimensions='10x10x10',
+                pickup_address='123 Pickup St',
+                delivery_address='456 Delivery Ave',
+                **extra
+            ) for index in range(count)
+        ]
+        if created_at is not None:
+            # Force identical timestamps so that only the id breaks ties
+            Package.objects.filter(pk__in=[p.pk for p in packages]).update(created_at=created_at)
+        return packages
+
+    def collect_pages(self, url):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            ids.extend(item['id'] for item in response.data['results'])
+            url = response.data['next']
+        return ids
+
+    def test_pages_cover_every_row_once_with_timestamp_ties(self):
+        """Rows sharing created_at are split across pages by id"""
+        now = timezone.now()
+        self.create_packages(5, created_at=now)
+        self.create_packages(4, created_at=now - timedelta(days=1))
+
+        ids = self.collect_pages(f'{self.url}?page_size=2')
+
+        expected = list(
+            Package.objects.order_by('-created_at', '-id').values_list('id', flat=True)
+        )
+        self.assertEqual(ids, expected)
+
+    def test_next_page_is_stable_under_concurrent_inserts(self):
+        """Packages created between requests do not shift later pages"""
+        self.create_packages(4, created_at=timezone.now() - timedelta(hours=1))
+
+        first = self.client.get(f'{self.url}?page_size=2')
+        self.create_packages(3)
+        second = self.client.get(first.data['next'])
+
+        first_ids = [item['id'] for item in first.data['results']]
+        second_ids = [item['id'] for item in second.data['results']]
+        expected = list(
+            Package.objects.order_by('-created_at', '-id').values_list('id', flat=True)
+        )[3:]
+        self.assertEqual(first_ids + second_ids, expected[:4])
+
+    def test_previous_link_returns_preceding_page(self):
+        """Following previous from the second page returns the first page"""
+        self.create_packages(5)
+
+        first = self.client.get(f'{self.url}?page_size=2')
+        second = self.client.get(first.data['next'])
+        previous = self.client.get(second.data['previous'])
+
+        self.assertIsNone(first.data['previous'])
+        self.assertEqual(previous.data['results'], first.data['results'])
+
+    def test_page_size_is_capped(self):
+        """Requested page sizes above the maximum are clamped"""
+        self.create_packages(4)
+
+        with patch.object(KeysetCursorPagination, 'max_page_size', 3):
+            response = self.client.get(f'{self.url}?page_size=100')
+
+        self.assertEqual(len(response.data['results']), 3)
+        self.assertIsNotNone(response.data['next'])
+
+    def test_ordering_parameter_is_respected(self):
+        """Cursors follow the ordering chosen through OrderingFilter"""
+        self.create_packages(2, status='pending')
+        self.create_packages(2, status='delivered')
+
+        response = self.client.get(f'{self.url}?ordering=status&page_size=3')
+        next_page = self.client.get(response.data['next'])
+
+        statuses = [item['status'] for item in response.data['results'] + next_page.data['results']]
+        self.assertEqual(statuses, ['delivered', 'delivered', 'pending', 'pending'])
+
+    def test_invalid_cursor(self):
+        """A malformed cursor is reported as not found"""
+        response = self.client.get(f'{self.url}?cursor=not-a-cursor')
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_deleted_packages_are_paginated(self):
+        """Soft-deleted packages are listed page by page"""
+        self.create_packages(3, is_deleted=True)
+        self.create_packages(2)
+
+        ids = self.collect_pages(f"{reverse('package-deleted-packages')}?page_size=2")
+
+        self.assertEqual(
+            sorted(ids),
+            sorted(Package.objects.filter(is_deleted=True).values_list('id', flat=True))
+        )
+
+    def test_status_updates_are_paginated(self):
+        """Status history is paginated newest first"""
+        package = self.create_packages(1)[0]
+        updates = [
+            PackageStatusUpdate.objects.create(package=package, status='pending', updated_by=self.admin)
+            for _ in range(3)
+        ]
+
+        ids = self.collect_pages(f"{reverse('package-status-list', args=[package.pk])}?page_size=2")
+
+        self.assertEqual(ids, [update.pk for update in reversed(updates)])
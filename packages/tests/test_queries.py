@@ -0,0 +1,77 @@
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase, APIClient
+from packages.models import Package, PackageStatusUpdate
+from packages.tests.utils import QueryCountAssertionsMixin
+
+User = get_user_model()
+
+
+class PackageQueryCountTestCase(QueryCountAssertionsMixin, APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = User.objects.create_user(
+            email='admin@example.com', user_role=User.ADMIN,
+            first_name='Ada', last_name='Admin'
+        )
+        self.courier = User.objects.create_user(
+            email='courier@example.com', user_role=User.COURIER
+        )
+        self.customer = User.objects.create_user(
+            email='customer@example.com', user_role=User.CUSTOMER
+        )
+
+    def seed_packages(self, count):
+        for _ in range(count):
+            package = Package.objects.create(
+                customer=self.customer,
+                courier=self.courier,
+                description='Test package',
+                weight='2.50',
+                dimensions='20x15x10',
+                pickup_address='123 Pickup St',
+                delivery_address='456 Delivery Ave'
+            )
+            for package_status in ('pending', 'in_transit'):
+                PackageStatusUpdate.objects.create(
+                    package=package, status=package_status, updated_by=self.admin
+                )
+
+    def test_list_query_count_is_constant_for_admin(self):
+        """Listing packages does not issue per-row queries for relations"""
+        self.client.force_authenticate(user=self.admin)
+        url = reverse('package-list')
+
+        def request():
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertConstantQueryCount(self.seed_packages, request)
+
+    def test_list_query_count_is_constant_for_customer(self):
+        """Customer listings load customer, courier and history up front"""
+        self.client.force_authenticate(user=self.customer)
+        url = reverse('package-list')
+
+        def request():
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.data['results'][0]['status_updates'][0]['updated_by_name'], 'Ada Admin')
+
+        self.assertConstantQueryCount(self.seed_packages, request)
+
+    def test_status_update_list_query_count_is_constant(self):
+        """Status history listings join the updating user"""
+        self.client.force_authenticate(user=self.admin)
+        self.seed_packages(1)
+        package = Package.objects.get()
+
+        def seed(count):
+            for _ in range(count):
+                PackageStatusUpdate.objects.create(
+                    package=package, status='in_transit', updated_by=self.admin
+                )
+
+        url = reverse('package-status-list', args=[package.pk])
+        self.assertConstantQueryCount(seed, lambda: self.client.get(url))
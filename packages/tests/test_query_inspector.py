@@ -0,0 +1,138 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import path
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from courier_service_api.queries import NPlusOneQueryError, QueryInspector, fingerprint
+from packages.models import Package
+from packages.serializers import PackageSerializer
+
+User = get_user_model()
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def packages_without_eager_loading(request):
+    # Everything but the customers is loaded up front
+    packages = Package.objects.select_related('courier').prefetch_related('status_updates__updated_by')
+    return Response(PackageSerializer(packages.order_by('pk'), many=True).data)
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def packages_with_eager_loading(request):
+    packages = PackageSerializer.setup_eager_loading(Package.objects.order_by('pk'))
+    return Response(PackageSerializer(packages, many=True).data)
+
+
+urlpatterns = [
+    path('lazy/', packages_without_eager_loading),
+    path('eager/', packages_with_eager_loading),
+]
+
+
+class FingerprintTestCase(SimpleTestCase):
+    def test_parameters_and_literals(self):
+        self.assertEqual(
+            fingerprint('SELECT "a"."id" FROM "a" WHERE ("a"."id" = %s AND "a"."name" = \'x\')  LIMIT 21'),
+            'SELECT "a"."id" FROM "a" WHERE ("a"."id" = ? AND "a"."name" = ?) LIMIT ?'
+        )
+
+    def test_lists_of_any_length(self):
+        self.assertEqual(
+            fingerprint('SELECT 1 FROM "a" WHERE "a"."id" IN (%s, %s, %s)'),
+            fingerprint('SELECT 1 FROM "a" WHERE "a"."id" IN (%s)')
+        )
+        self.assertEqual(
+            fingerprint('INSERT INTO "a" ("x", "y") VALUES (%s, %s), (%s, %s)'),
+            'INSERT INTO "a" ("x", "y") VALUES (...)'
+        )
+
+    def test_identifiers_are_kept(self):
+        self.assertNotEqual(
+            fingerprint('SELECT "t1"."id" FROM "table1" "t1"'),
+            fingerprint('SELECT "t2"."id" FROM "table2" "t2"')
+        )
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class QueryInspectorMiddlewareTestCase(TestCase):
+    def setUp(self):
+        for index in range(6):
+            customer = User.objects.create_user(email=f'customer{index}@example.com', user_role=User.CUSTOMER)
+            Package.objects.create(
+                customer=customer,
+                description='Test package',
+                weight='2.50',
+                dimensions='20x15x10',
+                pickup_address='123 Pickup St',
+                delivery_address='456 Delivery Ave'
+            )
+
+    @override_settings(QUERY_INSPECTOR={'ENABLED': True, 'RAISE': True})
+    def test_raises_with_serializer_field_and_stack(self):
+        with self.assertRaises(NPlusOneQueryError) as raised:
+            self.client.get('/lazy/')
+
+        report = str(raised.exception)
+        self.assertIn('N+1 query in GET /lazy/: 5 x SELECT', report)
+        self.assertIn('"accounts_user"."id" = ?', report)
+        self.assertIn('Rendering serializer field PackageSerializer.customer_email', report)
+        self.assertIn('in get_customer_email', report)
+        self.assertIn('in packages_without_eager_loading', report)
+
+    @override_settings(QUERY_INSPECTOR={'ENABLED': True, 'RAISE': False, 'SLOW_QUERY_MS': None})
+    def test_logs_without_raise(self):
+        with self.assertLogs('courier_service_api.queries', 'WARNING') as logs:
+            response = self.client.get('/lazy/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(logs.records), 1)
+        self.assertIn('PackageSerializer.customer_email', logs.output[0])
+
+    @override_settings(QUERY_INSPECTOR={'ENABLED': True, 'RAISE': True})
+    def test_eager_loading_passes(self):
+        self.assertEqual(self.client.get('/eager/').status_code, 200)
+
+    @override_settings(QUERY_INSPECTOR={'ENABLED': True, 'RAISE': True, 'IGNORE': [r'"accounts_user"']})
+    def test_ignored_fingerprints(self):
+        self.assertEqual(self.client.get('/lazy/').status_code, 200)
+
+    @override_settings(QUERY_INSPECTOR={'ENABLED': False, 'RAISE': True})
+    def test_disabled(self):
+        self.assertEqual(self.client.get('/lazy/').status_code, 200)
+
+    @override_settings(QUERY_INSPECTOR={'ENABLED': True, 'SLOW_QUERY_MS': 0, 'N_PLUS_ONE_THRESHOLD': 100})
+    def test_slow_queries_logged(self):
+        with self.assertLogs('courier_service_api.queries', 'WARNING') as logs:
+            self.client.get('/eager/')
+
+        self.assertTrue(logs.output)
+        self.assertTrue(all('Slow query' in line and 'GET /eager/' in line for line in logs.output))
+
+
+class QueryInspectorTestCase(TestCase):
+    def test_transaction_statements_are_skipped(self):
+        inspector = QueryInspector(threshold=2, raise_errors=True, slow_query_ms=None)
+
+        with connection.execute_wrapper(inspector):
+            for _ in range(3):
+                with connection.cursor() as cursor:
+                    cursor.execute('SAVEPOINT "s1"')
+                    cursor.execute('RELEASE SAVEPOINT "s1"')
+
+        self.assertEqual(inspector.groups, {})
+
+    def test_repeated_query_reported_once(self):
+        inspector = QueryInspector(threshold=2, raise_errors=False, slow_query_ms=None)
+
+        with self.assertLogs('courier_service_api.queries', 'WARNING') as logs:
+            with connection.execute_wrapper(inspector):
+                for pk in range(4):
+                    Package.objects.filter(pk=pk).exists()
+
+        self.assertEqual(len(logs.records), 1)
+        self.assertEqual(len(inspector.n_plus_one), 1)
+        self.assertEqual([group.count for group in inspector.groups.values()], [4])
@@ -0,0 +1,144 @@
+import datetime
+import io
+import json
+import unittest
+import uuid
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase, APIClient
+from courier_service_api.parsers import FastJSONParser
+from courier_service_api.renderers import FastJSONRenderer, orjson
+from packages.models import Package, PackageStatusUpdate
+from packages.serializers import PackageSerializer
+
+User = get_user_model()
+
+
+class FastJSONRendererTestCase(SimpleTestCase):
+    data = {
+        'decimal': Decimal('12.50'),
+        'datetime': datetime.datetime(2026, 10, 17, 8, 30, 15, 123456, tzinfo=datetime.timezone.utc),
+        'offset': datetime.datetime(2026, 10, 17, 8, 30, tzinfo=datetime.timezone(datetime.timedelta(hours=6))),
+        'date': datetime.date(2026, 10, 17),
+        'time': datetime.time(8, 30),
+        'duration': datetime.timedelta(minutes=90),
+        'uuid': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+        'lazy': gettext_lazy('Pending'),
+        'text': 'Café line paragraph "quoted"',
+        'nested': [{1: None, 'empty': [], 'flag': True}, (1.5, -2)],
+    }
+
+    def assertSameOutput(self, data, accepted_media_type=None):
+        expected = JSONRenderer().render(data, accepted_media_type)
+        self.assertEqual(FastJSONRenderer().render(data, accepted_media_type), expected)
+
+    def test_matches_json_renderer(self):
+        self.assertSameOutput(self.data)
+        self.assertIn(b'\\u2028', FastJSONRenderer().render(self.data))
+
+    def test_indent(self):
+        self.assertSameOutput(self.data, 'application/json; indent=2')
+        self.assertSameOutput(self.data, 'application/json; indent=4')
+
+    def test_falls_back_for_data_orjson_rejects(self):
+        self.assertSameOutput({'big': 2 ** 70})
+
+    def test_without_orjson(self):
+        with patch('courier_service_api.renderers.orjson', None):
+            self.assertSameOutput(self.data)
+
+    @unittest.skipIf(orjson is None, "orjson is not installed")
+    def test_float_differences(self):
+        """Some floats are written differently, but parse to the same values"""
+        data = [1e-06, 1e-05, 1e16, 1.5e300, 0.1]
+
+        rendered = FastJSONRenderer().render(data)
+
+        self.assertEqual(rendered, b'[1e-6,0.00001,1e16,1.5e300,0.1]')
+        self.assertEqual(JSONRenderer().render(data), b'[1e-06,1e-05,1e+16,1.5e+300,0.1]')
+        self.assertEqual(json.loads(rendered), data)
+
+    @unittest.skipIf(orjson is None, "orjson is not installed")
+    def test_nan_renders_null(self):
+        self.assertEqual(FastJSONRenderer().render({'weight': float('nan')}), b'{"weight":null}')
+        with self.assertRaises(ValueError):
+            JSONRenderer().render({'weight': float('nan')})
+
+    def test_none_renders_empty_body(self):
+        self.assertEqual(FastJSONRenderer().render(None), b'')
+
+
+class FastJSONParserTestCase(SimpleTestCase):
+    def parse(self, parser, body):
+        return parser.parse(io.BytesIO(body), parser_context={'encoding': 'utf-8'})
+
+    def test_matches_json_parser(self):
+        body = '{"weight": "1.50", "notes": "Café", "items": [1, 2.5, null, true], "big": 123456789012345678901234}'
+        for parser in (FastJSONParser(), JSONParser()):
+            self.assertEqual(
+                self.parse(parser, body.encode()),
+                {'weight': '1.50', 'notes': 'Café', 'items': [1, 2.5, None, True], 'big': 123456789012345678901234}
+            )
+
+    def test_invalid_body(self):
+        with self.assertRaises(ParseError) as expected:
+            self.parse(JSONParser(), b'{"weight": ')
+        with self.assertRaises(ParseError) as actual:
+            self.parse(FastJSONParser(), b'{"weight": ')
+
+        self.assertEqual(str(actual.exception.detail), str(expected.exception.detail))
+
+    def test_rejects_nan_like_json_parser(self):
+        with self.assertRaises(ParseError):
+            self.parse(FastJSONParser(), b'{"weight": NaN}')
+
+    def test_without_orjson(self):
+        with patch('courier_service_api.parsers.orjson', None):
+            self.assertEqual(self.parse(FastJSONParser(), b'[{"a": 1}]'), [{'a': 1}])
+
+
+class FastJSONResponseTestCase(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.customer = User.objects.create_user(email='customer@example.com', user_role=User.CUSTOMER)
+        self.client.force_authenticate(user=self.customer)
+        for index in range(3):
+            package = Package.objects.create(
+                customer=self.customer,
+                description=f'Parcel {index} ☃',
+                weight='2.25',
+                dimensions='10x10x10',
+                pickup_address='123 Pickup St',
+                delivery_address='456 Delivery Ave'
+            )
+            PackageStatusUpdate.objects.create(
+                package=package, status='in_transit', updated_by=self.customer, scanned_at=timezone.now()
+            )
+
+    def test_package_list_payload(self):
+        data = PackageSerializer(PackageSerializer.setup_eager_loading(Package.objects.all()), many=True).data
+
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_responses_and_requests_use_fast_classes(self):
+        response = self.client.get(reverse('package-list'))
+        created = self.client.post(
+            reverse('package-list'),
+            data=b'{"description": "Lamp", "weight": "1.00", "dimensions": "1x1x1", '
+                 b'"pickup_address": "A", "delivery_address": "B"}',
+            content_type='application/json'
+        )
+
+        self.assertIsInstance(response.accepted_renderer, FastJSONRenderer)
+        self.assertEqual(response.content, JSONRenderer().render(response.data))
+        self.assertEqual(created.status_code, 201)
+        self.assertEqual(created.json()['weight'], '1.00')
@@ -0,0 +1,153 @@
+import math
+import random
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from packages.models import Package
+from packages.routing import (
+    CITY_COORDINATES, DELIVERY, PICKUP, LookupTableGeocoder, Stop, get_geocoder, plan_route, project
+)
+
+User = get_user_model()
+
+
+class LookupTableGeocoderTestCase(SimpleTestCase):
+    def test_exact_address(self):
+        geocoder = LookupTableGeocoder({'1 Depot Road, Dhaka': (23.7, 90.4)})
+
+        self.assertEqual(geocoder.geocode('1  depot road, DHAKA'), (23.7, 90.4))
+
+    def test_area_with_stable_offset(self):
+        geocoder = LookupTableGeocoder(jitter_km=2.0)
+
+        point = geocoder.geocode('12 Pickup Road, Khulna 9100')
+
+        self.assertEqual(geocoder.geocode('12 pickup road, khulna 9100'), point)
+        self.assertNotEqual(geocoder.geocode('13 Pickup Road, Khulna 9100'), point)
+        centre, located = project([CITY_COORDINATES['khulna'], point])
+        self.assertLessEqual(math.dist(centre, located), 2.0 * math.sqrt(2))
+
+    def test_unknown_area(self):
+        self.assertIsNone(LookupTableGeocoder().geocode('1 Main Street, Atlantis'))
+
+    @override_settings(PACKAGE_GEOCODER={'OPTIONS': {'table': {'atlantis': (1.0, 2.0)}, 'jitter_km': 0}})
+    def test_configured_from_settings(self):
+        self.assertEqual(get_geocoder().geocode('1 Main Street, Atlantis'), (1.0, 2.0))
+
+
+class PlanRouteTestCase(SimpleTestCase):
+    def line(self, *positions):
+        """Stops of packages at positions km east of (0, 0), delivery only"""
+        return [
+            Stop(index, DELIVERY, '', (0.0, math.degrees(position / 6371.0088)))
+            for index, position in enumerate(positions)
+        ]
+
+    def random_stops(self, count, seed=0):
+        rng = random.Random(seed)
+        stops = []
+        for package in range(count):
+            if package % 2:
+                stops.append(Stop(package, PICKUP, '', (rng.uniform(23.7, 23.9), rng.uniform(90.3, 90.5))))
+            stops.append(Stop(package, DELIVERY, '', (rng.uniform(23.7, 23.9), rng.uniform(90.3, 90.5))))
+        return stops
+
+    def test_orders_stops_along_a_line(self):
+        route = plan_route(self.line(3, 1, 4, 2, 5), start=(0.0, 0.0))
+
+        self.assertEqual([stop.package for stop in route.stops], [1, 3, 0, 2, 4])
+        self.assertAlmostEqual(route.distance_km, 5.0, places=3)
+        self.assertTrue(route.complete)
+
+    def test_pickups_come_before_deliveries(self):
+        stops = self.random_stops(150)
+
+        route = plan_route(stops, time_budget_ms=5000)
+
+        self.assertEqual(sorted(route.stops), sorted(stops))
+        position = {(stop.package, stop.kind): index for index, stop in enumerate(route.stops)}
+        for package, kind in position:
+            if kind == PICKUP:
+                self.assertLess(position[package, PICKUP], position[package, DELIVERY])
+        self.assertLessEqual(route.distance_km, route.initial_distance_km)
+        self.assertTrue(route.complete)
+
+    def test_two_opt_improves_nearest_neighbour(self):
+        route = plan_route(self.random_stops(100, seed=3), start=(23.8, 90.4), time_budget_ms=5000)
+
+        self.assertLess(route.distance_km, route.initial_distance_km)
+
+    def test_time_budget(self):
+        route = plan_route(self.random_stops(100), time_budget_ms=0)
+
+        self.assertFalse(route.complete)
+        self.assertEqual(len(route.stops), 150)
+
+    def test_no_stops(self):
+        self.assertEqual(plan_route([]), ([], 0.0, 0.0, True))
+
+
+class RouteViewTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.customer = User.objects.create_user(email='customer@example.com', user_role=User.CUSTOMER)
+        self.courier = User.objects.create_user(email='courier@example.com', user_role=User.COURIER)
+        self.admin = User.objects.create_user(email='admin@example.com', user_role=User.ADMIN)
+        self.pending = self.create_package('1 Pickup Road, Dhaka', '2 Delivery Avenue, Dhaka')
+        self.in_transit = self.create_package('3 Pickup Road, Dhaka', '4 Delivery Avenue, Dhaka', status='in_transit')
+        self.unknown = self.create_package('5 Pickup Road, Dhaka', '6 Delivery Avenue, Atlantis')
+        self.create_package('7 Pickup Road, Dhaka', '8 Delivery Avenue, Dhaka', status='delivered')
+        self.url = reverse('package-route')
+
+    def create_package(self, pickup_address, delivery_address, **fields):
+        return Package.objects.create(
+            customer=self.customer,
+            courier=self.courier,
+            description='Test package',
+            weight='2.50',
+            dimensions='20x15x10',
+            pickup_address=pickup_address,
+            delivery_address=delivery_address,
+            **fields
+        )
+
+    def test_courier_route(self):
+        self.client.force_authenticate(user=self.courier)
+
+        response = self.client.get(self.url, {'start_latitude': 23.81, 'start_longitude': 90.41})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        stops = [(stop['tracking_number'], stop['kind']) for stop in response.data['stops']]
+        self.assertCountEqual(stops, [
+            (self.pending.tracking_number, 'pickup'),
+            (self.pending.tracking_number, 'delivery'),
+            (self.in_transit.tracking_number, 'delivery'),
+        ])
+        self.assertLess(
+            stops.index((self.pending.tracking_number, 'pickup')),
+            stops.index((self.pending.tracking_number, 'delivery'))
+        )
+        self.assertEqual(response.data['unlocated'], [self.unknown.tracking_number])
+        self.assertGreater(response.data['distance_km'], 0)
+
+    def test_admin_chooses_the_courier(self):
+        self.client.force_authenticate(user=self.admin)
+
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(self.url, {'courier': self.courier.pk})
+        self.assertEqual(len(response.data['stops']), 3)
+
+    def test_start_needs_both_coordinates(self):
+        self.client.force_authenticate(user=self.courier)
+
+        response = self.client.get(self.url, {'start_latitude': 23.81})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_customers_cannot_plan_routes(self):
+        self.client.force_authenticate(user=self.customer)
+
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_403_FORBIDDEN)
@@ -0,0 +1,155 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase, APIClient
+from packages.models import Package
+from packages.search import SQLiteFTS5Backend, get_search_backend
+
+User = get_user_model()
+
+
+class PackageSearchTestCase(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = User.objects.create_user(email='admin@example.com', user_role=User.ADMIN)
+        self.customer = User.objects.create_user(email='customer@example.com', user_role=User.CUSTOMER)
+        self.client.force_authenticate(user=self.admin)
+        self.url = reverse('package-list')
+
+    def create_package(self, description, pickup='1 Main St, Dhaka', delivery='2 Lake Rd, Sylhet', **extra):
+        return Package.objects.create(
+            customer=self.customer,
+            description=description,
+            weight='1.00',
+            dimensions='10x10x10',
+            pickup_address=pickup,
+            delivery_address=delivery,
+            **extra
+        )
+
+    def search(self, query, **params):
+        response = self.client.get(self.url, {'search': query, **params})
+        return [item['id'] for item in response.data['results']]
+
+    def test_backend_selected_by_vendor(self):
+        if connection.vendor == 'sqlite':
+            self.assertIsInstance(get_search_backend(), SQLiteFTS5Backend)
+
+    def test_matches_description_and_addresses(self):
+        laptop = self.create_package('Laptop computer')
+        chittagong = self.create_package('Books', delivery='9 Port Rd, Chittagong')
+        self.create_package('Shoes')
+
+        self.assertEqual(self.search('laptop'), [laptop.pk])
+        self.assertEqual(self.search('chittagong'), [chittagong.pk])
+
+    def test_words_match_as_prefixes(self):
+        package = self.create_package('Electronics and cables')
+
+        self.assertEqual(self.search('electr cab'), [package.pk])
+        self.assertEqual(self.search('electr shoes'), [])
+
+    def test_results_are_ranked(self):
+        """Packages mentioning the term more often come first"""
+        once = self.create_package('Glass vase, fragile')
+        many = self.create_package('Fragile fragile fragile glassware')
+
+        self.assertEqual(self.search('fragile'), [many.pk, once.pk])
+
+    def test_index_follows_updates_bulk_writes_and_deletes(self):
+        package = self.create_package('Red bicycle')
+        Package.objects.filter(pk=package.pk).update(description='Blue scooter')
+        Package.objects.bulk_create([
+            Package(customer=self.customer, tracking_number='PKG-BULK0001', description='Blue kettle',
+                    weight='1.00', dimensions='1x1x1', pickup_address='A', delivery_address='B')
+        ])
+
+        self.assertEqual(self.search('bicycle'), [])
+        self.assertEqual(self.search('scooter'), [package.pk])
+        self.assertEqual(len(self.search('blue')), 2)
+
+        package.delete()
+        self.assertEqual(len(self.search('blue')), 1)
+
+    def test_query_syntax_is_not_interpreted(self):
+        """FTS5 operators in user input cannot break the query"""
+        package = self.create_package('Toy "car" set')
+
+        self.assertEqual(self.search('"car)*'), [package.pk])
+        self.assertEqual(self.search('***'), [])
+
+    def test_tracking_number_prefix_fast_path(self):
+        package = self.create_package('Parcel')
+        self.create_package('Other parcel')
+
+        self.assertEqual(self.search(package.tracking_number.lower()), [package.pk])
+        self.assertIn(package.pk, self.search(package.tracking_number[:6]))
+
+    def test_status_fast_path(self):
+        delivered = self.create_package('Parcel', status='delivered')
+        self.create_package('Parcel')
+
+        self.assertEqual(self.search('delivered'), [delivered.pk])
+
+    def test_status_words_match_status_and_text(self):
+        in_transit = self.create_package('Parcel', status='in_transit')
+        mentioned = self.create_package('Transit case')
+        self.create_package('Parcel')
+
+        self.assertEqual(sorted(self.search('transit')), [in_transit.pk, mentioned.pk])
+        self.assertEqual(self.search('transit parcel'), [in_transit.pk])
+
+    def test_rank_ordering_needs_a_search(self):
+        package = self.create_package('Parcel')
+
+        response = self.client.get(self.url, {'ordering': '-search_rank'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item['id'] for item in response.data['results']], [package.pk])
+
+    def test_rank_comes_from_a_single_join(self):
+        self.create_package('Lamp')
+        self.create_package('Lamp lamp')
+
+        with CaptureQueriesContext(connection) as queries:
+            self.search('lamp')
+
+        sql = next(query['sql'] for query in queries if 'bm25' in query['sql'])
+        self.assertEqual(sql.count('SELECT'), 1)
+
+    def test_role_filtering_still_applies(self):
+        other_customer = User.objects.create_user(email='other@example.com', user_role=User.CUSTOMER)
+        own = self.create_package('Camera')
+        Package.objects.create(
+            customer=other_customer, description='Camera', weight='1.00', dimensions='1x1x1',
+            pickup_address='A', delivery_address='B'
+        )
+        self.client.force_authenticate(user=self.customer)
+
+        self.assertEqual(self.search('camera'), [own.pk])
+
+    def test_ranked_results_are_paginated(self):
+        packages = [self.create_package('Lamp ' + 'lamp ' * index) for index in range(5)]
+
+        response = self.client.get(self.url, {'search': 'lamp', 'page_size': 2})
+        ids = [item['id'] for item in response.data['results']]
+        while response.data['next']:
+            response = self.client.get(response.data['next'])
+            ids.extend(item['id'] for item in response.data['results'])
+
+        self.assertEqual(sorted(ids), sorted(p.pk for p in packages))
+        self.assertEqual(len(ids), 5)
+
+    def test_explicit_ordering_overrides_rank(self):
+        first = self.create_package('Drum')
+        second = self.create_package('Drum drum')
+
+        self.assertEqual(self.search('drum', ordering='created_at'), [first.pk, second.pk])
+
+    @override_settings(PACKAGE_SEARCH_BACKEND='packages.search.SimpleSearchBackend')
+    def test_simple_backend(self):
+        package = self.create_package('Guitar strings')
+
+        self.assertEqual(self.search('tar str'), [package.pk])
@@ -0,0 +1,96 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase, APIClient
+from packages.models import Package, PackageStatusUpdate
+
+User = get_user_model()
+
+
+class SparseFieldsetTestCase(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.customer = User.objects.create_user(email='customer@example.com', user_role=User.CUSTOMER)
+        self.courier = User.objects.create_user(email='courier@example.com', user_role=User.COURIER)
+        self.client.force_authenticate(user=self.customer)
+        self.packages = []
+        for index in range(3):
+            package = Package.objects.create(
+                customer=self.customer,
+                courier=self.courier,
+                description=f'Parcel {index}',
+                weight='1.00',
+                dimensions='10x10x10',
+                pickup_address='123 Pickup St',
+                delivery_address='456 Delivery Ave'
+            )
+            for step in range(4):
+                PackageStatusUpdate.objects.create(
+                    package=package, status='in_transit', notes=f'Scan {step}', updated_by=self.courier
+                )
+            package.refresh_status_summary()
+            self.packages.append(package)
+        self.url = reverse('package-list')
+
+    def test_default_includes_full_history(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(len(response.data['results'][0]['status_updates']), 4)
+        self.assertIn('description', response.data['results'][0])
+
+    def test_fields_limit_payload_and_columns(self):
+        """Only the requested fields are rendered and only their columns are read"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, {'fields': 'id,tracking_number,status'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(response.data['results'][0]), {'id', 'tracking_number', 'status'})
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('"description"', queries[0]['sql'])
+        self.assertNotIn('"pickup_address"', queries[0]['sql'])
+
+    def test_expand_status_updates(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url, {'fields': 'id,courier_email', 'expand': 'status_updates'})
+
+        result = response.data['results'][0]
+        self.assertEqual(set(result), {'id', 'courier_email', 'status_updates'})
+        self.assertEqual(result['courier_email'], 'courier@example.com')
+        self.assertEqual(len(result['status_updates']), 4)
+
+    def test_history_limit(self):
+        """Each package gets its latest N updates from a single prefetch query"""
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url, {'history_limit': 2})
+
+        for result in response.data['results']:
+            self.assertEqual([update['notes'] for update in result['status_updates']], ['Scan 3', 'Scan 2'])
+            self.assertEqual(result['status_update_count'], 4)
+
+    def test_history_limit_zero_drops_history(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, {'history_limit': 0})
+
+        self.assertNotIn('status_updates', response.data['results'][0])
+        self.assertIn('description', response.data['results'][0])
+
+    def test_pagination_with_sparse_fields(self):
+        first = self.client.get(self.url, {'fields': 'id', 'page_size': 2})
+        second = self.client.get(first.data['next'])
+
+        ids = [row['id'] for row in first.data['results'] + second.data['results']]
+        self.assertEqual(ids, [package.pk for package in reversed(self.packages)])
+
+    def test_retrieve_with_fields(self):
+        package = self.packages[0]
+        response = self.client.get(reverse('package-detail', args=[package.pk]), {'fields': 'status'})
+
+        self.assertEqual(response.data, {'status': 'pending'})
+
+    def test_invalid_parameters(self):
+        response = self.client.get(self.url, {'fields': 'id,secret', 'history_limit': -1, 'expand': 'customer'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(set(response.data), {'fields', 'history_limit', 'expand'})
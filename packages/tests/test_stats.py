@@ -0,0 +1,261 @@
+import datetime
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+from packages.models import CourierStatusCount, CustomerStatusCount, DailyDeliveredCount, Package
+from packages.stats import PackageState, StatsDelta, check_stats, rebuild_stats
+
+User = get_user_model()
+
+
+class StatsDeltaTestCase(TestCase):
+    def setUp(self):
+        self.customer = User.objects.create_user(email='customer@example.com', user_role=User.CUSTOMER)
+        self.courier = User.objects.create_user(email='courier@example.com', user_role=User.COURIER)
+
+    def test_change_moves_counts(self):
+        today = timezone.localdate()
+        pending = PackageState(self.customer.pk, self.courier.pk, 'pending', False, None)
+        delivered = pending._replace(status='delivered', delivered_on=today)
+        delta = StatsDelta()
+        delta.add(pending)
+        delta.add(pending)
+        delta.apply()
+
+        delta.change(pending, delivered)
+        delta.apply()
+
+        self.assertEqual(
+            dict(CourierStatusCount.objects.values_list('status', 'count')), {'pending': 1, 'delivered': 1}
+        )
+        self.assertEqual(
+            dict(CustomerStatusCount.objects.values_list('status', 'count')), {'pending': 1, 'delivered': 1}
+        )
+        self.assertEqual(DailyDeliveredCount.objects.get(day=today).count, 1)
+
+    def test_deleted_and_unassigned_packages(self):
+        delta = StatsDelta()
+        delta.add(PackageState(self.customer.pk, None, 'pending', False, None))
+        delta.add(PackageState(self.customer.pk, self.courier.pk, 'pending', True, None))
+        delta.apply()
+
+        self.assertFalse(CourierStatusCount.objects.exists())
+        self.assertEqual(CustomerStatusCount.objects.get().count, 1)
+
+    def test_unchanged_state(self):
+        state = PackageState(self.customer.pk, self.courier.pk, 'pending', False, None)
+        delta = StatsDelta()
+        delta.change(state, state)
+
+        with self.assertNumQueries(0):
+            delta.apply()
+
+
+class StatsMaintenanceTestCase(TestCase):
+    """Every writer keeps the stored counts equal to counts computed from the packages"""
+    def setUp(self):
+        self.client = APIClient()
+        self.customer = User.objects.create_user(email='customer@example.com', user_role=User.CUSTOMER)
+        self.courier = User.objects.create_user(email='courier@example.com', user_role=User.COURIER)
+        self.other_courier = User.objects.create_user(email='other@example.com', user_role=User.COURIER)
+        self.admin = User.objects.create_user(email='admin@example.com', user_role=User.ADMIN)
+        self.packages = [self.create_package() for _ in range(3)]
+
+    def create_package(self):
+        self.client.force_authenticate(user=self.customer)
+        response = self.client.post(reverse('package-list'), {
+            'description': 'Test package',
+            'weight': '2.50',
+            'dimensions': '20x15x10',
+            'pickup_address': '123 Pickup St, Dhaka',
+            'delivery_address': '456 Delivery Ave, Dhaka',
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return Package.objects.get(pk=response.data['id'])
+
+    def assertCountsMatch(self):
+        self.assertEqual(check_stats(), [])
+
+    def as_admin(self, method, name, package=None, data=None):
+        self.client.force_authenticate(user=self.admin)
+        url = reverse(name, args=[package.pk]) if package else reverse(name)
+        response = getattr(self.client, method)(url, data or {}, format='json')
+        self.assertLess(response.status_code, 300, response.data)
+        return response
+
+    def test_create(self):
+        self.client.force_authenticate(user=self.customer)
+        self.client.post(reverse('package-bulk-create'), [{
+            'description': 'Bulk package',
+            'weight': '1.00',
+            'dimensions': '10x10x10',
+            'pickup_address': '1 Pickup St',
+            'delivery_address': '2 Delivery Ave',
+        }] * 2, format='json')
+
+        self.assertCountsMatch()
+        self.assertEqual(CustomerStatusCount.objects.get(customer=self.customer).count, 5)
+
+    def test_assignment_and_status_updates(self):
+        package = self.packages[0]
+        self.as_admin('patch', 'package-assign-courier', package, {'courier': self.courier.pk})
+        self.assertCountsMatch()
+        self.as_admin('post', 'package-update-status', package, {'status': 'in_transit'})
+        self.assertCountsMatch()
+        self.as_admin('patch', 'package-assign-courier', package, {'courier': self.other_courier.pk})
+        self.assertCountsMatch()
+        self.as_admin('post', 'package-update-status', package, {'status': 'delivered'})
+        self.as_admin('post', 'package-update-status', package, {'status': 'delivered'})
+        self.assertCountsMatch()
+
+        package.refresh_from_db()
+        self.assertIsNotNone(package.delivered_at)
+        self.assertEqual(DailyDeliveredCount.objects.get(day=timezone.localdate(package.delivered_at)).count, 1)
+        self.assertEqual(
+            CourierStatusCount.objects.get(courier=self.other_courier, status='delivered').count, 1
+        )
+
+    def test_soft_delete_and_restore(self):
+        package = self.packages[0]
+        self.as_admin('patch', 'package-assign-courier', package, {'courier': self.courier.pk})
+        self.as_admin('post', 'package-update-status', package, {'status': 'delivered'})
+
+        self.as_admin('patch', 'package-soft-delete', package)
+        self.assertCountsMatch()
+        self.assertEqual(DailyDeliveredCount.objects.get().count, 0)
+
+        self.as_admin('patch', 'package-restore', package)
+        self.assertCountsMatch()
+        self.assertEqual(DailyDeliveredCount.objects.get().count, 1)
+
+    def test_bulk_status_updates_and_auto_assign(self):
+        self.as_admin('post', 'package-auto-assign')
+        self.assertCountsMatch()
+
+        now = timezone.now()
+        self.as_admin('post', 'package-bulk-update-status', data=[
+            {'tracking_number': package.tracking_number, 'status': package_status,
+             'scanned_at': (now + datetime.timedelta(minutes=index)).isoformat()}
+            for index, (package, package_status) in enumerate(
+                [(self.packages[0], 'in_transit'), (self.packages[1], 'delivered'), (self.packages[0], 'delivered')]
+            )
+        ])
+        self.assertCountsMatch()
+        self.assertEqual(DailyDeliveredCount.objects.get().count, 2)
+
+    def test_update_and_delete(self):
+        package = self.packages[0]
+        other_customer = User.objects.create_user(email='other-customer@example.com', user_role=User.CUSTOMER)
+        self.as_admin('patch', 'package-assign-courier', package, {'courier': self.courier.pk})
+        self.as_admin('patch', 'package-detail', package, {'customer': other_customer.pk})
+        self.assertCountsMatch()
+
+        self.as_admin('delete', 'package-detail', package)
+        self.assertCountsMatch()
+
+
+class StatsActionsTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.customer = User.objects.create_user(email='customer@example.com', user_role=User.CUSTOMER)
+        self.courier = User.objects.create_user(email='courier@example.com', user_role=User.COURIER)
+        self.admin = User.objects.create_user(email='admin@example.com', user_role=User.ADMIN)
+        self.today = timezone.localdate()
+        for package_status in ['pending', 'pending', 'in_transit', 'delivered']:
+            Package.objects.create(
+                customer=self.customer,
+                courier=self.courier,
+                description='Test package',
+                weight='2.50',
+                dimensions='20x15x10',
+                pickup_address='123 Pickup St',
+                delivery_address='456 Delivery Ave',
+                status=package_status,
+                delivered_at=timezone.now() if package_status == 'delivered' else None,
+            )
+        rebuild_stats()
+        self.client.force_authenticate(user=self.admin)
+
+    def test_courier_stats(self):
+        response = self.client.get(reverse('package-courier-stats'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, [{
+            'courier': self.courier.pk,
+            'courier_email': 'courier@example.com',
+            'pending': 2,
+            'in_transit': 1,
+            'delivered': 1,
+            'total': 4,
+        }])
+
+    def test_customer_stats(self):
+        response = self.client.get(reverse('package-customer-stats'))
+
+        self.assertEqual(response.data[0]['customer'], self.customer.pk)
+        self.assertEqual(response.data[0]['total'], 4)
+
+    def test_delivery_stats(self):
+        response = self.client.get(reverse('package-delivery-stats'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['days']), 30)
+        self.assertEqual(response.data['days'][-1], {'day': self.today, 'count': 1})
+        self.assertEqual(response.data['total'], 1)
+
+        response = self.client.get(reverse('package-delivery-stats'), {
+            'since': self.today - datetime.timedelta(days=1), 'until': self.today - datetime.timedelta(days=1)
+        })
+        self.assertEqual(response.data['total'], 0)
+
+    def test_delivery_stats_range_is_validated(self):
+        url = reverse('package-delivery-stats')
+
+        self.assertEqual(
+            self.client.get(url, {'since': '2026-02-01', 'until': '2026-01-01'}).status_code,
+            status.HTTP_400_BAD_REQUEST
+        )
+        self.assertEqual(
+            self.client.get(url, {'since': '2020-01-01', 'until': '2026-01-01'}).status_code,
+            status.HTTP_400_BAD_REQUEST
+        )
+
+    def test_admin_only(self):
+        self.client.force_authenticate(user=self.courier)
+
+        for name in ['package-courier-stats', 'package-customer-stats', 'package-delivery-stats']:
+            self.assertEqual(self.client.get(reverse(name)).status_code, status.HTTP_403_FORBIDDEN)
+
+
+class StatsCommandsTestCase(TestCase):
+    def setUp(self):
+        customer = User.objects.create_user(email='customer@example.com', user_role=User.CUSTOMER)
+        self.package = Package.objects.create(
+            customer=customer,
+            description='Test package',
+            weight='2.50',
+            dimensions='20x15x10',
+            pickup_address='123 Pickup St',
+            delivery_address='456 Delivery Ave',
+            status='delivered',
+        )
+
+    def test_check_and_rebuild(self):
+        with self.assertRaises(CommandError):
+            call_command('check_package_stats', stdout=StringIO())
+
+        call_command('rebuild_package_stats', stdout=StringIO())
+
+        out = StringIO()
+        call_command('check_package_stats', stdout=out)
+        self.assertIn('match', out.getvalue())
+        # delivered_at is backfilled from the package's last update
+        self.package.refresh_from_db()
+        self.assertEqual(self.package.delivered_at, self.package.updated_at)
+        self.assertEqual(DailyDeliveredCount.objects.get().count, 1)
@@ -0,0 +1,99 @@
+from io import StringIO
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase, APIClient
+from packages.models import Package, PackageStatusUpdate
+
+User = get_user_model()
+
+
+class PackageStatusSummaryTestCase(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = User.objects.create_user(email='admin@example.com', user_role=User.ADMIN)
+        self.courier = User.objects.create_user(email='courier@example.com', user_role=User.COURIER)
+        self.customer = User.objects.create_user(email='customer@example.com', user_role=User.CUSTOMER)
+        self.package = Package.objects.create(
+            customer=self.customer,
+            courier=self.courier,
+            description='Test package',
+            weight='2.50',
+            dimensions='20x15x10',
+            pickup_address='123 Pickup St',
+            delivery_address='456 Delivery Ave'
+        )
+
+    def assertSummaryMatchesHistory(self, package):
+        package.refresh_from_db()
+        latest = package.status_updates.order_by('-created_at', '-id').first()
+        self.assertEqual(package.status_update_count, package.status_updates.count())
+        self.assertEqual(package.last_status_at, latest.created_at if latest else None)
+        self.assertEqual(package.last_status_note, (latest.notes or '') if latest else '')
+
+    def test_new_package_has_empty_summary(self):
+        self.assertEqual(self.package.status_update_count, 0)
+        self.assertIsNone(self.package.last_status_at)
+
+    def test_update_status_maintains_summary(self):
+        self.client.force_authenticate(user=self.courier)
+
+        response = self.client.post(
+            reverse('package-update-status', args=[self.package.pk]),
+            {'status': 'in_transit', 'notes': 'Left the depot'}, format='json'
+        )
+
+        self.assertEqual(response.data['status_update_count'], 1)
+        self.assertEqual(response.data['last_status_note'], 'Left the depot')
+        self.assertSummaryMatchesHistory(self.package)
+
+    def test_admin_actions_maintain_summary(self):
+        self.client.force_authenticate(user=self.admin)
+
+        self.client.patch(
+            reverse('package-assign-courier', args=[self.package.pk]),
+            {'courier': self.courier.pk}, format='json'
+        )
+        self.client.patch(reverse('package-soft-delete', args=[self.package.pk]))
+        self.client.patch(reverse('package-restore', args=[self.package.pk]))
+
+        self.assertSummaryMatchesHistory(self.package)
+        self.assertEqual(self.package.status_update_count, 3)
+        self.assertEqual(self.package.last_status_note, 'Package restored by admin')
+
+    def test_bulk_update_status_maintains_summary(self):
+        self.client.force_authenticate(user=self.courier)
+        scans = [
+            {'tracking_number': self.package.tracking_number, 'status': status,
+             'notes': status, 'scanned_at': timezone.now().isoformat()}
+            for status in ('in_transit', 'delivered')
+        ]
+
+        self.client.post(reverse('package-bulk-update-status'), scans, format='json')
+
+        self.assertSummaryMatchesHistory(self.package)
+        self.assertEqual(self.package.status_update_count, 2)
+
+    def test_backfill_command(self):
+        """The backfill command fixes packages written without the summary"""
+        other = Package.objects.create(
+            customer=self.customer, description='Other', weight='1.00', dimensions='1x1x1',
+            pickup_address='A', delivery_address='B'
+        )
+        for package in (self.package, other):
+            for note in ('first', 'second'):
+                PackageStatusUpdate.objects.create(package=package, status='pending', notes=note)
+
+        out = StringIO()
+        call_command('backfill_status_summary', chunk_size=1, stdout=out)
+
+        self.assertIn('Backfilled 2 packages', out.getvalue())
+        self.assertSummaryMatchesHistory(self.package)
+        self.assertSummaryMatchesHistory(other)
+        self.assertEqual(other.status_update_count, 2)
+
+    def test_backfill_command_rejects_empty_chunks(self):
+        for chunk_size in (0, -1):
+            with self.subTest(chunk_size=chunk_size), self.assertRaises(CommandError):
+                call_command('backfill_status_summary', chunk_size=chunk_size, stdout=StringIO())
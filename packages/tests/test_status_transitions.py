@@ -0,0 +1,226 @@
+import threading
+import time
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.db import OperationalError, connection
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import serializers, status
+from rest_framework.test import APIClient, APIRequestFactory
+from packages.models import Package, PackageStatusUpdate
+from packages.serializers import PackageStatusUpdateCreateSerializer
+from packages.views import PackageViewSet
+
+User = get_user_model()
+
+
+def create_package(customer, courier, **fields):
+    return Package.objects.create(
+        customer=customer,
+        courier=courier,
+        description='Test package',
+        weight='2.50',
+        dimensions='20x15x10',
+        pickup_address='123 Pickup St',
+        delivery_address='456 Delivery Ave',
+        **fields
+    )
+
+
+class StatusTransitionTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.customer = User.objects.create_user(email='customer@example.com', user_role=User.CUSTOMER)
+        self.courier = User.objects.create_user(email='courier@example.com', user_role=User.COURIER)
+        self.package = create_package(self.customer, self.courier)
+        self.client.force_authenticate(user=self.courier)
+
+    def update_status(self, package_status):
+        return self.client.post(
+            reverse('package-update-status', args=[self.package.pk]),
+            {'status': package_status},
+            format='json'
+        )
+
+    def test_statuses_leading_to(self):
+        self.assertEqual(Package.statuses_leading_to('pending'), ['pending'])
+        self.assertEqual(Package.statuses_leading_to('delivered'), ['pending', 'in_transit', 'delivered'])
+
+    def test_transition_only_writes_status(self):
+        Package.objects.filter(pk=self.package.pk).update(description='Changed elsewhere')
+
+        self.package.transition_to('in_transit')
+
+        self.package.refresh_from_db()
+        self.assertEqual(self.package.status, 'in_transit')
+        self.assertEqual(self.package.description, 'Changed elsewhere')
+
+    def test_transition_checks_the_stored_status(self):
+        Package.objects.filter(pk=self.package.pk).update(status='delivered')
+
+        # The instance still says pending, the row does not
+        with self.assertRaises(ValidationError):
+            self.package.transition_to('in_transit')
+
+        self.assertEqual(self.package.status, 'delivered')
+
+    def test_delivered_package_cannot_go_back(self):
+        self.assertEqual(self.update_status('delivered').status_code, status.HTTP_200_OK)
+
+        response = self.update_status('in_transit')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['status'], ["A delivered package cannot be marked in_transit."])
+        self.assertEqual(self.package.status_updates.count(), 1)
+
+    def test_same_status_adds_a_note(self):
+        self.update_status('in_transit')
+
+        self.assertEqual(self.update_status('in_transit').status_code, status.HTTP_200_OK)
+        self.assertEqual(self.package.status_updates.count(), 2)
+
+    def test_bulk_scans_do_not_move_packages_backwards(self):
+        Package.objects.filter(pk=self.package.pk).update(status='delivered')
+        scan = {
+            'tracking_number': self.package.tracking_number,
+            'status': 'in_transit',
+            'scanned_at': (timezone.now() - timedelta(hours=1)).isoformat(),
+        }
+
+        response = self.client.post(reverse('package-bulk-update-status'), [scan], format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.package.refresh_from_db()
+        self.assertEqual(self.package.status, 'delivered')
+        self.assertEqual(self.package.status_update_count, 1)
+
+    def test_generic_update_cannot_change_status_or_courier(self):
+        self.update_status('delivered')
+
+        response = self.client.patch(
+            reverse('package-detail', args=[self.package.pk]),
+            {'status': 'pending', 'courier': None, 'description': 'Fragile'},
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.package.refresh_from_db()
+        self.assertEqual(self.package.status, 'delivered')
+        self.assertEqual(self.package.courier, self.courier)
+        self.assertEqual(self.package.description, 'Fragile')
+
+    def test_generic_update_renders_history_without_n_plus_one(self):
+        """The response reloads the history with who made each update"""
+        for index in range(6):
+            PackageStatusUpdate.objects.create(
+                package=self.package, status='in_transit', notes=f'Scan {index}', updated_by=self.courier
+            )
+
+        response = self.client.patch(
+            reverse('package-detail', args=[self.package.pk]), {'description': 'Fragile'}, format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['description'], 'Fragile')
+        self.assertEqual(len(response.data['status_updates']), 6)
+        self.assertTrue(all(update['updated_by_name'] for update in response.data['status_updates']))
+
+    def test_admin_actions_keep_concurrent_status_changes(self):
+        admin = User.objects.create_user(email='admin@example.com', user_role=User.ADMIN)
+        other_courier = User.objects.create_user(email='other@example.com', user_role=User.COURIER)
+        self.client.force_authenticate(user=admin)
+        # Read by the admin action before a scan delivers the package
+        stale = Package.objects.get(pk=self.package.pk)
+        Package.objects.filter(pk=self.package.pk).transition('delivered')
+
+        with patch.object(PackageViewSet, 'get_object', return_value=stale):
+            response = self.client.patch(
+                reverse('package-assign-courier', args=[self.package.pk]),
+                {'courier': other_courier.pk},
+                format='json'
+            )
+            self.client.patch(reverse('package-soft-delete', args=[self.package.pk]))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.package.refresh_from_db()
+        self.assertEqual(self.package.status, 'delivered')
+        self.assertIsNotNone(self.package.delivered_at)
+        self.assertEqual(self.package.courier, other_courier)
+        self.assertTrue(self.package.is_deleted)
+
+
+class ConcurrentStatusTransitionTestCase(TransactionTestCase):
+    """
+    Many scanners updating one package at once. Every thread reads the
+    package before any of them writes, so each passes validation against the
+    same stale status and only the conditional UPDATE can keep it consistent.
+    """
+    THREADS = 12
+
+    def setUp(self):
+        self.customer = User.objects.create_user(email='customer@example.com', user_role=User.CUSTOMER)
+        self.courier = User.objects.create_user(email='courier@example.com', user_role=User.COURIER)
+        self.package = create_package(self.customer, self.courier, status='in_transit')
+
+    def run_concurrently(self, statuses):
+        barrier = threading.Barrier(len(statuses))
+        results = [None] * len(statuses)
+        request = APIRequestFactory().post('/')
+        request.user = self.courier
+
+        def update(index, package_status):
+            try:
+                package = Package.objects.get(pk=self.package.pk)
+                serializer = PackageStatusUpdateCreateSerializer(
+                    data={'status': package_status, 'notes': f'Scanner {index}'},
+                    context={'request': request, 'package': package}
+                )
+                serializer.is_valid(raise_exception=True)
+                barrier.wait()
+                # The test database allows one writer at a time and fails
+                # instead of waiting; the transaction was rolled back, retry it
+                for attempt in range(200):
+                    try:
+                        serializer.save()
+                        results[index] = 'saved'
+                        break
+                    except OperationalError:
+                        time.sleep(0.005)
+                    except serializers.ValidationError:
+                        results[index] = 'rejected'
+                        break
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=update, args=(index, package_status))
+            for index, package_status in enumerate(statuses)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_no_lost_updates_or_regressions(self):
+        statuses = ['in_transit', 'delivered'] * (self.THREADS // 2)
+
+        results = self.run_concurrently(statuses)
+
+        self.assertNotIn(None, results)
+        saved = [package_status for package_status, result in zip(statuses, results) if result == 'saved']
+        # Deliveries always apply; scans that lose the race to one are rejected
+        self.assertEqual(saved.count('delivered'), self.THREADS // 2)
+
+        self.package.refresh_from_db()
+        self.assertEqual(self.package.status, 'delivered')
+        history = list(
+            PackageStatusUpdate.objects.filter(package=self.package).order_by('id').values_list('status', flat=True)
+        )
+        self.assertEqual(sorted(history), sorted(saved))
+        self.assertEqual(self.package.status_update_count, len(saved))
+        self.assertNotIn('in_transit', history[history.index('delivered'):])
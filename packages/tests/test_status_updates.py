@@ -1,5 +1,6 @@
 from django.test import TestCase
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.test import APITestCase, APIClient
 from unittest.mock import patch, MagicMock
@@ -32,6 +33,8 @@ class PackageStatusUpdateViewSetTestCase(APITestCase):
         self.mock_package.pk = 1
         self.mock_package.customer = self.mock_customer_user
         self.mock_package.courier = self.mock_courier_user
+        self.mock_package.updated_at = timezone.now()
+        self.mock_package.status_update_count = 1
 
         self.mock_status_update = MagicMock()
         self.mock_status_update.pk = 1
@@ -126,7 +129,7 @@ class PackageStatusUpdateViewSetTestCase(APITestCase):
         response = self.client.get(url)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 0)
+        self.assertEqual(len(response.data['results']), 0)
 
     @patch('packages.views.Package.objects.get')
     def test_get_queryset_package_not_found(self, mock_get):
@@ -138,6 +141,6 @@ class PackageStatusUpdateViewSetTestCase(APITestCase):
         response = self.client.get(url)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 0)
+        self.assertEqual(len(response.data['results']), 0)
 
    
@@ -0,0 +1,213 @@
+import json
+from datetime import datetime, timezone
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase, APIClient
+from unittest.mock import patch
+from packages.cache import LocMemLRUBackend, RedisBackend, TrackingCache, get_tracking_cache
+from packages.models import Package
+
+User = get_user_model()
+
+
+class FakeRedis:
+    """Local stand-in for the subset of the redis-py client used by RedisBackend"""
+    def __init__(self):
+        self.store = {}
+        self.expiry = {}
+
+    def get(self, key):
+        return self.store.get(key)
+
+    def mget(self, keys):
+        return [self.store.get(key) for key in keys]
+
+    def set(self, key, value, ex=None):
+        self.store[key] = value
+        self.expiry[key] = ex
+
+    def incr(self, key):
+        value = int(self.store.get(key, b'0')) + 1
+        self.store[key] = str(value).encode()
+        return value
+
+    def expire(self, key, seconds):
+        self.expiry[key] = seconds
+
+    def delete(self, *keys):
+        for key in keys:
+            self.store.pop(key, None)
+
+    def scan_iter(self, match):
+        prefix = match.rstrip('*')
+        return [key for key in self.store if key.startswith(prefix)]
+
+
+class TrackingCacheBackendTestCase(SimpleTestCase):
+    def test_locmem_evicts_least_recently_used(self):
+        """The oldest untouched entry is evicted once max_entries is reached"""
+        backend = LocMemLRUBackend(max_entries=2)
+        backend.set('a', 1, 60)
+        backend.set('b', 2, 60)
+        backend.get('a')
+        backend.set('c', 3, 60)
+
+        self.assertEqual(backend.get('a'), 1)
+        self.assertIsNone(backend.get('b'))
+        self.assertEqual(backend.get('c'), 3)
+
+    @patch('packages.cache.time.monotonic')
+    def test_locmem_expires_entries(self, mock_monotonic):
+        """Entries are not returned after their timeout"""
+        backend = LocMemLRUBackend()
+        mock_monotonic.return_value = 100
+        backend.set('a', 1, 30)
+
+        mock_monotonic.return_value = 129
+        self.assertEqual(backend.get('a'), 1)
+        mock_monotonic.return_value = 130
+        self.assertIsNone(backend.get('a'))
+
+    def test_redis_backend_round_trip(self):
+        """Snapshots are stored as JSON under a prefixed key with the cache timeout"""
+        client = FakeRedis()
+        cache = TrackingCache(RedisBackend(client=client), timeout=45)
+        updated_at = datetime(2026, 10, 17, 12, 30, 15, 123456, tzinfo=timezone.utc)
+        snapshot = {'version': [1, updated_at, 2], 'payload': {'status': 'pending', 'updated_at': updated_at}}
+
+        cache.set('PKG-1', snapshot, 0)
+
+        self.assertEqual(cache.get('PKG-1'), (snapshot, 0))
+        self.assertEqual(json.loads(client.store['packages:tracking:PKG-1'])['snapshot']['payload']['status'], 'pending')
+        self.assertEqual(client.expiry['packages:tracking:PKG-1'], 45)
+        cache.invalidate('PKG-1')
+        self.assertEqual(cache.get('PKG-1'), (None, 1))
+        self.assertEqual(cache.stats()['hits'], 1)
+        self.assertEqual(cache.stats()['misses'], 1)
+
+    def test_fill_racing_an_invalidation_is_not_served(self):
+        """A snapshot read before an invalidation is not served after it"""
+        for backend in [LocMemLRUBackend(), RedisBackend(client=FakeRedis())]:
+            with self.subTest(backend=type(backend).__name__):
+                cache = TrackingCache(backend, timeout=60)
+                _, generation = cache.get('PKG-1')
+                cache.invalidate('PKG-1')
+                cache.set('PKG-1', {'status': 'pending'}, generation)
+
+                snapshot, generation = cache.get('PKG-1')
+                self.assertIsNone(snapshot)
+                cache.set('PKG-1', {'status': 'in_transit'}, generation)
+                self.assertEqual(cache.get('PKG-1'), ({'status': 'in_transit'}, generation))
+
+    def test_redis_backend_clear_only_removes_own_keys(self):
+        client = FakeRedis()
+        client.set('other', b'1')
+        backend = RedisBackend(client=client)
+        backend.set('PKG-1', {}, 60)
+
+        backend.clear()
+
+        self.assertEqual(list(client.store), ['other'])
+
+    @override_settings(PACKAGE_TRACKING_CACHE={
+        'BACKEND': 'packages.cache.RedisBackend',
+        'TIMEOUT': 5,
+        'OPTIONS': {'client': FakeRedis()},
+    })
+    def test_backend_is_configured_from_settings(self):
+        cache = get_tracking_cache()
+
+        self.assertIsInstance(cache.backend, RedisBackend)
+        self.assertEqual(cache.timeout, 5)
+
+
+class TrackEndpointCacheTestCase(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        get_tracking_cache().clear()
+        self.admin = User.objects.create_user(email='admin@example.com', user_role=User.ADMIN)
+        self.courier = User.objects.create_user(email='courier@example.com', user_role=User.COURIER)
+        self.customer = User.objects.create_user(email='customer@example.com', user_role=User.CUSTOMER)
+        self.package = Package.objects.create(
+            customer=self.customer,
+            description='Test package',
+            weight='2.50',
+            dimensions='20x15x10',
+            pickup_address='123 Pickup St',
+            delivery_address='456 Delivery Ave'
+        )
+        self.url = f"{reverse('package-track')}?tracking_number={self.package.tracking_number}"
+
+    def track(self):
+        return APIClient().get(self.url)
+
+    def test_public_tracking_is_served_from_cache(self):
+        """A repeated public lookup does not touch the database"""
+        first = self.track()
+        with self.assertNumQueries(0):
+            second = self.track()
+
+        self.assertEqual(first.data, second.data)
+        stats = get_tracking_cache().stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+
+    def test_owner_gets_full_package_on_cache_hit(self):
+        """Cached snapshots never replace the full payload for the owner"""
+        self.track()
+        self.client.force_authenticate(user=self.customer)
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.data['customer_email'], 'customer@example.com')
+
+    def test_status_update_invalidates_snapshot(self):
+        self.package.courier = self.courier
+        self.package.save()
+        self.track()
+        self.client.force_authenticate(user=self.courier)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                reverse('package-update-status', args=[self.package.pk]),
+                {'status': 'in_transit'}, format='json'
+            )
+
+        self.assertEqual(self.track().data['status'], 'in_transit')
+
+    def test_assign_courier_invalidates_snapshot(self):
+        self.track()
+        self.client.force_authenticate(user=self.admin)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(
+                reverse('package-assign-courier', args=[self.package.pk]),
+                {'courier': self.courier.pk}, format='json'
+            )
+
+        self.assertEqual(len(self.track().data['status_updates']), 1)
+
+    def test_soft_delete_and_restore_invalidate_snapshot(self):
+        self.track()
+        self.client.force_authenticate(user=self.admin)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(reverse('package-soft-delete', args=[self.package.pk]))
+        self.assertEqual(self.track().status_code, status.HTTP_404_NOT_FOUND)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(reverse('package-restore', args=[self.package.pk]))
+        self.assertEqual(self.track().status_code, status.HTTP_200_OK)
+
+    def test_stats_are_admin_only(self):
+        url = reverse('package-tracking-cache-stats')
+        self.client.force_authenticate(user=self.customer)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['backend'], 'LocMemLRUBackend')
@@ -0,0 +1,136 @@
+from contextlib import nullcontext
+from datetime import date, datetime, timezone as dt_timezone
+from unittest.mock import patch
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from packages.models import Package, TrackingSequence
+from packages.search import TRACKING_NUMBER_PATTERN
+from packages.tracking import (
+    TrackingNumberAllocator, format_tracking_number, is_valid_tracking_number, tracking_numbers
+)
+
+User = get_user_model()
+
+
+class TrackingNumberFormatTestCase(TestCase):
+    def test_format(self):
+        """Date prefix, zero padded sequence and a Luhn check digit"""
+        number = format_tracking_number(date(2026, 10, 17), 42)
+
+        self.assertEqual(number[:-1], 'PKG-2610170000042')
+        self.assertTrue(is_valid_tracking_number(number))
+        self.assertTrue(TRACKING_NUMBER_PATTERN.match(number))
+
+    def test_check_digit_catches_typos(self):
+        """Any single changed digit or swapped adjacent digits is detected"""
+        number = format_tracking_number(date(2026, 10, 17), 1234)
+        digits = number[4:]
+        for position, digit in enumerate(digits):
+            for replacement in '0123456789':
+                if replacement != digit:
+                    typo = 'PKG-' + digits[:position] + replacement + digits[position + 1:]
+                    self.assertFalse(is_valid_tracking_number(typo), typo)
+        swapped = 'PKG-' + digits[:8] + digits[9] + digits[8] + digits[10:]
+        if swapped != number:
+            self.assertFalse(is_valid_tracking_number(swapped))
+
+    def test_legacy_numbers_are_not_valid(self):
+        self.assertFalse(is_valid_tracking_number('PKG-1A2B3C4D'))
+        self.assertFalse(is_valid_tracking_number('BENCH-0000000001'))
+
+
+class TrackingNumberAllocatorTestCase(TestCase):
+    def test_allocates_increasing_numbers_from_blocks(self):
+        """Numbers increase and one block is reserved per block_size numbers"""
+        allocator = TrackingNumberAllocator(block_size=10)
+
+        numbers = allocator.allocate(5) + allocator.allocate(20)
+
+        self.assertEqual(numbers, sorted(numbers))
+        self.assertEqual(len(set(numbers)), 25)
+        self.assertTrue(all(is_valid_tracking_number(number) for number in numbers))
+        # 10 from the first block, then a block of 15 for the rest of the request
+        self.assertEqual(TrackingSequence.objects.get().last_value, 25)
+
+    def test_numbers_within_a_block_cost_no_queries(self):
+        allocator = TrackingNumberAllocator(block_size=10)
+        allocator.allocate()
+
+        with self.assertNumQueries(0):
+            allocator.allocate(9)
+
+    def test_processes_get_disjoint_blocks(self):
+        """Allocators sharing the database never hand out the same number"""
+        first, second = TrackingNumberAllocator(block_size=3), TrackingNumberAllocator(block_size=3)
+
+        numbers = []
+        for _ in range(4):
+            numbers += first.allocate(2) + second.allocate(2)
+
+        self.assertEqual(len(set(numbers)), len(numbers))
+
+    @override_settings(PACKAGE_TRACKING_SEQUENCE_DATABASE='sequences')
+    def test_blocks_are_reserved_on_the_sequence_database(self):
+        """The reservation runs and commits on the configured connection"""
+        with patch.object(TrackingSequence.objects, 'using', return_value=TrackingSequence.objects.all()) as using, \
+                patch('packages.tracking.transaction.atomic', return_value=nullcontext()) as atomic:
+            TrackingNumberAllocator(block_size=10).allocate()
+
+        using.assert_called_once_with('sequences')
+        atomic.assert_any_call(using='sequences')
+
+    def test_sequence_restarts_each_day(self):
+        allocator = TrackingNumberAllocator(block_size=10)
+        days = [datetime(2026, 10, 17, 23, 59, tzinfo=dt_timezone.utc),
+                datetime(2026, 10, 18, 0, 1, tzinfo=dt_timezone.utc)]
+
+        with patch.object(timezone, 'now', side_effect=days):
+            before, after = allocator.allocate()[0], allocator.allocate()[0]
+
+        self.assertEqual(before, format_tracking_number(date(2026, 10, 17), 1))
+        self.assertEqual(after, format_tracking_number(date(2026, 10, 18), 1))
+        self.assertLess(before, after)
+
+
+@override_settings(PACKAGE_TRACKING_NUMBER_BLOCK_SIZE=100)
+class PackageTrackingNumberTestCase(TestCase):
+    def setUp(self):
+        self.customer = User.objects.create_user(email='customer@example.com', user_role=User.CUSTOMER)
+        tracking_numbers.discard_block()
+
+    def create_package(self, **kwargs):
+        return Package.objects.create(
+            customer=self.customer,
+            description='Parcel',
+            weight='1.00',
+            dimensions='10x10x10',
+            pickup_address='123 Pickup St',
+            delivery_address='456 Delivery Ave',
+            **kwargs
+        )
+
+    def test_save_assigns_tracking_number(self):
+        package = self.create_package()
+
+        self.assertTrue(is_valid_tracking_number(package.tracking_number))
+
+    def test_save_retries_with_a_fresh_block_on_collision(self):
+        """A block handed out twice (e.g. after a rollback) does not fail the save"""
+        today = timezone.now().date()
+        taken = format_tracking_number(today, 1)
+        Package.objects.bulk_create([Package(
+            tracking_number=taken, customer=self.customer, description='Existing',
+            weight='1.00', dimensions='10x10x10', pickup_address='A', delivery_address='B'
+        )])
+
+        package = self.create_package()
+
+        self.assertEqual(package.tracking_number, format_tracking_number(today, 101))
+        self.assertEqual(Package.objects.count(), 2)
+
+    def test_generate_tracking_numbers(self):
+        numbers = Package.generate_tracking_numbers(250)
+
+        self.assertEqual(len(set(numbers)), 250)
+        self.assertEqual(numbers, sorted(numbers))
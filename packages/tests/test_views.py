@@ -1,8 +1,12 @@
+from datetime import datetime, timezone as dt_timezone
 from django.test import TestCase
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
+from rest_framework.response import Response
 from rest_framework.test import APITestCase, APIClient
 from unittest.mock import patch, MagicMock, PropertyMock
+from packages.cache import get_tracking_cache
 from packages.models import Package, PackageStatusUpdate
 from packages.views import PackageViewSet
 import json
@@ -12,6 +16,7 @@ class PackageViewSetTestCase(APITestCase):
     def setUp(self):
         # Setup mock user with different roles
         self.client = APIClient()
+        get_tracking_cache().clear()
         
         # Mock users for different roles
         self.mock_admin_user = MagicMock()
@@ -42,6 +47,8 @@ class PackageViewSetTestCase(APITestCase):
         self.mock_package.tracking_number = "PKG-12345"
         self.mock_package.status = "pending"
         self.mock_package.is_deleted = False
+        self.mock_package.updated_at = timezone.now()
+        self.mock_package.status_update_count = 0
         
         # Mock serializer response for converting package to API response
         self.serialized_package_data = {
@@ -179,7 +186,7 @@ class PackageViewSetTestCase(APITestCase):
         self.assertEqual(response.data, self.serialized_package_data)
         mock_serializer_instance.save.assert_called_once()
 
-    @patch('packages.views.PackageSerializer')
+    @patch('packages.views.PackageValuesSerializer')
     def test_retrieve_package_by_customer(self, mock_serializer):
         """Test retrieving a specific package by its customer"""
         # Setup
@@ -200,7 +207,7 @@ class PackageViewSetTestCase(APITestCase):
             self.assertEqual(response.status_code, status.HTTP_200_OK)
             self.assertEqual(response.data, self.serialized_package_data)
 
-    @patch('packages.views.PackageSerializer')
+    @patch('packages.views.PackageValuesSerializer')
     def test_retrieve_package_by_courier(self, mock_serializer):
         """Test retrieving a specific package by its assigned courier"""
         # Setup
@@ -380,32 +387,53 @@ class PackageViewSetTestCase(APITestCase):
         mock_status_create.assert_called_once()
 
     @patch('packages.views.PackageSerializer')
-    @patch('packages.views.Package.objects.filter')
-    def test_deleted_packages_by_admin(self, mock_filter, mock_serializer):
+    def test_deleted_packages_by_admin(self, mock_serializer):
         """Test listing all soft-deleted packages by admin"""
         # Setup
         self.client.force_authenticate(user=self.mock_admin_user)
         
         # Mock queryset and serializer
         mock_queryset = MagicMock()
-        mock_filter.return_value = mock_queryset
         
         mock_serializer_instance = MagicMock()
         mock_serializer_instance.data = [self.serialized_package_data]
         mock_serializer.return_value = mock_serializer_instance
         
         # Action
-        url = reverse('package-deleted-packages')
-        response = self.client.get(url)
+        with patch.object(PackageViewSet, 'get_queryset', return_value=mock_queryset), \
+                patch.object(PackageViewSet, 'filter_queryset', side_effect=lambda queryset: queryset), \
+                patch.object(PackageViewSet, 'paginate_queryset', return_value=[self.mock_package]) as mock_paginate, \
+                patch.object(PackageViewSet, 'get_paginated_response',
+                             side_effect=lambda data: Response({'results': data})):
+            url = reverse('package-deleted-packages')
+            response = self.client.get(url)
         
         # Assert
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(response.data, [self.serialized_package_data])
-        mock_filter.assert_called_once_with(is_deleted=True)
-        mock_serializer.assert_called_once_with(mock_queryset, many=True)
+        self.assertEqual(response.data['results'], [self.serialized_package_data])
+        mock_paginate.assert_called_once_with(mock_queryset)
+        mock_serializer.assert_called_once_with([self.mock_package], many=True)
+
+    @patch('rest_framework.request.Request')
+    def test_get_queryset_deleted_packages(self, mock_request):
+        """Test that the deleted_packages action only sees soft-deleted packages"""
+        view = PackageViewSet()
+        view.request = mock_request
+        view.request.user = self.mock_admin_user
+        view.action = 'deleted_packages'
+        
+        mock_queryset = MagicMock()
+        view.queryset = mock_queryset
+        filtered_queryset = MagicMock()
+        mock_queryset.filter.return_value = filtered_queryset
+        
+        result = view.get_queryset()
+        
+        self.assertEqual(result, filtered_queryset)
+        mock_queryset.filter.assert_called_once_with(is_deleted=True)
 
     @patch('packages.views.get_object_or_404')
-    @patch('packages.views.PackageSerializer')
+    @patch('packages.views.PackageValuesSerializer')
     def test_track_package_authenticated_user(self, mock_serializer, mock_get_object):
         """Test tracking a package by an authenticated user who owns the package"""
         # Setup
@@ -439,7 +467,9 @@ class PackageViewSetTestCase(APITestCase):
         mock_package = MagicMock()
         mock_package.tracking_number = "PKG-12345"
         mock_package.status = "in_transit"
-        mock_package.updated_at = "2025-03-07T12:00:00Z"
+        mock_package.pk = 1
+        mock_package.updated_at = datetime(2025, 3, 7, 12, 0, tzinfo=dt_timezone.utc)
+        mock_package.status_update_count = 1
         
         mock_status_update = MagicMock()
         mock_status_update.status = "in_transit"
@@ -0,0 +1,28 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryCountAssertionsMixin:
+    """
+    Assertions about how the number of executed queries scales with data size
+    """
+    def assertConstantQueryCount(self, seed, request, sizes=(1, 5, 20)):
+        """
+        Grow the dataset with seed(n) until it holds each of the given sizes and
+        check that request() runs the same number of queries every time.
+        Returns the query count.
+        """
+        counts = []
+        seeded = 0
+        for size in sizes:
+            seed(size - seeded)
+            seeded = size
+            with CaptureQueriesContext(connection) as context:
+                request()
+            counts.append(len(context.captured_queries))
+
+        self.assertEqual(
+            len(set(counts)), 1,
+            f"Query count grows with data size: {dict(zip(sizes, counts))}"
+        )
+        return counts[0]
@@ -0,0 +1,111 @@
+"""
+Tracking number allocation.
+
+Tracking numbers look like ``PKG-26101700000421``: the prefix followed by
+the UTC date (YYMMDD), a per-day sequence number and a Luhn check digit.
+Numbers issued on one day sort in allocation order, so new rows are appended
+to the end of the tracking_number index instead of landing at random pages.
+
+Each process reserves a block of sequence numbers from TrackingSequence with
+one UPDATE and hands them out from memory, so creating a package normally
+costs no extra round trip.
+
+Packages are usually created inside a transaction, and a reservation made on
+the same connection keeps the TrackingSequence row locked until that
+transaction commits, serializing package creation across processes. Setting
+PACKAGE_TRACKING_SEQUENCE_DATABASE to a second alias of the same database
+reserves blocks on their own connection, committed right away. SQLite allows
+one writer at a time anyway, so it is left unset there.
+"""
+import threading
+
+from django.conf import settings
+from django.db import router, transaction
+from django.db.models import F
+from django.utils import timezone
+
+PREFIX = 'PKG-'
+SEQUENCE_WIDTH = 7
+
+
+def luhn_check_digit(digits):
+    """Luhn (mod 10) check digit for a string of digits"""
+    total = 0
+    for position, digit in enumerate(reversed(digits)):
+        value = int(digit)
+        if position % 2 == 0:
+            value *= 2
+            if value > 9:
+                value -= 9
+        total += value
+    return str((10 - total % 10) % 10)
+
+
+def format_tracking_number(day, sequence):
+    digits = f'{day:%y%m%d}{sequence:0{SEQUENCE_WIDTH}d}'
+    return f'{PREFIX}{digits}{luhn_check_digit(digits)}'
+
+
+def is_valid_tracking_number(value):
+    """Whether value is a well-formed tracking number with a correct check digit"""
+    if not value.startswith(PREFIX):
+        return False
+    digits = value[len(PREFIX):]
+    if not digits.isdigit() or len(digits) < 6 + SEQUENCE_WIDTH + 1:
+        return False
+    return luhn_check_digit(digits[:-1]) == digits[-1]
+
+
+def reserve_sequence_block(day, size):
+    """Reserve size consecutive sequence numbers for day; returns (first, last)"""
+    from .models import TrackingSequence
+
+    using = settings.PACKAGE_TRACKING_SEQUENCE_DATABASE or router.db_for_write(TrackingSequence)
+    sequences = TrackingSequence.objects.using(using)
+    with transaction.atomic(using=using):
+        sequences.get_or_create(day=day)
+        sequences.filter(day=day).update(last_value=F('last_value') + size)
+        last = sequences.filter(day=day).values_list('last_value', flat=True).get()
+    return last - size + 1, last
+
+
+class TrackingNumberAllocator:
+    """Hands out tracking numbers from a block reserved per process"""
+    def __init__(self, block_size=None):
+        self.block_size = block_size
+        self._lock = threading.Lock()
+        self._day = None
+        self._next = 1
+        self._last = 0
+
+    def get_block_size(self):
+        return self.block_size or getattr(settings, 'PACKAGE_TRACKING_NUMBER_BLOCK_SIZE', 100)
+
+    def allocate(self, count=1):
+        """Return count new tracking numbers in increasing order"""
+        numbers = []
+        with self._lock:
+            day = timezone.now().date()
+            while len(numbers) < count:
+                if day != self._day or self._next > self._last:
+                    size = max(self.get_block_size(), count - len(numbers))
+                    self._next, self._last = reserve_sequence_block(day, size)
+                    self._day = day
+                take = min(count - len(numbers), self._last - self._next + 1)
+                numbers.extend(
+                    format_tracking_number(day, sequence)
+                    for sequence in range(self._next, self._next + take)
+                )
+                self._next += take
+        return numbers
+
+    def discard_block(self):
+        """
+        Drop the rest of the current block. Used after a collision, which
+        means the block's reservation was rolled back and handed out again.
+        """
+        with self._lock:
+            self._next, self._last = 1, 0
+
+
+tracking_numbers = TrackingNumberAllocator()
@@ -1,17 +1,29 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from rest_framework_nested import routers
-from .views import PackageViewSet, PackageStatusUpdateViewSet
+from .views import PackageViewSet, PackageStatusUpdateViewSet, track_stream
 
-# Main router for packages
-router = DefaultRouter()
-router.register(r'', PackageViewSet, basename='package')
 
-# Nested router for status updates
-status_router = routers.NestedSimpleRouter(router, r'', lookup='package')
-status_router.register(r'status', PackageStatusUpdateViewSet, basename='package-status')
+def get_urlpatterns(package_viewset=PackageViewSet):
+    # Main router for packages
+    router = DefaultRouter()
+    router.register(r'', package_viewset, basename='package')
 
-urlpatterns = [
-    path('', include(router.urls)),
-    path('', include(status_router.urls)),
-]
\ No newline at end of file
+    # Nested router for status updates
+    status_router = routers.NestedSimpleRouter(router, r'', lookup='package')
+    status_router.register(r'status', PackageStatusUpdateViewSet, basename='package-status')
+
+    return [
+        # Before the router so the path is not taken for a package id
+        path('track/stream/', track_stream, name='package-track-stream'),
+        path('', include(router.urls)),
+        path('', include(status_router.urls)),
+    ]
+
+
+if settings.PACKAGES_ASYNC_VIEWS:
+    from .async_views import AsyncPackageViewSet
+    urlpatterns = get_urlpatterns(AsyncPackageViewSet)
+else:
+    urlpatterns = get_urlpatterns(PackageViewSet)
@@ -1,31 +1,81 @@
+import json
+from collections import defaultdict
+from datetime import timedelta
+
 from django.shortcuts import render
 
 # Create your views here.
 from rest_framework import viewsets, status, filters
 from rest_framework.response import Response
 from rest_framework.decorators import action
+from rest_framework.utils.encoders import JSONEncoder
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.http import require_GET
+from django.db import IntegrityError, transaction
 from django.db.models import Q
 
-from .models import Package, PackageStatusUpdate
+from .analytics import get_delivery_times
+from .assignment import assign_packages
+from .cache import get_tracking_cache, invalidate_tracking_snapshot
+from .conditional import (
+    conditional_response, get_validators, get_variant, if_match_passes, package_version,
+    precondition_failed, set_validators
+)
+from .export import FORMATS, export_rows, get_columns
+from .fast_serializers import PackageValuesSerializer, package_from_row
+from .events import SubscriptionOverflow, publish_status_updates, status_event, tracking_events
+from .models import (
+    CourierStatusCount, CustomerStatusCount, DailyDeliveredCount, Package, PackageStatusUpdate
+)
+from .pagination import KeysetCursorPagination
+from .parsers import NDJSONParser
+from .routing import build_stops, plan_route
+from .search import PackageOrderingFilter, PackageSearchFilter
 from .serializers import (
     PackageSerializer, PackageCreateSerializer, 
     PackageStatusUpdateSerializer, PackageStatusUpdateCreateSerializer,
-    PackageAssignSerializer, PackageSoftDeleteSerializer
+    PackageAssignSerializer, PackageSoftDeleteSerializer, PackageScanSerializer,
+    PackageExportSerializer, PackageFieldsSerializer, PackageAutoAssignSerializer,
+    PackageRouteSerializer, PackageDeliveryStatsSerializer
 )
+from .stats import StatsDelta, count_transitions, package_state
+from .tracking import tracking_numbers
 from accounts.permissions import IsCustomer, IsCourier, IsAdmin, IsOwnerOrStaff
+from courier_service_api.parsers import FastJSONParser
 
-class PackageViewSet(viewsets.ModelViewSet):
+class EagerLoadingViewMixin:
+    """
+    Apply the relation needs declared by the action's serializer class
+    (see EagerLoadingMixin) to every queryset the view reads from
+    """
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        setup_eager_loading = getattr(self.get_serializer_class(), 'setup_eager_loading', None)
+        if setup_eager_loading is not None:
+            queryset = setup_eager_loading(queryset, **self.get_eager_loading_options())
+        return queryset
+    
+    def get_eager_loading_options(self):
+        """Extra keyword arguments for the serializer's setup_eager_loading"""
+        return {}
+
+class PackageViewSet(EagerLoadingViewMixin, viewsets.ModelViewSet):
     """
     ViewSet for Package model that handles different user roles and permissions
     """
     queryset = Package.objects.all()
     serializer_class = PackageSerializer
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
-    search_fields = ['tracking_number', 'status', 'description']
-    ordering_fields = ['created_at', 'updated_at', 'status']
+    filter_backends = [PackageSearchFilter, PackageOrderingFilter]
+    search_fields = ['tracking_number', 'status', 'description', 'pickup_address', 'delivery_address']
+    ordering_fields = ['created_at', 'updated_at', 'status', 'search_rank']
     ordering = ['-created_at']
+    pagination_class = KeysetCursorPagination
+    # Query parameters selecting a representation, see get_field_options
+    FIELD_PARAMS = ('fields', 'expand', 'history_limit')
     
     def get_queryset(self):
         """
@@ -38,7 +88,9 @@ class PackageViewSet(viewsets.ModelViewSet):
         queryset = super().get_queryset()
         
         # By default, don't show soft-deleted packages except in specific actions
-        if self.action != 'deleted_packages':
+        if self.action == 'deleted_packages':
+            queryset = queryset.filter(is_deleted=True)
+        else:
             queryset = queryset.filter(is_deleted=False)
         
         if user.is_customer:
@@ -52,33 +104,93 @@ class PackageViewSet(viewsets.ModelViewSet):
     def get_permissions(self):
         """
         Set up permissions based on action:
-        - create: only customers
-        - update_status: courier staff or admin
-        - assign_courier, soft_delete, restore: admin only
+        - create, bulk_create: only customers
+        - update_status, bulk_update_status, route: courier staff or admin
+        - assign_courier, auto_assign, soft_delete, restore, tracking_cache_stats,
+          courier_stats, customer_stats, delivery_stats, delivery_times: admin only
+        - export: any role, rows are filtered by get_queryset
         - list, retrieve: owner or staff
         """
-        if self.action == 'create':
+        if self.action in ['create', 'bulk_create']:
             permission_classes = [IsCustomer]
-        elif self.action == 'update_status':
+        elif self.action in ['update_status', 'bulk_update_status', 'route']:
             permission_classes = [IsCourier | IsAdmin]
-        elif self.action in ['assign_courier', 'soft_delete', 'restore', 'deleted_packages']:
+        elif self.action in ['assign_courier', 'auto_assign', 'soft_delete', 'restore',
+                             'deleted_packages', 'tracking_cache_stats', 'courier_stats',
+                             'customer_stats', 'delivery_stats', 'delivery_times']:
             permission_classes = [IsAdmin]
+        elif self.action == 'export':
+            permission_classes = [IsCustomer | IsCourier | IsAdmin]
         else:
             permission_classes = [IsOwnerOrStaff]
         return [permission() for permission in permission_classes]
     
     def get_serializer_class(self):
         """Return appropriate serializer class based on action"""
-        if self.action == 'create':
+        if self.action in ['create', 'bulk_create']:
             return PackageCreateSerializer
         elif self.action == 'update_status':
             return PackageStatusUpdateCreateSerializer
+        elif self.action == 'bulk_update_status':
+            return PackageScanSerializer
         elif self.action == 'assign_courier':
             return PackageAssignSerializer
+        elif self.action == 'auto_assign':
+            return PackageAutoAssignSerializer
+        elif self.action == 'route':
+            return PackageRouteSerializer
         elif self.action in ['soft_delete', 'restore']:
             return PackageSoftDeleteSerializer
+        elif self.action == 'export':
+            return PackageExportSerializer
+        elif self.action in ['delivery_stats', 'delivery_times']:
+            return PackageDeliveryStatsSerializer
+        elif self.action in ['list', 'retrieve']:
+            return PackageValuesSerializer
         return PackageSerializer
     
+    def get_eager_loading_options(self):
+        return self.get_field_options()
+    
+    def get_field_options(self):
+        """
+        Sparse fieldset options of list and retrieve (?fields=, ?expand=,
+        ?history_limit=), see PackageFieldsSerializer
+        """
+        if self.action not in ('list', 'retrieve'):
+            return {}
+        if not hasattr(self, '_field_options'):
+            serializer = PackageFieldsSerializer(data=self.request.query_params)
+            serializer.is_valid(raise_exception=True)
+            self._field_options = serializer.validated_data
+        return self._field_options
+    
+    def get_serializer(self, *args, **kwargs):
+        for option, value in self.get_field_options().items():
+            if value is not None:
+                kwargs.setdefault(option, value)
+        return super().get_serializer(*args, **kwargs)
+    
+    def retrieve(self, request, *args, **kwargs):
+        """Package detail, answering conditional requests from the package row alone"""
+        package = self.get_object()
+        validators = self.get_package_validators(package)
+        response = conditional_response(request, *validators)
+        if response is None:
+            response = Response(self.get_serializer(package).data)
+        return set_validators(response, *validators)
+    
+    def get_package_validators(self, package, representation=''):
+        """ETag and Last-Modified of the representation of package this request selects"""
+        variant = get_variant(self.request, self.FIELD_PARAMS, representation)
+        return get_validators(package_version(package), variant)
+    
+    def check_object_permissions(self, request, obj):
+        # list and retrieve read values() rows, see PackageValuesSerializer
+        if isinstance(obj, dict):
+            obj = package_from_row(obj)
+        super().check_object_permissions(request, obj)
+    
     def create(self, request, *args, **kwargs):
         """Create a new package for the current user"""
         serializer = self.get_serializer(data=request.data)
@@ -95,9 +207,102 @@ class PackageViewSet(viewsets.ModelViewSet):
         """Save the package with customer set to current user"""
         serializer.save()
     
+    @action(detail=False, methods=['post'], parser_classes=[FastJSONParser, NDJSONParser])
+    def bulk_create(self, request):
+        """
+        Create many packages for the current user from a JSON array or an
+        NDJSON body. Valid rows are inserted even if other rows fail
+        validation; the response lists the created packages and the errors,
+        both keyed by row index.
+        """
+        rows = request.data
+        if not isinstance(rows, list):
+            return Response(
+                {"detail": "Expected a list of packages."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        max_rows = settings.PACKAGES_BULK_CREATE_MAX_ROWS
+        if len(rows) > max_rows:
+            return Response(
+                {"detail": f"At most {max_rows} packages can be created per request."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        valid_rows, errors = [], []
+        for index, row in enumerate(rows):
+            serializer = self.get_serializer(data=row)
+            if serializer.is_valid():
+                valid_rows.append((index, serializer.validated_data))
+            else:
+                errors.append({"index": index, "errors": serializer.errors})
+        
+        for attempt in range(1, Package.TRACKING_NUMBER_ATTEMPTS + 1):
+            numbers = Package.generate_tracking_numbers(len(valid_rows))
+            packages = [
+                Package(customer=request.user, tracking_number=tracking_number, **validated_data)
+                for (index, validated_data), tracking_number in zip(valid_rows, numbers)
+            ]
+            try:
+                with transaction.atomic():
+                    Package.objects.bulk_create(packages, batch_size=settings.PACKAGES_BULK_CREATE_BATCH_SIZE)
+                    delta = StatsDelta()
+                    for package in packages:
+                        delta.add(package_state(package))
+                    delta.apply()
+                break
+            except IntegrityError:
+                # Validated rows can only clash on tracking_number, see Package.save
+                if attempt == Package.TRACKING_NUMBER_ATTEMPTS:
+                    raise
+                tracking_numbers.discard_block()
+        
+        created = [
+            {"index": index, "id": package.pk, "tracking_number": package.tracking_number}
+            for (index, _), package in zip(valid_rows, packages)
+        ]
+        if not created and errors:
+            response_status = status.HTTP_400_BAD_REQUEST
+        elif errors:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_201_CREATED
+        return Response({"created": created, "errors": errors}, status=response_status)
+    
+    def update(self, request, *args, **kwargs):
+        """Update the package's details; status and courier have their own actions"""
+        partial = kwargs.pop('partial', False)
+        serializer = self.get_serializer(self.get_object(), data=request.data, partial=partial)
+        serializer.is_valid(raise_exception=True)
+        self.perform_update(serializer)
+
+        # Saving drops the prefetched history, so it is read again with its relations
+        package_serializer = PackageSerializer(self._full_package(serializer.instance))
+        return Response(package_serializer.data)
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            serializer.instance.lock_for_update()
+            before = package_state(serializer.instance)
+            package = serializer.save()
+            delta = StatsDelta()
+            delta.change(before, package_state(package))
+            delta.apply()
+        invalidate_tracking_snapshot(package.tracking_number)
+    
+    def perform_destroy(self, instance):
+        invalidate_tracking_snapshot(instance.tracking_number)
+        with transaction.atomic():
+            delta = StatsDelta()
+            delta.add(package_state(instance), -1)
+            instance.delete()
+            delta.apply()
+    
     @action(detail=True, methods=['post'])
     def update_status(self, request, pk=None):
-        """Update package status and create status update record"""
+        """
+        Update package status and create status update record. With If-Match,
+        the update only applies if the package is still at that version.
+        """
         package = self.get_object()
         
         # Courier can only update assigned packages
@@ -112,11 +317,151 @@ class PackageViewSet(viewsets.ModelViewSet):
             context={'request': request, 'package': package}
         )
         serializer.is_valid(raise_exception=True)
-        status_update = serializer.save()
+        if not self.save_if_match(request, package, serializer):
+            return precondition_failed()
         
         # Return the updated package
-        package_serializer = PackageSerializer(package)
-        return Response(package_serializer.data)
+        package_serializer = PackageSerializer(self._full_package(package))
+        return set_validators(Response(package_serializer.data), *self.get_package_validators(package))
+    
+    def _full_package(self, package):
+        """package read again with the relations and history PackageSerializer renders"""
+        return PackageSerializer.setup_eager_loading(Package.objects.filter(pk=package.pk)).get()
+    
+    def save_if_match(self, request, package, serializer):
+        """
+        Save the serializer unless an If-Match header names another version
+        of the package. Returns whether it was saved.
+        """
+        if not request.META.get('HTTP_IF_MATCH'):
+            serializer.save()
+            return True
+        with transaction.atomic():
+            # The row lock keeps the version from changing before the write
+            current = Package.objects.select_for_update().only(
+                'updated_at', 'status_update_count'
+            ).get(pk=package.pk)
+            if not if_match_passes(request, package_version(current)):
+                return False
+            serializer.save()
+        return True
+    
+    @action(detail=False, methods=['post'])
+    def bulk_update_status(self, request):
+        """
+        Apply a batch of offline scans ({tracking_number, status, notes,
+        scanned_at}) from a courier's scanner. Scans already recorded are
+        skipped, so replaying a batch is harmless. Each package takes the
+        status of its most recent new scan; a scan that would move a package
+        backwards (see Package.STATUS_TRANSITIONS) is recorded in its history
+        but leaves its status alone.
+        """
+        rows = request.data
+        if not isinstance(rows, list):
+            return Response(
+                {"detail": "Expected a list of scans."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        scans, errors = [], []
+        for index, row in enumerate(rows):
+            serializer = self.get_serializer(data=row)
+            if serializer.is_valid():
+                scans.append((index, serializer.validated_data))
+            else:
+                errors.append({"index": index, "errors": serializer.errors})
+        
+        # Couriers may only scan their own packages; one query authorizes the batch
+        packages = Package.objects.filter(
+            tracking_number__in={scan['tracking_number'] for _, scan in scans},
+            is_deleted=False
+        )
+        if request.user.is_courier:
+            packages = packages.filter(courier=request.user)
+        packages = {package.tracking_number: package for package in packages}
+        
+        recorded = set(
+            PackageStatusUpdate.objects.filter(
+                package__in=packages.values(),
+                scanned_at__in={scan['scanned_at'] for _, scan in scans}
+            ).values_list('package_id', 'status', 'scanned_at')
+        )
+        
+        duplicates, new_scans = [], []
+        for index, scan in scans:
+            package = packages.get(scan['tracking_number'])
+            if package is None:
+                errors.append({
+                    "index": index,
+                    "errors": {"tracking_number": ["Package not found or not assigned to you."]}
+                })
+                continue
+            key = (package.pk, scan['status'], scan['scanned_at'])
+            if key in recorded:
+                duplicates.append(index)
+                continue
+            recorded.add(key)
+            new_scans.append((index, scan, PackageStatusUpdate(
+                package=package,
+                status=scan['status'],
+                notes=scan['notes'],
+                updated_by=request.user,
+                scanned_at=scan['scanned_at']
+            )))
+        
+        applied, status_updates, latest_scans = [], [], {}
+        with transaction.atomic():
+            PackageStatusUpdate.objects.bulk_create(
+                [update for _, _, update in new_scans], ignore_conflicts=True
+            )
+            # A concurrent replay may have recorded some of these scans since
+            # they were looked up, and its rows were kept instead: a scan is
+            # applied only if the row recorded for it is the one created here
+            created = set(
+                PackageStatusUpdate.objects.filter(
+                    package__in={update.package_id for _, _, update in new_scans},
+                    scanned_at__in={update.scanned_at for _, _, update in new_scans}
+                ).values_list('package_id', 'status', 'scanned_at', 'created_at')
+            ) if new_scans else set()
+            for index, scan, update in new_scans:
+                if (update.package_id, update.status, update.scanned_at, update.created_at) not in created:
+                    duplicates.append(index)
+                    continue
+                status_updates.append(update)
+                applied.append({"index": index, "tracking_number": update.package.tracking_number})
+                latest = latest_scans.get(update.package_id)
+                if latest is None or scan['scanned_at'] >= latest['scanned_at']:
+                    latest_scans[update.package_id] = scan
+            
+            # Packages move to the status of their latest scan, one conditional
+            # UPDATE per status, unless that would move them backwards
+            transitions = defaultdict(set)
+            for package_id, scan in latest_scans.items():
+                transitions[scan['status']].add(package_id)
+            delta = StatsDelta()
+            for package_status, package_ids in transitions.items():
+                count_transitions(Package.objects.filter(pk__in=package_ids).transition(package_status), delta)
+            delta.apply()
+            Package.objects.filter(
+                pk__in={update.package_id for update in status_updates}
+            ).refresh_status_summary()
+        for package in packages.values():
+            if package.pk in latest_scans:
+                invalidate_tracking_snapshot(package.tracking_number)
+        publish_status_updates(status_updates)
+        
+        duplicates.sort()
+        errors.sort(key=lambda error: error["index"])
+        if errors and not applied and not duplicates:
+            response_status = status.HTTP_400_BAD_REQUEST
+        elif errors:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_200_OK
+        return Response(
+            {"applied": applied, "duplicates": duplicates, "errors": errors},
+            status=response_status
+        )
     
     @action(detail=True, methods=['patch'])
     def assign_courier(self, request, pk=None):
@@ -124,35 +469,123 @@ class PackageViewSet(viewsets.ModelViewSet):
         package = self.get_object()
         serializer = self.get_serializer(package, data=request.data, partial=True)
         serializer.is_valid(raise_exception=True)
-        serializer.save()
-        
-        # Create a status update record
-        PackageStatusUpdate.objects.create(
-            package=package,
-            status=package.status,
-            notes=f"Package assigned to courier: {package.courier.email}",
-            updated_by=request.user
-        )
+        with transaction.atomic():
+            package.lock_for_update()
+            before = package_state(package)
+            serializer.save()
+            delta = StatsDelta()
+            delta.change(before, package_state(package))
+            delta.apply()
+            
+            # Create a status update record
+            status_update = PackageStatusUpdate.objects.create(
+                package=package,
+                status=package.status,
+                notes=f"Package assigned to courier: {package.courier.email}",
+                updated_by=request.user
+            )
+            package.refresh_status_summary()
+        invalidate_tracking_snapshot(package.tracking_number)
+        publish_status_updates([status_update])
         
         # Return the updated package
-        package_serializer = PackageSerializer(package)
+        package_serializer = PackageSerializer(self._full_package(package))
         return Response(package_serializer.data)
     
+    @action(detail=False, methods=['post'])
+    def auto_assign(self, request):
+        """
+        Assign couriers to the oldest unassigned pending packages (admin only),
+        see packages.assignment. Packages left over when every courier is at
+        capacity are listed as unassigned.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        assignment = assign_packages(
+            Package.objects.all(), request.user, limit=serializer.validated_data.get('limit')
+        )
+        return Response({
+            "assigned": [
+                {
+                    "tracking_number": package.tracking_number,
+                    "courier": package.courier.pk,
+                    "courier_email": package.courier.email,
+                }
+                for package in assignment.assigned
+            ],
+            "unassigned": [package.tracking_number for package in assignment.unassigned],
+        })
+    
+    @action(detail=False, methods=['get'])
+    def route(self, request):
+        """
+        Planned stop order for the open packages of the requesting courier, or
+        of ?courier=<id> for admins, see packages.routing. A starting point
+        may be given as ?start_latitude=&start_longitude=.
+        """
+        serializer = self.get_serializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        options = serializer.validated_data
+        courier = request.user if request.user.is_courier else options.get('courier')
+        if courier is None:
+            return Response(
+                {"courier": ["This field is required."]},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        packages = Package.objects.filter(
+            courier=courier, is_deleted=False
+        ).exclude(status='delivered').only(
+            'id', 'tracking_number', 'status', 'pickup_address', 'delivery_address'
+        ).order_by('created_at', 'id')
+        stops, unlocated = build_stops(packages)
+        start = None
+        if 'start_latitude' in options:
+            start = (options['start_latitude'], options['start_longitude'])
+        route = plan_route(stops, start=start, time_budget_ms=options.get('time_budget_ms'))
+        return Response({
+            "courier": courier.pk,
+            "distance_km": round(route.distance_km, 3),
+            "initial_distance_km": round(route.initial_distance_km, 3),
+            "complete": route.complete,
+            "stops": [
+                {
+                    "package": stop.package.pk,
+                    "tracking_number": stop.package.tracking_number,
+                    "kind": stop.kind,
+                    "address": stop.address,
+                    "latitude": round(stop.point[0], 6),
+                    "longitude": round(stop.point[1], 6),
+                }
+                for stop in route.stops
+            ],
+            "unlocated": [package.tracking_number for package in unlocated],
+        })
+    
     @action(detail=True, methods=['patch'])
     def soft_delete(self, request, pk=None):
         """Soft delete a package (admin only)"""
         package = self.get_object()
         serializer = self.get_serializer(package, data={'is_deleted': True}, partial=True)
         serializer.is_valid(raise_exception=True)
-        serializer.save()
-        
-        # Create a status update record
-        PackageStatusUpdate.objects.create(
-            package=package,
-            status=package.status,
-            notes=f"Package marked as deleted by admin",
-            updated_by=request.user
-        )
+        with transaction.atomic():
+            package.lock_for_update()
+            before = package_state(package)
+            serializer.save()
+            delta = StatsDelta()
+            delta.change(before, package_state(package))
+            delta.apply()
+            
+            # Create a status update record
+            PackageStatusUpdate.objects.create(
+                package=package,
+                status=package.status,
+                notes=f"Package marked as deleted by admin",
+                updated_by=request.user
+            )
+            package.refresh_status_summary()
+        invalidate_tracking_snapshot(package.tracking_number)
+        # Deleted packages can no longer be tracked, so no event is published
         
         return Response({"detail": "Package successfully marked as deleted"})
     
@@ -163,24 +596,64 @@ class PackageViewSet(viewsets.ModelViewSet):
         package = get_object_or_404(Package, pk=pk)
         serializer = self.get_serializer(package, data={'is_deleted': False}, partial=True)
         serializer.is_valid(raise_exception=True)
-        serializer.save()
-        
-        # Create a status update record
-        PackageStatusUpdate.objects.create(
-            package=package,
-            status=package.status,
-            notes=f"Package restored by admin",
-            updated_by=request.user
-        )
+        with transaction.atomic():
+            package.lock_for_update()
+            before = package_state(package)
+            serializer.save()
+            delta = StatsDelta()
+            delta.change(before, package_state(package))
+            delta.apply()
+            
+            # Create a status update record
+            status_update = PackageStatusUpdate.objects.create(
+                package=package,
+                status=package.status,
+                notes=f"Package restored by admin",
+                updated_by=request.user
+            )
+            package.refresh_status_summary()
+        invalidate_tracking_snapshot(package.tracking_number)
+        publish_status_updates([status_update])
         
         return Response({"detail": "Package successfully restored"})
     
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Stream the packages visible to the user as CSV or NDJSON, optionally
+        with one row per status update (include_history=true)
+        """
+        serializer = self.get_serializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        options = serializer.validated_data
+        
+        queryset = self.get_queryset()
+        if options.get('status'):
+            queryset = queryset.filter(status__in=options['status'])
+        if options.get('created_after'):
+            queryset = queryset.filter(created_at__gte=options['created_after'])
+        if options.get('created_before'):
+            queryset = queryset.filter(created_at__lt=options['created_before'])
+        
+        include_history = options['include_history']
+        stream, content_type = FORMATS[options['export_format']]
+        rows = export_rows(
+            queryset, include_history, chunk_size=settings.PACKAGES_EXPORT_CHUNK_SIZE
+        )
+        response = StreamingHttpResponse(
+            stream(rows, get_columns(include_history)), content_type=content_type
+        )
+        filename = f"packages-{timezone.now():%Y%m%d-%H%M%S}.{options['export_format']}"
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+    
     @action(detail=False, methods=['get'])
     def deleted_packages(self, request):
         """List all soft-deleted packages (admin only)"""
-        queryset = Package.objects.filter(is_deleted=True)
-        serializer = PackageSerializer(queryset, many=True)
-        return Response(serializer.data)
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        serializer = PackageSerializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
     
     @action(detail=False, methods=['get'])
     def track(self, request):
@@ -192,7 +665,17 @@ class PackageViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
+        # Public lookups are answered from the snapshot cache; owners, the
+        # assigned courier and admins get the full package from the database.
+        tracking_cache = get_tracking_cache()
+        snapshot, generation = tracking_cache.get(tracking_number)
+        if snapshot is not None and not self._can_view_full_package(request.user, snapshot):
+            return self._public_tracking_response(request, snapshot)
+        
         package = get_object_or_404(Package, tracking_number=tracking_number, is_deleted=False)
+        if snapshot is None:
+            snapshot = self._build_tracking_snapshot(package)
+            tracking_cache.set(tracking_number, snapshot, generation)
         
         # For security, return limited information for non-authenticated users
         # or users who are not the package owner/courier/admin
@@ -201,7 +684,101 @@ class PackageViewSet(viewsets.ModelViewSet):
              request.user != package.courier and 
              not request.user.is_admin)):
             # Return limited tracking information
-            return Response({
+            return self._public_tracking_response(request, snapshot)
+        
+        validators = self.get_package_validators(package)
+        response = conditional_response(request, *validators)
+        if response is None:
+            row = PackageValuesSerializer.setup_eager_loading(Package.objects.filter(pk=package.pk)).get()
+            serializer = PackageValuesSerializer(row)
+            response = Response(serializer.data)
+        patch_vary_headers(response, ['Authorization'])
+        return set_validators(response, *validators)
+    
+    @action(detail=False, methods=['get'])
+    def tracking_cache_stats(self, request):
+        """Hit/miss counters of the tracking snapshot cache (admin only)"""
+        return Response(get_tracking_cache().stats())
+    
+    @action(detail=False, methods=['get'])
+    def courier_stats(self, request):
+        """Live packages per status of every courier (admin only), see packages.stats"""
+        return Response(self._status_counts(CourierStatusCount, 'courier'))
+    
+    @action(detail=False, methods=['get'])
+    def customer_stats(self, request):
+        """Live packages per status of every customer (admin only), see packages.stats"""
+        return Response(self._status_counts(CustomerStatusCount, 'customer'))
+    
+    @action(detail=False, methods=['get'])
+    def delivery_stats(self, request):
+        """
+        Live packages delivered per day from ?since= to ?until= (admin only,
+        the last PACKAGE_STATS_DEFAULT_DAYS days by default)
+        """
+        serializer = self.get_serializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        since, until = serializer.validated_data['since'], serializer.validated_data['until']
+        counts = dict(
+            DailyDeliveredCount.objects.filter(day__range=(since, until)).values_list('day', 'count')
+        )
+        days = [since + timedelta(days=offset) for offset in range((until - since).days + 1)]
+        return Response({
+            "since": since,
+            "until": until,
+            "total": sum(counts.values()),
+            "days": [{"day": day, "count": counts.get(day, 0)} for day in days],
+        })
+    
+    @action(detail=False, methods=['get'])
+    def delivery_times(self, request):
+        """
+        Percentiles of the time live packages delivered from ?since= to ?until=
+        spent pending, in transit and in total, overall, per courier and per
+        day (admin only), see packages.analytics
+        """
+        serializer = self.get_serializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        return Response(get_delivery_times(**serializer.validated_data))
+    
+    def _status_counts(self, model, relation):
+        """One row per user with a count per status, from the stored counts"""
+        rows = {}
+        counts = model.objects.exclude(count=0).order_by(relation).values_list(
+            relation, f'{relation}__email', 'status', 'count'
+        )
+        for user_id, email, package_status, count in counts:
+            row = rows.get(user_id)
+            if row is None:
+                row = rows[user_id] = {
+                    relation: user_id,
+                    f'{relation}_email': email,
+                    **{choice: 0 for choice, _ in Package.STATUS_CHOICES},
+                    "total": 0,
+                }
+            row[package_status] += count
+            row["total"] += count
+        return list(rows.values())
+    
+    def _public_tracking_response(self, request, snapshot):
+        """The limited tracking payload, or 304 if the client has this version"""
+        if 'version' not in snapshot:
+            # Cached by a process running an older release
+            return Response(snapshot['payload'])
+        validators = get_validators(snapshot['version'], get_variant(request, representation='public'))
+        response = conditional_response(request, *validators)
+        if response is None:
+            response = Response(snapshot['payload'])
+        patch_vary_headers(response, ['Authorization'])
+        return set_validators(response, *validators, private=False)
+    
+    def _build_tracking_snapshot(self, package):
+        """Cacheable tracking data: the limited payload plus who may see more"""
+        return {
+            'customer_id': package.customer_id,
+            'courier_id': package.courier_id,
+            'version': package_version(package),
+            'payload': {
                 "tracking_number": package.tracking_number,
                 "status": package.status,
                 "updated_at": package.updated_at,
@@ -211,17 +788,23 @@ class PackageViewSet(viewsets.ModelViewSet):
                         "created_at": update.created_at
                     } for update in package.status_updates.all()
                 ]
-            })
-        
-        serializer = PackageSerializer(package)
-        return Response(serializer.data)
+            }
+        }
+    
+    def _can_view_full_package(self, user, snapshot):
+        return user.is_authenticated and (
+            user.pk in (snapshot['customer_id'], snapshot['courier_id']) or user.is_admin
+        )
 
 
-class PackageStatusUpdateViewSet(viewsets.ReadOnlyModelViewSet):
+class PackageStatusUpdateViewSet(EagerLoadingViewMixin, viewsets.ReadOnlyModelViewSet):
     """
     ViewSet for viewing package status updates
     """
     serializer_class = PackageStatusUpdateSerializer
+    pagination_class = KeysetCursorPagination
+    # The package whose history get_queryset returns, if the user may see it
+    package = None
     
     def get_queryset(self):
         """
@@ -239,11 +822,111 @@ class PackageStatusUpdateViewSet(viewsets.ReadOnlyModelViewSet):
             return PackageStatusUpdate.objects.none()
         
         # Check if user has permission to view package status updates
-        if user.is_admin:
-            return package.status_updates.all()
-        elif user.is_courier and package.courier == user:
-            return package.status_updates.all()
-        elif user.is_customer and package.customer == user:
+        if (user.is_admin or
+                (user.is_courier and package.courier == user) or
+                (user.is_customer and package.customer == user)):
+            self.package = package
             return package.status_updates.all()
         
         return PackageStatusUpdate.objects.none()
+    
+    def list(self, request, *args, **kwargs):
+        """
+        A page of the package's history. Validators come from the package
+        row, so conditional requests are answered before the page is read.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        validators = None
+        if self.package is not None:
+            params = [self.paginator.cursor_query_param, self.paginator.page_size_query_param]
+            validators = get_validators(package_version(self.package), get_variant(request, params))
+            response = conditional_response(request, *validators)
+            if response is not None:
+                return set_validators(response, *validators)
+        
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        response = self.get_paginated_response(serializer.data)
+        return set_validators(response, *validators) if validators else response
+
+
+@require_GET
+async def track_stream(request):
+    """
+    Server-Sent Events stream of status updates for one or more packages
+    (publicly accessible, same limited data as track).
+
+    Tracking numbers are given as repeated or comma separated tracking_number
+    query parameters. A Last-Event-ID header (or last_event_id parameter)
+    replays the status history after that event before streaming live ones.
+    """
+    requested = {
+        tracking_number.strip()
+        for value in request.GET.getlist('tracking_number')
+        for tracking_number in value.split(',') if tracking_number.strip()
+    }
+    if not requested:
+        return JsonResponse({"detail": "Tracking number is required"}, status=status.HTTP_400_BAD_REQUEST)
+    max_tracking_numbers = settings.PACKAGE_EVENTS_MAX_TRACKING_NUMBERS
+    if len(requested) > max_tracking_numbers:
+        return JsonResponse(
+            {"detail": f"At most {max_tracking_numbers} tracking numbers can be followed per stream."},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id') or '0'
+    if not last_event_id.isdigit():
+        return JsonResponse({"detail": "Invalid Last-Event-ID"}, status=status.HTTP_400_BAD_REQUEST)
+    
+    tracking_numbers = [
+        tracking_number async for tracking_number in Package.objects.filter(
+            tracking_number__in=requested, is_deleted=False
+        ).values_list('tracking_number', flat=True)
+    ]
+    if not tracking_numbers:
+        return JsonResponse({"detail": "No Package matches the given query."}, status=status.HTTP_404_NOT_FOUND)
+    
+    response = StreamingHttpResponse(
+        _tracking_event_stream(tracking_numbers, int(last_event_id)),
+        content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+async def _tracking_event_stream(tracking_numbers, last_event_id):
+    # Subscribe before replaying so nothing committed in between is missed;
+    # events are de-duplicated by id
+    subscription = tracking_events.subscribe(tracking_numbers, settings.PACKAGE_EVENTS_QUEUE_SIZE)
+    try:
+        yield f"retry: {settings.PACKAGE_EVENTS_RETRY_MS}\n\n"
+        if last_event_id:
+            history = PackageStatusUpdate.objects.filter(
+                package__tracking_number__in=tracking_numbers,
+                package__is_deleted=False,
+                pk__gt=last_event_id
+            ).order_by('pk').values_list('pk', 'package__tracking_number', 'status', 'created_at')
+            async for row in history:
+                event = status_event(*row)
+                last_event_id = event['id']
+                yield _format_event(event)
+        
+        while True:
+            try:
+                event = await subscription.get(timeout=settings.PACKAGE_EVENTS_HEARTBEAT_INTERVAL)
+            except SubscriptionOverflow:
+                # The client reconnects and resumes from the history
+                yield "event: overflow\ndata: {}\n\n"
+                return
+            if event is None:
+                yield ": heartbeat\n\n"
+            elif event['id'] > last_event_id:
+                last_event_id = event['id']
+                yield _format_event(event)
+    finally:
+        tracking_events.unsubscribe(subscription)
+
+
+def _format_event(event):
+    data = {key: value for key, value in event.items() if key != 'id'}
+    return f"id: {event['id']}\nevent: status\ndata: {json.dumps(data, cls=JSONEncoder)}\n\n"